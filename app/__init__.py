@@ -0,0 +1,150 @@
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import LoginManager
+from flask_migrate import Migrate
+from sqlalchemy import event
+import os
+import weakref
+
+# Extensions are created unbound and attached to each app in create_app(), so several
+# apps (tests, gunicorn workers) can be built with their own configuration.
+db = SQLAlchemy()
+login_manager = LoginManager()
+migrate = Migrate()
+
+# Login manager settings
+login_manager.login_view = 'main.login'
+login_manager.login_message_category = 'info'
+
+DEFAULT_CONFIG = 'config.Config'
+
+def create_app(config=None):
+    """
+    Application factory. config may be a config class/object, an import string such as
+    'config.ProductionConfig', or a dict of overrides applied on top of the default
+    (APP_CONFIG environment variable, else config.Config).
+    """
+    app = Flask(__name__)
+    app.config.from_object(os.environ.get('APP_CONFIG', DEFAULT_CONFIG))
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', _engine_options(app.config))
+
+    # Initialize extensions
+    db.init_app(app)
+    login_manager.init_app(app)
+    migrate.init_app(app, db)
+
+    from app.passwords import init_password_hasher
+    init_password_hasher(app)
+
+    # Models and the modules that register SQLAlchemy events are imported here, on the
+    # first create_app() call, rather than when the package is imported.
+    from app import models, calendar_feed, reporting, waitlist
+
+    from app.utils.availability_cache import init_slot_cache
+    init_slot_cache(app)
+
+    from app.utils.page_cache import page_cache
+    page_cache.init_app(app)
+
+    from app.metrics import init_metrics
+    init_metrics(app)
+
+    _register_blueprints(app)
+    _register_cli(app)
+    with app.app_context():
+        _configure_engine(app, db.engine)
+    return app
+
+def _register_blueprints(app):
+    # Main pages and user authentication
+    from app.url_helpers import main_bp
+    app.register_blueprint(main_bp)
+
+    # Appointments blueprint
+    from app.routes.appointments import appointments_bp
+    app.register_blueprint(appointments_bp, url_prefix='/appointments')
+
+    # Admin reports blueprint (reads the reporting rollups)
+    from app.routes.reports import reports_bp
+    app.register_blueprint(reports_bp, url_prefix='/admin')
+
+    # Prometheus metrics (request latency, SQL per request, slot engine time)
+    if app.config['METRICS_ENABLED']:
+        from app.routes.metrics import metrics_bp
+        app.register_blueprint(metrics_bp)
+
+def _register_cli(app):
+    from app.reporting import reports_cli
+    from app.resources import resources_cli
+    from app.notifications import outbox_cli
+    from app.data_transfer import data_cli
+    from app.waitlist import waitlist_cli
+    app.cli.add_command(reports_cli)
+    app.cli.add_command(resources_cli)
+    app.cli.add_command(outbox_cli)
+    app.cli.add_command(data_cli)
+    app.cli.add_command(waitlist_cli)
+
+def _engine_options(config):
+    """Pool settings from the config; SQLite in-memory databases use a single-connection pool instead."""
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if uri.startswith('sqlite') and (uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri):
+        return {}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING']
+    }
+
+def _configure_engine(app, engine):
+    if engine.dialect.name == 'sqlite':
+        wal = app.config['SQLITE_WAL'] and engine.url.database not in (None, '', ':memory:')
+        busy_timeout_ms = app.config['SQLITE_BUSY_TIMEOUT_MS']
+
+        @event.listens_for(engine, 'connect')
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            if wal:
+                cursor.execute('PRAGMA journal_mode=WAL')
+                cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout_ms)}')
+            cursor.execute('PRAGMA foreign_keys=ON')
+            cursor.close()
+
+    _forked_engines.add(engine)
+
+# A worker forked from a preloaded master (gunicorn --preload) must not reuse the
+# parent's pooled connections; close=False leaves them usable by the parent. The hook is
+# registered once for the process and disposes every engine configured so far, so
+# repeated create_app() calls (tests) don't pile up hooks or keep engines alive.
+_forked_engines = weakref.WeakSet()
+
+def _dispose_engines_after_fork():
+    for engine in list(_forked_engines):
+        engine.dispose(close=False)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_engines_after_fork)
+
+_default_app = None
+
+def __getattr__(name):
+    # `from app import app` (run.py, scripts) builds the default app on first use only,
+    # so importing the package for its extensions or create_app stays cheap.
+    global _default_app
+    if name == 'app':
+        if _default_app is None:
+            _default_app = create_app()
+        return _default_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Create database tables if they don't exist (for SQLite, simple setup)
+# For more robust setup, Flask-Migrate is used.
+# with app.app_context():
+#     db.create_all() # This might be needed if not using migrations for the very first run, or if migrations handle it.
@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+from app.metrics import track_time
+from app.queries import (
+    active_resources, appointment_intervals_between, day_bounds, resource_interval_rows_between
+)
+from app.utils.availability_cache import cached_available_slots, date_versions, slot_cache
+from app.utils.occupancy import available_slots_for_resources, group_by_resource, longest_free_gap_for_resources
+from app.utils.scheduling import get_available_slots, get_available_slots_for_range, longest_free_gap
+
+# Availability for the booking endpoints. Shops without configured resources keep the
+# single shop-wide schedule (get_available_slots); with chairs/barbers configured a slot
+# is available when any active resource is free for the whole service, computed from
+# per-resource occupancy bitmaps (app/utils/occupancy.py).
+#
+# next_available searches forward using a per-day summary, the longest free gap in
+# minutes. Summaries live in the slot cache next to the day's slot lists, so any write
+# to an appointment of that day invalidates both (one version lookup per search window). Days whose gap is shorter than the
+# service are skipped with a cache lookup; slots are generated only for candidate days.
+
+# Days whose summaries are loaded with a single appointments query
+SEARCH_WINDOW_DAYS = 14
+# Cache key suffix of the per-day summary (slot lists use the service duration)
+LONGEST_GAP_KEY = "longest_gap"
+
+def day_slots(target_date, service_duration_minutes):
+    resources = active_resources()
+    if not resources:
+        existing = appointment_intervals_between(*day_bounds(target_date))
+        with track_time("get_available_slots"):
+            return get_available_slots(target_date.strftime("%Y-%m-%d"), existing, service_duration_minutes)
+    rows = resource_interval_rows_between(*day_bounds(target_date))
+    with track_time("get_available_slots"):
+        by_resource, shared = group_by_resource(rows)
+        return available_slots_for_resources(target_date, resources, by_resource, shared, service_duration_minutes)
+
+def range_slots(start_date, end_date, service_duration_minutes):
+    """{"YYYY-MM-DD": [slots]} for every day in the range, from a single appointments query."""
+    start_of_range = datetime.combine(start_date, datetime.min.time())
+    end_of_range = datetime.combine(end_date, datetime.max.time())
+    resources = active_resources()
+    if not resources:
+        existing = appointment_intervals_between(start_of_range, end_of_range)
+        with track_time("get_available_slots"):
+            return get_available_slots_for_range(start_date, end_date, existing, service_duration_minutes)
+
+    rows = resource_interval_rows_between(start_of_range, end_of_range)
+    with track_time("get_available_slots"):
+        rows_by_day = {}
+        for row in rows:
+            rows_by_day.setdefault(row[1].date(), []).append(row)
+        slots_by_day = {}
+        current_date = start_date
+        while current_date <= end_date:
+            by_resource, shared = group_by_resource(rows_by_day.get(current_date, ()))
+            slots_by_day[current_date.strftime("%Y-%m-%d")] = available_slots_for_resources(
+                current_date, resources, by_resource, shared, service_duration_minutes
+            )
+            current_date += timedelta(days=1)
+    return slots_by_day
+
+def _longest_gaps(start_date, end_date):
+    """{date: longest free gap in minutes} for every day in the range, from a single appointments query."""
+    start_of_range = datetime.combine(start_date, datetime.min.time())
+    end_of_range = datetime.combine(end_date, datetime.max.time())
+    resources = active_resources()
+    gaps = {}
+    if not resources:
+        appointments_by_day = {}
+        for start_dt, duration in appointment_intervals_between(start_of_range, end_of_range):
+            appointments_by_day.setdefault(start_dt.date(), []).append((start_dt, duration))
+        current_date = start_date
+        while current_date <= end_date:
+            gaps[current_date] = longest_free_gap(current_date, appointments_by_day.get(current_date, ()))
+            current_date += timedelta(days=1)
+        return gaps
+
+    rows_by_day = {}
+    for row in resource_interval_rows_between(start_of_range, end_of_range):
+        rows_by_day.setdefault(row[1].date(), []).append(row)
+    current_date = start_date
+    while current_date <= end_date:
+        by_resource, shared = group_by_resource(rows_by_day.get(current_date, ()))
+        gaps[current_date] = longest_free_gap_for_resources(current_date, resources, by_resource, shared)
+        current_date += timedelta(days=1)
+    return gaps
+
+def day_gap_summaries(start_date, end_date, versions):
+    """
+    Longest free gap per day, served from the slot cache; missing days cost one query for their span.
+    versions: date_versions() of every day in the range.
+    """
+    summaries = {}
+    missing_dates = []
+    current_date = start_date
+    while current_date <= end_date:
+        cached = slot_cache.get((current_date.isoformat(), LONGEST_GAP_KEY), versions[current_date.isoformat()])
+        if cached is None:
+            missing_dates.append(current_date)
+        else:
+            summaries[current_date] = cached[0]
+        current_date += timedelta(days=1)
+
+    if missing_dates:
+        computed = _longest_gaps(missing_dates[0], missing_dates[-1])
+        for missing_date in missing_dates:
+            summaries[missing_date] = computed[missing_date]
+            # The cache stores sequences (slot lists); the summary is wrapped as a 1-tuple
+            slot_cache.set((missing_date.isoformat(), LONGEST_GAP_KEY), (computed[missing_date],), versions[missing_date.isoformat()])
+    return summaries
+
+def next_available(after_dt, service_duration_minutes, limit, horizon_days):
+    """
+    The first `limit` free starts strictly after after_dt, searching at most horizon_days
+    days ahead. Returns [(date, "HH:MM")] in chronological order.
+    """
+    found = []
+    first_date = after_dt.date()
+    last_date = first_date + timedelta(days=horizon_days - 1)
+    after_time = after_dt.strftime("%H:%M")
+    window_start = first_date
+    while window_start <= last_date:
+        window_end = min(window_start + timedelta(days=SEARCH_WINDOW_DAYS - 1), last_date)
+        versions = date_versions(
+            (window_start + timedelta(days=offset)).isoformat() for offset in range((window_end - window_start).days + 1)
+        )
+        gaps = day_gap_summaries(window_start, window_end, versions)
+        for candidate_date in sorted(gaps):
+            if gaps[candidate_date] < service_duration_minutes:
+                continue # Full or closed: no slot can fit, skip without generating slots
+            slots = cached_available_slots(
+                candidate_date,
+                service_duration_minutes,
+                lambda: day_slots(candidate_date, service_duration_minutes),
+                versions[candidate_date.isoformat()]
+            )
+            for time_str in slots:
+                if candidate_date == first_date and time_str <= after_time:
+                    continue
+                found.append((candidate_date, time_str))
+                if len(found) == limit:
+                    return found
+        window_start = window_end + timedelta(days=1)
+    return found
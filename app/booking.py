@@ -0,0 +1,81 @@
+from datetime import timedelta
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Appointment, AppointmentSlot
+from app.notifications import enqueue_appointment_notifications
+from app.queries import active_resources, day_bounds, has_overlapping_appointment, resource_interval_rows_between
+from app.utils.occupancy import group_by_resource, pick_resource
+from app.utils.scheduling import get_available_slots, occupied_units
+
+class BookingConflict(Exception):
+    """Raised when the requested time is not (or no longer) available."""
+
+def book_appointment_atomic(user_id, service, appointment_dt):
+    """
+    Checks availability and inserts the appointment in a single transaction.
+
+    The requested start must be a valid slot for the service on an empty day (business
+    hours and slot grid), and no stored appointment may overlap it; the overlap check is
+    one indexed range query run with SELECT ... FOR UPDATE where supported. The
+    appointment is then inserted together with one AppointmentSlot row per occupied
+    5-minute unit. If a concurrent request committed an overlapping booking first, the
+    unique constraint on AppointmentSlot (resource_key, slot_time) rejects the insert
+    and BookingConflict is raised right away; the caller does not need to re-query.
+
+    When chairs/barbers are configured, the day's appointments are read (FOR UPDATE)
+    and the best-fitting free resource is assigned (app.utils.occupancy.pick_resource).
+    """
+    date_str = appointment_dt.strftime("%Y-%m-%d")
+    time_str = appointment_dt.strftime("%H:%M")
+    try:
+        end_dt = appointment_dt + timedelta(minutes=service.duration_minutes)
+        resources = active_resources()
+        if resources:
+            rows = resource_interval_rows_between(*day_bounds(appointment_dt.date()), for_update=True)
+            by_resource, shared = group_by_resource(rows)
+            resource_id = pick_resource(appointment_dt, service.duration_minutes, resources, by_resource, shared)
+            if resource_id is None:
+                raise BookingConflict("The selected time slot is no longer available or invalid for the chosen service.")
+        else:
+            resource_id = None
+            if time_str not in get_available_slots(date_str, [], service.duration_minutes):
+                raise BookingConflict("The selected time slot is invalid for the chosen service.")
+            if has_overlapping_appointment(appointment_dt, end_dt, for_update=True):
+                raise BookingConflict("The selected time slot is no longer available.")
+
+        new_appointment = Appointment(
+            user_id=user_id,
+            service_id=service.id,
+            resource_id=resource_id,
+            appointment_time=appointment_dt,
+            end_time=end_dt,
+            status="Scheduled",
+            price=service.price
+        )
+        new_appointment.occupied_slots = [
+            AppointmentSlot(resource_key=resource_id or 0, slot_time=unit_start)
+            for unit_start in occupied_units(appointment_dt, service.duration_minutes)
+        ]
+        db.session.add(new_appointment)
+        db.session.flush()
+        # Confirmation and reminder commit atomically with the appointment (outbox)
+        enqueue_appointment_notifications(new_appointment)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        raise BookingConflict("The selected time slot was just booked by someone else.")
+    except BookingConflict:
+        db.session.rollback()
+        raise
+    return new_appointment
+
+def cancel_appointment(appointment):
+    """
+    Cancels a booking and deletes its AppointmentSlot guard rows, so the time can be
+    booked again. The freed interval is offered to the waitlist in the same transaction
+    (app/waitlist.py).
+    """
+    # Slots before status: loading the collection autoflushes (see waitlist._release)
+    appointment.occupied_slots = []
+    appointment.status = "Cancelled"
+    db.session.commit()
@@ -0,0 +1,84 @@
+from sqlalchemy import event, inspect
+from app import db
+from app.models import Appointment, Service, User, CalendarMonthVersion
+from app.utils.upsert import upsert_increment
+
+# Month calendar payloads and the change versions behind their ETags.
+# Appointment writes bump the version of every month they touch; renaming a service
+# or a client bumps the shared CATALOG_KEY version, since names appear in every month.
+
+CATALOG_KEY = "*"
+
+def _bump(connection, month_key):
+    upsert_increment(connection, CalendarMonthVersion.__table__, {"month": month_key}, {"version": 1})
+
+def bump_months(connection, month_keys):
+    """Bumps several months at once, for writes that bypass the mapper events (bulk imports)."""
+    for month_key in sorted(month_keys):
+        _bump(connection, month_key)
+
+def _months_touched(target):
+    months = set()
+    if target.appointment_time is not None:
+        months.add(target.appointment_time.strftime("%Y-%m"))
+    for old_time in inspect(target).attrs.appointment_time.history.deleted or ():
+        if old_time is not None:
+            months.add(old_time.strftime("%Y-%m"))
+    return months
+
+def _appointment_changed(mapper, connection, target):
+    for month_key in sorted(_months_touched(target)):
+        _bump(connection, month_key)
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(Appointment, _event_name, _appointment_changed)
+
+@event.listens_for(Service, "after_update")
+def _service_updated(mapper, connection, target):
+    if inspect(target).attrs.name.history.has_changes():
+        _bump(connection, CATALOG_KEY)
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target):
+    if inspect(target).attrs.username.history.has_changes():
+        _bump(connection, CATALOG_KEY)
+
+def month_etag(year, month, response_format):
+    """Strong ETag for a month payload: a single primary-key lookup, no appointment rows read."""
+    month_key = f"{year:04d}-{month:02d}"
+    versions = dict(db.session.query(CalendarMonthVersion.month, CalendarMonthVersion.version).filter(
+        CalendarMonthVersion.month.in_((month_key, CATALOG_KEY))
+    ).all())
+    return f"cal-{month_key}-v{versions.get(month_key, 0)}-c{versions.get(CATALOG_KEY, 0)}-{response_format}"
+
+def compact_month_payload(year, month, rows):
+    """
+    Columnar month payload: one array per field plus service/client lookup tables,
+    so repeated names are sent once. rows come from app.queries.calendar_rows_between.
+    """
+    services, service_index = [], {}
+    clients, client_index = [], {}
+    columns = {"id": [], "day": [], "minute": [], "service": [], "client": [], "user_id": []}
+    for row in rows:
+        service_name = row.service_name or "Unknown Service"
+        client_name = row.client_name or "Unknown Client"
+        if service_name not in service_index:
+            service_index[service_name] = len(services)
+            services.append(service_name)
+        if client_name not in client_index:
+            client_index[client_name] = len(clients)
+            clients.append(client_name)
+        columns["id"].append(row.id)
+        columns["day"].append(row.appointment_time.day)
+        columns["minute"].append(row.appointment_time.hour * 60 + row.appointment_time.minute)
+        columns["service"].append(service_index[service_name])
+        columns["client"].append(client_index[client_name])
+        columns["user_id"].append(row.user_id)
+    return {
+        "format": "compact",
+        "year": year,
+        "month": month,
+        "services": services,
+        "clients": clients,
+        "columns": columns
+    }
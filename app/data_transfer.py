@@ -0,0 +1,415 @@
+import csv
+import json
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import islice
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, text
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.calendar_feed import bump_months
+from app.models import Appointment, AppointmentSlot, Resource, Service, User, NON_BLOCKING_STATUSES
+from app.queries import intervals_conflict, overlapping_intervals
+from app.reporting import rebuild_rollups
+from app.utils.availability_cache import bump_all_dates
+from app.utils.page_cache import bump_namespaces, page_cache, SERVICES_NAMESPACE
+from app.utils.scheduling import occupied_units
+
+# Bulk import/export of users, services and appointments (CSV or NDJSON).
+# Imports stream the input in chunks; each chunk is validated in memory and written
+# with Core executemany inserts in its own transaction, so a bad row is rejected
+# without aborting the run and memory stays bounded. Core inserts bypass the mapper
+# events, so everything those events maintain is brought up to date once at the end:
+# end_time and the AppointmentSlot guard rows are written with each chunk, and the
+# reporting rollups, calendar month and availability versions and caches are refreshed
+# after the last chunk. Imported appointments do not enqueue notifications.
+
+IMPORT_CHUNK_SIZE = 5000
+EXPORT_BATCH_SIZE = 5000
+
+COLUMNS = {
+    "users": ("id", "username", "email", "phone", "password_hash"),
+    "services": ("id", "name", "price", "duration_minutes"),
+    "appointments": ("id", "user_id", "service_id", "resource_id", "appointment_time", "end_time", "status", "price")
+}
+
+class RowRejected(Exception):
+    """The input row is invalid; it is skipped and reported."""
+
+# --- Input/output ---
+
+def _detect_format(path, fmt):
+    if fmt:
+        return fmt
+    return "csv" if path.endswith(".csv") else "ndjson"
+
+def read_records(stream, fmt):
+    """Yields (line number, dict) from a CSV (with header) or NDJSON stream."""
+    if fmt == "csv":
+        for line_number, record in enumerate(csv.DictReader(stream), start=2):
+            yield line_number, record
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if line.strip():
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as e:
+                yield line_number, {"__error__": f"invalid JSON: {e}"}
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+class Progress:
+    """Prints rows processed and rows/sec to stderr after every chunk."""
+
+    def __init__(self, label):
+        self.label = label
+        self.started = time.perf_counter()
+        self.read = 0
+        self.written = 0
+        self.rejected = 0
+
+    def update(self, read, written, rejected):
+        self.read += read
+        self.written += written
+        self.rejected += rejected
+        click.echo(f"{self.label}: {self.read} read, {self.written} written, {self.rejected} rejected ({self.rate():,.0f} rows/s)", err=True)
+
+    def rate(self):
+        return self.read / max(time.perf_counter() - self.started, 1e-9)
+
+    def summary(self):
+        return f"{self.label}: {self.written} written, {self.rejected} rejected in {time.perf_counter() - self.started:.1f}s ({self.rate():,.0f} rows/s)"
+
+# --- Field parsing ---
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+def _required(record, field):
+    value = record.get(field)
+    if _blank(value):
+        raise RowRejected(f"missing {field}")
+    return value.strip() if isinstance(value, str) else value
+
+def _optional_int(record, field):
+    value = record.get(field)
+    if _blank(value):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowRejected(f"invalid {field}: {value!r}")
+
+def _optional_float(record, field):
+    value = record.get(field)
+    if _blank(value):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise RowRejected(f"invalid {field}: {value!r}")
+
+def _required_int(record, field):
+    value = _optional_int(record, field)
+    if value is None:
+        raise RowRejected(f"missing {field}")
+    return value
+
+def _datetime(record, field, required=True):
+    value = record.get(field)
+    if _blank(value):
+        if required:
+            raise RowRejected(f"missing {field}")
+        return None
+    try:
+        return datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        raise RowRejected(f"invalid {field}: {value!r}")
+
+# --- Importers: clean(record) -> row dict, one instance per run ---
+
+class UserImporter:
+    table = User.__table__
+
+    def __init__(self):
+        self.usernames = {username for username, in db.session.query(User.username)}
+        self.emails = {email for email, in db.session.query(User.email)}
+
+    def clean(self, record):
+        username = _required(record, "username")
+        email = _required(record, "email").lower()
+        if username in self.usernames:
+            raise RowRejected(f"duplicate username: {username}")
+        if email in self.emails:
+            raise RowRejected(f"duplicate email: {email}")
+        self.usernames.add(username)
+        self.emails.add(email)
+        return {
+            "id": _optional_int(record, "id"),
+            "username": username,
+            "email": email,
+            "phone": record.get("phone") or None,
+            "password_hash": record.get("password_hash") or None
+        }
+
+    def write(self, connection, rows):
+        _insert_rows(connection, self.table, rows)
+
+class ServiceImporter:
+    table = Service.__table__
+
+    def clean(self, record):
+        try:
+            price = float(_required(record, "price"))
+        except ValueError:
+            raise RowRejected(f"invalid price: {record.get('price')!r}")
+        duration_minutes = _optional_int(record, "duration_minutes") or 30
+        if duration_minutes <= 0:
+            raise RowRejected("duration_minutes must be positive")
+        return {"id": _optional_int(record, "id"), "name": _required(record, "name"), "price": price, "duration_minutes": duration_minutes}
+
+    def write(self, connection, rows):
+        _insert_rows(connection, self.table, rows)
+
+class AppointmentImporter:
+    """
+    Validates references and overlaps. A blocking row is rejected when it overlaps a
+    blocking appointment, stored or earlier in the input, under the booking rule
+    (app.queries.overlapping_appointments): same resource, or either one without a
+    resource, since those block every chair. Stored appointments are loaded per chunk
+    for the chunk's time span, so rows stored without guard rows count too. A row is
+    also rejected when its guard rows would collide with stored ones (the
+    AppointmentSlot unique constraint), which would otherwise roll back the chunk.
+    """
+    table = Appointment.__table__
+
+    def __init__(self):
+        self.user_ids = {user_id for user_id, in db.session.query(User.id)}
+        self.durations = dict(db.session.query(Service.id, Service.duration_minutes).all())
+        self.prices = dict(db.session.query(Service.id, Service.price).all())
+        self.resource_ids = {resource_id for resource_id, in db.session.query(Resource.id)}
+        self.next_id = (db.session.query(func.max(Appointment.id)).scalar() or 0) + 1
+        self.months = set()
+
+    def clean(self, record):
+        user_id = _required_int(record, "user_id")
+        service_id = _required_int(record, "service_id")
+        resource_id = _optional_int(record, "resource_id")
+        if user_id not in self.user_ids:
+            raise RowRejected(f"unknown user_id {user_id}")
+        if service_id not in self.durations:
+            raise RowRejected(f"unknown service_id {service_id}")
+        if resource_id is not None and resource_id not in self.resource_ids:
+            raise RowRejected(f"unknown resource_id {resource_id}")
+        appointment_time = _datetime(record, "appointment_time")
+        end_time = _datetime(record, "end_time", required=False) or (
+            appointment_time + timedelta(minutes=self.durations[service_id])
+        )
+        if end_time <= appointment_time:
+            raise RowRejected("end_time must be after appointment_time")
+        # Exports carry the price charged; rows without one are priced like a new booking
+        price = _optional_float(record, "price")
+        if price is None:
+            price = self.prices[service_id]
+        appointment_id = _optional_int(record, "id")
+        if appointment_id is None:
+            appointment_id = self.next_id
+        self.next_id = max(self.next_id, appointment_id + 1)
+        return {
+            "id": appointment_id,
+            "user_id": user_id,
+            "service_id": service_id,
+            "resource_id": resource_id,
+            "appointment_time": appointment_time,
+            "end_time": end_time,
+            "status": (record.get("status") or "Scheduled").strip(),
+            "price": price
+        }
+
+    def filter_overlaps(self, connection, rows):
+        """Splits rows into (accepted rows with their guard rows, [(row, reason)])."""
+        blocking = [row for row in rows if row["status"] not in NON_BLOCKING_STATUSES]
+        # day -> {resource_id: [(start, end)]}; appointments never span midnight
+        intervals = defaultdict(lambda: defaultdict(list))
+        taken = set()
+        if blocking:
+            span_start = min(row["appointment_time"] for row in blocking)
+            span_end = max(row["end_time"] for row in blocking)
+            for resource_id, start, end in connection.execute(overlapping_intervals(span_start, span_end)):
+                intervals[start.date()][resource_id].append((start, end))
+            taken = set(connection.execute(
+                AppointmentSlot.__table__.select().with_only_columns(
+                    AppointmentSlot.resource_key, AppointmentSlot.slot_time
+                ).where(AppointmentSlot.slot_time >= span_start - timedelta(minutes=5), AppointmentSlot.slot_time < span_end)
+            ).all())
+
+        accepted, slot_rows, rejected = [], [], []
+        for row in rows:
+            if row["status"] in NON_BLOCKING_STATUSES:
+                accepted.append(row)
+                continue
+            start, end, resource_id = row["appointment_time"], row["end_time"], row["resource_id"]
+            day = intervals[start.date()]
+            candidates = day if resource_id is None else (resource_id, None)
+            if any(
+                intervals_conflict(start, end, resource_id, other_start, other_end, other_resource_id)
+                for other_resource_id in candidates
+                for other_start, other_end in day.get(other_resource_id, ())
+            ):
+                rejected.append((row, "overlaps another appointment of the same resource or a shared one"))
+                continue
+            resource_key = resource_id or 0
+            duration_minutes = (end - start) // timedelta(minutes=1)
+            units = [(resource_key, unit) for unit in occupied_units(start, duration_minutes)]
+            if any(unit in taken for unit in units):
+                rejected.append((row, "overlaps the guard rows of another appointment of the same resource"))
+                continue
+            day[resource_id].append((start, end))
+            taken.update(units)
+            accepted.append(row)
+            slot_rows.extend({"appointment_id": row["id"], "resource_key": key, "slot_time": unit} for key, unit in units)
+        return accepted, slot_rows, rejected
+
+    def write(self, connection, rows):
+        accepted, slot_rows, rejected = self.filter_overlaps(connection, rows)
+        _insert_rows(connection, self.table, accepted)
+        _insert_rows(connection, AppointmentSlot.__table__, slot_rows)
+        self.months.update(row["appointment_time"].strftime("%Y-%m") for row in accepted)
+        return rejected
+
+IMPORTERS = {"users": UserImporter, "services": ServiceImporter, "appointments": AppointmentImporter}
+
+def _insert_rows(connection, table, rows):
+    if not rows:
+        return
+    # Rows without an id let the database assign one; executemany needs uniform keys
+    with_id = [row for row in rows if row.get("id") is not None]
+    without_id = [{key: value for key, value in row.items() if key != "id"} for row in rows if row.get("id") is None]
+    if with_id:
+        connection.execute(table.insert(), with_id)
+    if without_id:
+        connection.execute(table.insert(), without_id)
+
+def _reset_sequence(connection, table):
+    # Explicit ids do not advance PostgreSQL sequences; later inserts would collide
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', 'id'), COALESCE((SELECT MAX(id) FROM \"{table.name}\"), 1))"
+        ))
+
+def import_records(entity, records, chunk_size=IMPORT_CHUNK_SIZE, rejects=None):
+    """
+    Imports (line number, record) pairs for entity in chunked transactions.
+    rejects: optional file object receiving one NDJSON line per rejected record.
+    Returns the Progress with the final counts.
+    """
+    importer = IMPORTERS[entity]()
+    db.session.close() # lookups are loaded; release the connection before writing with the engine
+    progress = Progress(entity)
+
+    def reject(line_number, record, reason):
+        if rejects is not None:
+            rejects.write(json.dumps({"line": line_number, "reason": reason, "record": record}, default=str) + "\n")
+
+    for chunk in _chunks(records, chunk_size):
+        rows, lines, rejected_count = [], {}, 0
+        for line_number, record in chunk:
+            try:
+                if "__error__" in record:
+                    raise RowRejected(record["__error__"])
+                row = importer.clean(record)
+            except RowRejected as e:
+                reject(line_number, record, str(e))
+                rejected_count += 1
+                continue
+            lines[id(row)] = (line_number, record)
+            rows.append(row)
+        try:
+            with db.engine.begin() as connection:
+                write_rejects = importer.write(connection, rows) or []
+        except IntegrityError as e:
+            # A constraint the in-memory checks cannot see (e.g. an id already in use):
+            # the chunk's transaction is rolled back and all of its rows are reported
+            write_rejects = [(row, f"chunk rolled back: {e.orig}") for row in rows]
+        for row, reason in write_rejects:
+            reject(*lines[id(row)], reason)
+        progress.update(len(chunk), len(rows) - len(write_rejects), rejected_count + len(write_rejects))
+
+    with db.engine.begin() as connection:
+        _reset_sequence(connection, importer.table)
+        if entity == "appointments":
+            _reset_sequence(connection, AppointmentSlot.__table__)
+            bump_months(connection, importer.months)
+            bump_all_dates(connection) # drops cached availability in every worker
+        if entity == "services":
+            bump_namespaces(connection, [SERVICES_NAMESPACE]) # and the cached service pages
+    if entity == "appointments":
+        rebuild_rollups()
+    if entity == "services":
+        page_cache.forget_versions([SERVICES_NAMESPACE]) # this process too, without waiting for the version TTL
+    return progress
+
+def iter_export_rows(entity, batch_size=EXPORT_BATCH_SIZE):
+    """Yields dicts with the COLUMNS of entity, in id order, fetched with yield_per."""
+    model = {"users": User, "services": Service, "appointments": Appointment}[entity]
+    columns = [getattr(model, name) for name in COLUMNS[entity]]
+    query = db.session.query(*columns).order_by(model.id).execution_options(yield_per=batch_size)
+    for row in query:
+        yield {
+            name: value.isoformat() if isinstance(value, datetime) else value
+            for name, value in zip(COLUMNS[entity], row)
+        }
+
+# --- CLI ---
+
+data_cli = AppGroup("data", help="Bulk import/export of users, services and appointments.")
+
+@data_cli.command("import")
+@click.argument("entity", type=click.Choice(list(IMPORTERS)))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), help="Default: from the file extension (.csv, else NDJSON).")
+@click.option("--chunk-size", default=IMPORT_CHUNK_SIZE, show_default=True, help="Rows per transaction.")
+@click.option("--rejects", "rejects_path", type=click.Path(dir_okay=False), help="Write rejected rows (NDJSON) to this file.")
+def import_command(entity, path, fmt, chunk_size, rejects_path):
+    """Import users, services or appointments (import them in that order)."""
+    fmt = _detect_format(path, fmt)
+    rejects = open(rejects_path, "w", encoding="utf-8") if rejects_path else None
+    try:
+        with click.open_file(path, "r", encoding="utf-8", newline="") as stream:
+            progress = import_records(entity, read_records(stream, fmt), chunk_size, rejects)
+    finally:
+        if rejects is not None:
+            rejects.close()
+    click.echo(progress.summary())
+
+@data_cli.command("export")
+@click.argument("entity", type=click.Choice(list(COLUMNS)))
+@click.argument("path", type=click.Path(dir_okay=False, allow_dash=True), default="-")
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), help="Default: from the file extension (.csv, else NDJSON).")
+def export_command(entity, path, fmt):
+    """Export users, services or appointments in the format accepted by `data import`."""
+    fmt = _detect_format(path, fmt)
+    progress = Progress(entity)
+    with click.open_file(path, "w", encoding="utf-8", newline="") as stream:
+        writer = csv.DictWriter(stream, fieldnames=COLUMNS[entity]) if fmt == "csv" else None
+        if writer is not None:
+            writer.writeheader()
+        count = 0
+        for row in iter_export_rows(entity):
+            if writer is not None:
+                writer.writerow(row)
+            else:
+                stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+            if count % EXPORT_BATCH_SIZE == 0:
+                progress.update(EXPORT_BATCH_SIZE, EXPORT_BATCH_SIZE, 0)
+        progress.update(count % EXPORT_BATCH_SIZE, count % EXPORT_BATCH_SIZE, 0)
+    click.echo(progress.summary(), err=path == "-")
@@ -1,13 +1,36 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField
-from wtforms.validators import DataRequired
+from wtforms import StringField, PasswordField, BooleanField, SubmitField, SelectField, DateField, TimeField
+from wtforms.validators import DataRequired, Email, Length, ValidationError
+from app.passwords import MAX_PASSWORD_BYTES
+
+class MaxBytes:
+    """Limits the UTF-8 encoded length of a field; Length counts characters."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+
+    def __call__(self, form, field):
+        if field.data and len(field.data.encode('utf-8')) > self.max_bytes:
+            raise ValidationError(
+                f'Field must be at most {self.max_bytes} bytes long (accented letters and emoji count as more than one).'
+            )
 
 class LoginForm(FlaskForm):
-    username = StringField('Username', validators=[DataRequired()])
+    email = StringField('Email', validators=[DataRequired(), Email()])
     password = PasswordField('Password', validators=[DataRequired()])
+    remember_me = BooleanField('Remember Me')
     submit = SubmitField('Login')
 
 class RegistrationForm(FlaskForm):
-    username = StringField('Username', validators=[DataRequired()])
-    password = PasswordField('Password', validators=[DataRequired()])
+    username = StringField('Username', validators=[DataRequired(), Length(max=64)])
+    email = StringField('Email', validators=[DataRequired(), Email(), Length(max=120)])
+    # bcrypt only reads the first 72 bytes of a password and bcrypt >= 5 rejects longer ones
+    password = PasswordField('Password', validators=[DataRequired(), Length(min=8), MaxBytes(MAX_PASSWORD_BYTES)])
     submit = SubmitField('Register')
+
+class AppointmentForm(FlaskForm):
+    # Choices are filled in by the view from the services table
+    service_id = SelectField('Service', coerce=int, validators=[DataRequired()])
+    date = DateField('Date', validators=[DataRequired()])
+    time = TimeField('Time', validators=[DataRequired()])
+    submit = SubmitField('Book')
@@ -0,0 +1,304 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request instrumentation, exported in the Prometheus text format at /metrics.
+# Each request records its latency, the number of SQL statements and the time spent in
+# them (cursor execute events), and the time spent computing availability (track_time
+# around the slot engine). Requests slower than SLOW_REQUEST_MS are logged with their
+# statements. The hot path is a few perf_counter() calls and one lock acquisition per
+# request; statements are kept by reference only, so it can stay on in production.
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Statements kept per request for the slow-request log
+MAX_RECORDED_STATEMENTS = 50
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {} # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def snapshot(self):
+        return [[list(labels), list(series)] for labels, series in self._series.items()]
+
+    def merge(self, snapshot):
+        for labels, values in snapshot:
+            series = self._series.setdefault(tuple(labels), [0] * (len(self.buckets) + 1) + [0.0])
+            for i, value in enumerate(values):
+                series[i] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return lines
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+
+    def inc(self, labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def snapshot(self):
+        return [[list(labels), value] for labels, value in self._values.items()]
+
+    def merge(self, snapshot):
+        for labels, value in snapshot:
+            self.inc(tuple(labels), value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            lines.append(f"{self.name}{{{label_text}}} {value:g}" if label_text else f"{self.name} {value:g}")
+        return lines
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class RequestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_duration = Histogram(
+            "http_request_duration_seconds", "Request latency by endpoint.", ("endpoint", "method", "status"), LATENCY_BUCKETS
+        )
+        self.request_queries = Histogram(
+            "http_request_sql_statements", "SQL statements executed per request.", ("endpoint",), QUERY_COUNT_BUCKETS
+        )
+        self.sql_seconds = Counter("http_request_sql_seconds_total", "Time spent in SQL statements.", ("endpoint",))
+        self.section_seconds = Histogram(
+            "code_section_duration_seconds", "Time spent in instrumented code sections per request.", ("endpoint", "section"), LATENCY_BUCKETS
+        )
+        self.slow_requests = Counter("http_slow_requests_total", "Requests slower than SLOW_REQUEST_MS.", ("endpoint",))
+
+    def record(self, endpoint, method, status, duration, query_count, sql_seconds, sections, slow):
+        with self._lock:
+            self.request_duration.observe((endpoint, method, status), duration)
+            self.request_queries.observe((endpoint,), query_count)
+            self.sql_seconds.inc((endpoint,), sql_seconds)
+            for section, seconds in sections.items():
+                self.section_seconds.observe((endpoint, section), seconds)
+            if slow:
+                self.slow_requests.inc((endpoint,))
+
+    def _metrics(self):
+        return (self.request_duration, self.request_queries, self.sql_seconds, self.section_seconds, self.slow_requests)
+
+    def snapshot(self):
+        with self._lock:
+            return {metric.name: metric.snapshot() for metric in self._metrics()}
+
+    def merge(self, snapshot):
+        with self._lock:
+            for metric in self._metrics():
+                metric.merge(snapshot.get(metric.name, ()))
+
+    def render(self, extra_lines=()):
+        with self._lock:
+            lines = []
+            for metric in self._metrics():
+                lines.extend(metric.render())
+        lines.extend(extra_lines)
+        return "\n".join(lines) + "\n"
+
+request_metrics = RequestMetrics()
+
+class MultiprocessStore:
+    """
+    One JSON snapshot per worker in a shared directory. extra_stats returns a dict of
+    numbers (e.g. the slot cache stats) that are summed across workers as well.
+    """
+
+    def __init__(self, directory, flush_seconds, registry, extra_stats=dict, worker_id=None):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.registry = registry
+        self.extra_stats = extra_stats
+        self.worker_id = worker_id
+        self._flushed_at = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _worker_id(self):
+        # Resolved at write time: a preloaded app is created before the workers fork
+        return self.worker_id or str(os.getpid())
+
+    def _path(self, worker_id):
+        return os.path.join(self.directory, f"worker-{worker_id}.json")
+
+    def _snapshot(self):
+        return {"metrics": self.registry.snapshot(), "extra": self.extra_stats()}
+
+    def maybe_flush(self):
+        now = time.monotonic()
+        if now - self._flushed_at >= self.flush_seconds:
+            self._flushed_at = now
+            self.flush()
+
+    def flush(self):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._snapshot(), f)
+        os.replace(temp_path, self._path(self._worker_id()))
+
+    def collect(self):
+        """Returns (registry summed over all workers, summed extra stats)."""
+        own_path = self._path(self._worker_id())
+        snapshots = [self._snapshot()]
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".json") or path == own_path:
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError): # being replaced or truncated; skip it this scrape
+                logger.warning("Skipping unreadable metrics snapshot %s", path)
+        merged, extra = RequestMetrics(), {}
+        for snapshot in snapshots:
+            merged.merge(snapshot["metrics"])
+            for key, value in snapshot["extra"].items():
+                extra[key] = extra.get(key, 0) + value
+        return merged, extra
+
+class _RequestState:
+    __slots__ = ("started", "query_count", "sql_seconds", "statements", "sections")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.sql_seconds = 0.0
+        self.statements = []
+        self.sections = {}
+
+def _current_state():
+    if not has_request_context():
+        return None
+    return g.get("_request_metrics")
+
+@contextmanager
+def track_time(section):
+    """Adds the time spent in the block to the current request's `section` (no-op outside requests)."""
+    state = _current_state()
+    if state is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        state.sections[section] = state.sections.get(section, 0.0) + time.perf_counter() - started
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_metrics_query_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_stack = conn.info.get("_metrics_query_started")
+    if not started_stack:
+        return
+    elapsed = time.perf_counter() - started_stack.pop()
+    state = _current_state()
+    if state is None:
+        return
+    state.query_count += 1
+    state.sql_seconds += elapsed
+    if len(state.statements) < MAX_RECORDED_STATEMENTS:
+        state.statements.append((elapsed, statement))
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    started_stack = connection.info.get("_metrics_query_started") if connection is not None else None
+    if started_stack:
+        started_stack.pop()
+
+def _endpoint_label():
+    # The URL rule, not the path, so label cardinality stays bounded
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+def metrics_store():
+    """The current app's MultiprocessStore, or None when metrics are per process."""
+    return current_app.extensions.get("metrics_store")
+
+def init_metrics(app):
+    if not app.config["METRICS_ENABLED"]:
+        return
+    slow_seconds = app.config["SLOW_REQUEST_MS"] / 1000
+    store = None
+    if app.config["METRICS_MULTIPROC_DIR"]:
+        store = MultiprocessStore(
+            app.config["METRICS_MULTIPROC_DIR"], app.config["METRICS_FLUSH_SECONDS"], request_metrics,
+            extra_stats=lambda: app.extensions["slot_cache"].stats()
+        )
+        app.extensions["metrics_store"] = store
+
+    @app.before_request
+    def _start_request_metrics():
+        g._request_metrics = _RequestState()
+
+    @app.after_request
+    def _record_request_metrics(response):
+        state = g.pop("_request_metrics", None)
+        if state is None:
+            return response
+        duration = time.perf_counter() - state.started
+        endpoint = _endpoint_label()
+        slow = duration >= slow_seconds
+        request_metrics.record(
+            endpoint, request.method, str(response.status_code), duration,
+            state.query_count, state.sql_seconds, state.sections, slow
+        )
+        if slow:
+            _log_slow_request(endpoint, duration, state)
+        if store is not None:
+            store.maybe_flush()
+        return response
+
+def _log_slow_request(endpoint, duration, state):
+    statements = "\n".join(
+        f"    {elapsed * 1000:8.1f} ms  {' '.join(statement.split())[:300]}"
+        for elapsed, statement in state.statements
+    )
+    sections = ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in state.sections.items())
+    logger.warning(
+        "Slow request %s %s (%s): %.1f ms, %d SQL statements in %.1f ms%s\n%s",
+        request.method, request.path, endpoint, duration * 1000, state.query_count, state.sql_seconds * 1000,
+        f", {sections}" if sections else "", statements
+    )
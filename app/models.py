@@ -1,12 +1,45 @@
-from app import db
+from datetime import datetime, timedelta
+from flask_login import UserMixin
+from sqlalchemy import event, inspect, select
+from app import db, login_manager
+from app.passwords import get_password_hasher
 
-class User(db.Model):
+@login_manager.user_loader
+def load_user(user_id):
+    # Session values are client-supplied; an unknown or malformed id means "not logged in"
+    try:
+        return db.session.get(User, int(user_id))
+    except (TypeError, ValueError):
+        return None
+
+class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
+    phone = db.Column(db.String(32)) # E.164, used for WhatsApp notifications
+    password_hash = db.Column(db.String(60)) # bcrypt, see app/passwords.py
 
     appointments = db.relationship('Appointment', backref='customer', lazy=True)
 
+    def set_password(self, password):
+        self.password_hash = get_password_hasher().hash(password)
+
+    def check_password(self, password):
+        """
+        Verifies password against the stored hash. On success, a hash made with a different
+        cost than BCRYPT_LOG_ROUNDS is replaced; the caller commits the session.
+        Raises app.passwords.HasherBusy when the hashing queue is full.
+        """
+        hasher = get_password_hasher()
+        if not hasher.verify(password, self.password_hash):
+            return False
+        if hasher.needs_rehash(self.password_hash):
+            try:
+                self.password_hash = hasher.hash(password)
+            except ValueError:
+                pass # over 72 bytes, accepted by an older bcrypt; keep the existing hash
+        return True
+
 class Service(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -15,9 +48,167 @@ class Service(db.Model):
 
     appointments = db.relationship('Appointment', backref='service', lazy=True)
 
+class Resource(db.Model):
+    # A chair/barber that serves one appointment at a time. business_hours optionally
+    # overrides BUSINESS_HOURS per weekday, e.g. {"saturday": [["09:00", "13:00"]]}.
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), unique=True, nullable=False)
+    active = db.Column(db.Boolean, nullable=False, default=True)
+    business_hours = db.Column(db.JSON)
+
+    appointments = db.relationship('Appointment', backref='resource', lazy=True)
+
+# Appointment statuses that no longer occupy the chair: they are left out of availability
+# and overlap checks, and their AppointmentSlot guard rows are released.
+NON_BLOCKING_STATUSES = ("Cancelled", "Expired")
+
 class Appointment(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # active_history: the write events (waitlist, caches, rollups) need the previous value
+    # even when the attribute was expired (e.g. after a commit) before being changed.
+    service_id = db.column_property(db.Column(db.Integer, db.ForeignKey('service.id'), nullable=False), active_history=True)
+    # Chair/barber serving the appointment; NULL for single-resource shops and for
+    # appointments booked before resources were configured (these block every resource).
+    resource_id = db.column_property(db.Column(db.Integer, db.ForeignKey('resource.id')), active_history=True)
+    appointment_time = db.column_property(db.Column(db.DateTime, nullable=False), active_history=True)
+    status = db.column_property(db.Column(db.String(20), default="Scheduled"), active_history=True)
+    # Denormalized appointment_time + service duration, kept in sync on every write
+    # (see _sync_end_time) so overlap checks are a single indexed range predicate.
+    end_time = db.column_property(db.Column(db.DateTime), active_history=True)
+    # Service price when the appointment was booked (see _sync_price); revenue rollups
+    # add and subtract this amount, so later price changes do not skew them.
+    price = db.column_property(db.Column(db.Float), active_history=True)
+
+    occupied_slots = db.relationship('AppointmentSlot', backref='appointment', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_appointment_appointment_time', 'appointment_time'),
+        db.Index('ix_appointment_user_id_appointment_time', 'user_id', 'appointment_time'),
+        db.Index('ix_appointment_status_appointment_time', 'status', 'appointment_time'),
+        db.Index('ix_appointment_resource_id_appointment_time', 'resource_id', 'appointment_time'),
+    )
+
+class AppointmentSlot(db.Model):
+    # One row per occupied 5-minute unit of an appointment. The unique constraint on
+    # (resource_key, slot_time) makes the database reject overlapping bookings of the
+    # same resource, even when two requests pass the availability check at the same time.
+    # resource_key is the appointment's resource_id, or 0 when it has none (unique
+    # indexes treat NULLs as distinct, so NULL cannot be used here).
+    id = db.Column(db.Integer, primary_key=True)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id', ondelete='CASCADE'), nullable=False)
+    resource_key = db.Column(db.Integer, nullable=False, default=0)
+    slot_time = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('resource_key', 'slot_time', name='uq_appointment_slot_resource_time'),)
+
+class OutboxMessage(db.Model):
+    # Notification waiting to be delivered by `flask outbox drain` (app/notifications.py).
+    # Rows are written in the same transaction as the appointment they announce, so a
+    # notification exists if and only if the booking committed. The text is rendered at
+    # send time from the appointment, so reminders reflect later changes.
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(40), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id', ondelete='SET NULL'))
+    idempotency_key = db.Column(db.String(100), unique=True, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False)
+    claim_token = db.Column(db.String(32))
+    locked_until = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    sent_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index('ix_outbox_message_status_next_attempt_at', 'status', 'next_attempt_at'),
+        db.Index('ix_outbox_message_claim_token', 'claim_token'),
+    )
+
+class WaitlistEntry(db.Model):
+    # Customer waiting for any free start of a service between window_start and
+    # window_end (app/waitlist.py). status: waiting -> offered (a "Held" appointment is
+    # reserved until hold_expires_at) -> booked | declined | expired; or cancelled by the
+    # customer.
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     service_id = db.Column(db.Integer, db.ForeignKey('service.id'), nullable=False)
-    appointment_time = db.Column(db.DateTime, nullable=False)
-    status = db.Column(db.String(20), default="Scheduled")
+    window_start = db.Column(db.Date, nullable=False)
+    window_end = db.Column(db.Date, nullable=False)
+    duration_minutes = db.Column(db.Integer, nullable=False) # service duration when the entry was created
+    status = db.Column(db.String(20), nullable=False, default="waiting")
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id', ondelete='SET NULL')) # the hold
+    hold_expires_at = db.Column(db.DateTime)
+
+    days = db.relationship('WaitlistDay', backref='entry', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_waitlist_entry_status_hold_expires_at', 'status', 'hold_expires_at'),
+        db.Index('ix_waitlist_entry_user_id', 'user_id'),
+    )
+
+class WaitlistDay(db.Model):
+    # Matching index: one row per day of a waiting entry's window, removed when the entry
+    # stops waiting. A freed interval on day d of L minutes is matched with a range scan
+    # on (day = d, duration_minutes <= L), oldest entry first.
+    entry_id = db.Column(db.Integer, db.ForeignKey('waitlist_entry.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    duration_minutes = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_waitlist_day_day_duration_minutes_entry_id', 'day', 'duration_minutes', 'entry_id'),
+    )
+
+class DailyServiceStats(db.Model):
+    # Daily rollup per service, kept up to date incrementally by app.reporting and
+    # rebuilt from scratch with `flask reports rebuild`. Reports read only this table.
+    day = db.Column(db.Date, primary_key=True)
+    service_id = db.Column(db.Integer, db.ForeignKey('service.id'), primary_key=True)
+    bookings = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    occupied_minutes = db.Column(db.Integer, nullable=False, default=0)
+
+class CalendarMonthVersion(db.Model):
+    # Change counter per calendar month ("YYYY-MM"), bumped on every Appointment write
+    # in that month; the month calendar API derives its ETag from it.
+    month = db.Column(db.String(7), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class AvailabilityVersion(db.Model):
+    # Change counter per day ("YYYY-MM-DD", or "*" for every day), bumped in the same
+    # transaction as the write; the slot cache of every process checks it on read.
+    day = db.Column(db.String(10), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class PageCacheVersion(db.Model):
+    # Change counter per page cache namespace ("services", ...), bumped in the same
+    # transaction as the write; cached pages and fragments are keyed by it.
+    namespace = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+def _sync_end_time(mapper, connection, target):
+    state = inspect(target)
+    if target.end_time is not None and state.attrs.end_time.history.has_changes():
+        return # Set explicitly by the caller (e.g. the booking path)
+    if target.end_time is not None and not (
+        state.attrs.appointment_time.history.has_changes() or state.attrs.service_id.history.has_changes()
+    ):
+        return
+    duration_minutes = connection.scalar(select(Service.duration_minutes).where(Service.id == target.service_id))
+    target.end_time = target.appointment_time + timedelta(minutes=duration_minutes or 0)
+
+event.listen(Appointment, 'before_insert', _sync_end_time)
+event.listen(Appointment, 'before_update', _sync_end_time)
+
+def _sync_price(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.price.history.has_changes():
+        return # Set explicitly by the caller (e.g. the booking path)
+    if target.price is not None and not state.attrs.service_id.history.has_changes():
+        return
+    target.price = connection.scalar(select(Service.price).where(Service.id == target.service_id))
+
+event.listen(Appointment, 'before_insert', _sync_price)
+event.listen(Appointment, 'before_update', _sync_price)
@@ -0,0 +1,272 @@
+import base64
+import json
+import logging
+import random
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import and_, or_
+from app import db
+from app.models import Appointment, OutboxMessage, Service, User, NON_BLOCKING_STATUSES
+
+# Transactional outbox for WhatsApp notifications.
+# Booking code only inserts OutboxMessage rows (enqueue_appointment_notifications) in
+# its own transaction; `flask outbox drain` claims due rows in batches, renders and sends
+# them through a thread pool, and records the outcome with retries and backoff. The
+# sender is pluggable (NOTIFICATION_SENDER), so a local fake server can stand in for
+# Twilio via TWILIO_API_BASE_URL.
+
+logger = logging.getLogger(__name__)
+
+KIND_BOOKING_CONFIRMATION = "booking_confirmation"
+KIND_APPOINTMENT_REMINDER = "appointment_reminder"
+KIND_WAITLIST_OFFER = "waitlist_offer" # enqueued by app.waitlist when a freed time is held for a customer
+REMINDER_LEAD_TIME = timedelta(hours=24)
+
+class PermanentSendError(Exception):
+    """The provider rejected the message; retrying will not help."""
+
+class RetryableSendError(Exception):
+    """Temporary failure (network, 5xx, rate limit); the message is retried with backoff."""
+
+# --- Enqueueing (runs inside the caller's transaction) ---
+
+def enqueue_appointment_notifications(appointment, now=None):
+    """
+    Adds the booking confirmation and the 24h reminder for a flushed appointment to the
+    current session; they commit (or roll back) together with the appointment.
+    """
+    now = now or datetime.now()
+    db.session.add(OutboxMessage(
+        kind=KIND_BOOKING_CONFIRMATION,
+        user_id=appointment.user_id,
+        appointment_id=appointment.id,
+        idempotency_key=f"appointment-{appointment.id}-confirmation",
+        next_attempt_at=now
+    ))
+    reminder_at = appointment.appointment_time - REMINDER_LEAD_TIME
+    if reminder_at > now:
+        db.session.add(OutboxMessage(
+            kind=KIND_APPOINTMENT_REMINDER,
+            user_id=appointment.user_id,
+            appointment_id=appointment.id,
+            idempotency_key=f"appointment-{appointment.id}-reminder-{appointment.appointment_time:%Y%m%d%H%M}",
+            next_attempt_at=reminder_at
+        ))
+
+# --- Senders ---
+
+class LogSender:
+    """Logs messages instead of sending them (development default)."""
+
+    def send(self, to, body, idempotency_key):
+        logger.info("WhatsApp to %s [%s]: %s", to, idempotency_key, body)
+
+class TwilioSender:
+    """Sends WhatsApp messages through the Twilio Messages REST API."""
+
+    def __init__(self, account_sid, auth_token, from_number, base_url="https://api.twilio.com", timeout=10):
+        self.url = f"{base_url.rstrip('/')}/2010-04-01/Accounts/{account_sid}/Messages.json"
+        credentials = base64.b64encode(f"{account_sid}:{auth_token}".encode()).decode()
+        self.authorization = f"Basic {credentials}"
+        self.from_number = from_number
+        self.timeout = timeout
+
+    def send(self, to, body, idempotency_key):
+        data = urllib.parse.urlencode({
+            "To": f"whatsapp:{to}",
+            "From": f"whatsapp:{self.from_number}",
+            "Body": body
+        }).encode()
+        request = urllib.request.Request(self.url, data=data, method="POST", headers={
+            "Authorization": self.authorization,
+            "I-Twilio-Idempotency-Token": idempotency_key
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read() or b"{}").get("sid")
+        except urllib.error.HTTPError as e:
+            if e.code == 429 or e.code >= 500:
+                raise RetryableSendError(f"HTTP {e.code}") from e
+            raise PermanentSendError(f"HTTP {e.code}: {e.read()[:200]!r}") from e
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            raise RetryableSendError(str(e)) from e
+
+def get_sender():
+    config = current_app.config
+    if config["NOTIFICATION_SENDER"] == "twilio":
+        return TwilioSender(
+            config["TWILIO_ACCOUNT_SID"],
+            config["TWILIO_AUTH_TOKEN"],
+            config["TWILIO_WHATSAPP_FROM"],
+            base_url=config["TWILIO_API_BASE_URL"]
+        )
+    return LogSender()
+
+# --- Worker ---
+
+def backoff_delay(attempts, base_seconds, max_seconds):
+    """Exponential backoff with full jitter."""
+    return timedelta(seconds=random.uniform(0, min(max_seconds, base_seconds * 2 ** attempts)))
+
+def claim_batch(batch_size, lease_seconds, now=None):
+    """
+    Claims up to batch_size due messages for this worker and returns (claim token,
+    message ids). Also reclaims messages whose lease expired (worker died mid-send).
+    The conditional UPDATE makes concurrent workers skip rows another worker already
+    claimed; outcomes are recorded only while the row still carries the token.
+    """
+    now = now or datetime.now()
+    due = or_(
+        and_(OutboxMessage.status == "pending", OutboxMessage.next_attempt_at <= now),
+        and_(OutboxMessage.status == "sending", OutboxMessage.locked_until < now)
+    )
+    candidate_query = db.session.query(OutboxMessage.id).filter(due).order_by(OutboxMessage.next_attempt_at).limit(batch_size)
+    if db.engine.dialect.name == "postgresql":
+        candidate_query = candidate_query.with_for_update(skip_locked=True)
+    candidate_ids = [message_id for message_id, in candidate_query.all()]
+    if not candidate_ids:
+        db.session.commit()
+        return None, []
+    token = uuid.uuid4().hex
+    db.session.query(OutboxMessage).filter(OutboxMessage.id.in_(candidate_ids), due).update({
+        "status": "sending",
+        "claim_token": token,
+        "locked_until": now + timedelta(seconds=lease_seconds)
+    }, synchronize_session=False)
+    db.session.commit()
+    return token, [message_id for message_id, in db.session.query(OutboxMessage.id).filter(OutboxMessage.claim_token == token).all()]
+
+def render_message(kind, username, service_name, appointment_time):
+    when = appointment_time.strftime("%d/%m/%Y às %H:%M")
+    if kind == KIND_APPOINTMENT_REMINDER:
+        return f"Olá {username}! Lembrete: seu horário de {service_name} é amanhã, {when}."
+    if kind == KIND_WAITLIST_OFFER:
+        return f"Olá {username}! Abriu um horário de {service_name} em {when} e ele está reservado para você. Confirme no site antes que a reserva expire."
+    return f"Olá {username}! Seu agendamento de {service_name} em {when} está confirmado."
+
+def _prepare(message_ids):
+    """Loads everything needed to send the claimed messages in one joined query."""
+    rows = db.session.query(
+        OutboxMessage, User.phone, User.username, Appointment.appointment_time, Appointment.status, Service.name
+    ).join(User, OutboxMessage.user_id == User.id).outerjoin(
+        Appointment, OutboxMessage.appointment_id == Appointment.id
+    ).outerjoin(Service, Appointment.service_id == Service.id).filter(OutboxMessage.id.in_(message_ids)).all()
+
+    deliveries, skipped = [], []
+    for message, phone, username, appointment_time, appointment_status, service_name in rows:
+        if appointment_time is None or appointment_status in NON_BLOCKING_STATUSES:
+            skipped.append((message, "appointment no longer scheduled"))
+        elif message.kind == KIND_WAITLIST_OFFER and appointment_status != "Held":
+            skipped.append((message, "waitlist offer already answered"))
+        elif message.kind == KIND_APPOINTMENT_REMINDER and message.idempotency_key != (
+            f"appointment-{message.appointment_id}-reminder-{appointment_time:%Y%m%d%H%M}"
+        ):
+            skipped.append((message, "appointment was rescheduled"))
+        elif not phone:
+            skipped.append((message, "user has no phone number"))
+        else:
+            body = render_message(message.kind, username, service_name or "serviço", appointment_time)
+            deliveries.append((message, phone, body))
+    return deliveries, skipped
+
+def drain_once(sender, batch_size=50, workers=8, now=None):
+    """Claims and sends one batch. Returns a dict of counts by outcome."""
+    config = current_app.config
+    token, message_ids = claim_batch(batch_size, config["OUTBOX_LEASE_SECONDS"], now)
+    counts = {"claimed": len(message_ids), "sent": 0, "retried": 0, "failed": 0, "skipped": 0, "lost": 0}
+    if not message_ids:
+        return counts
+
+    deliveries, skipped = _prepare(message_ids)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            (message, pool.submit(sender.send, phone, body, message.idempotency_key))
+            for message, phone, body in deliveries
+        ]
+        outcomes = []
+        for message, future in futures:
+            try:
+                future.result()
+                outcomes.append((message, None, None))
+            except Exception as e: # recorded per message below
+                outcomes.append((message, e, isinstance(e, RetryableSendError)))
+
+    finished_at = datetime.now()
+    for message, reason in skipped:
+        if _complete(message, token, status="skipped", last_error=reason):
+            counts["skipped"] += 1
+        else:
+            counts["lost"] += 1
+    for message, error, retryable in outcomes:
+        attempts = message.attempts + 1
+        if error is None:
+            outcome, values = "sent", {"status": "sent", "sent_at": finished_at}
+        elif retryable and attempts < config["OUTBOX_MAX_ATTEMPTS"]:
+            outcome, values = "retried", {"status": "pending", "next_attempt_at": finished_at + backoff_delay(
+                attempts, config["OUTBOX_BACKOFF_BASE_SECONDS"], config["OUTBOX_BACKOFF_MAX_SECONDS"]
+            )}
+        else:
+            outcome, values = "failed", {"status": "failed"}
+        if error is not None:
+            values["last_error"] = str(error)[:1000]
+        if not _complete(message, token, attempts=attempts, **values):
+            counts["lost"] += 1
+            continue
+        counts[outcome] += 1
+        if outcome == "failed":
+            logger.warning("Outbox message %s failed permanently: %s", message.id, error)
+    db.session.commit()
+    return counts
+
+def _complete(message, token, **values):
+    """
+    Records the outcome and releases the lease, only if this worker still holds it.
+    False when the lease expired mid-send and another worker claimed the message: that
+    worker now owns the row (and may have sent it too), so this outcome is dropped.
+    """
+    result = db.session.execute(
+        OutboxMessage.__table__.update().where(
+            OutboxMessage.id == message.id, OutboxMessage.claim_token == token
+        ).values(claim_token=None, locked_until=None, **values)
+    )
+    if result.rowcount == 0:
+        logger.warning("Outbox message %s: lease lost before the outcome was recorded", message.id)
+        return False
+    return True
+
+outbox_cli = AppGroup("outbox", help="Notification outbox worker.")
+
+@outbox_cli.command("drain")
+@click.option("--batch-size", default=50, show_default=True, help="Messages claimed per batch.")
+@click.option("--workers", default=8, show_default=True, help="Concurrent sends per batch.")
+@click.option("--loop", is_flag=True, help="Keep polling instead of stopping when the outbox is empty.")
+@click.option("--interval", default=5.0, show_default=True, help="Seconds to sleep between polls with --loop.")
+def drain_command(batch_size, workers, loop, interval):
+    """Send due notifications (confirmations, reminders)."""
+    sender = get_sender()
+    totals = {"claimed": 0, "sent": 0, "retried": 0, "failed": 0, "skipped": 0, "lost": 0}
+    while True:
+        counts = drain_once(sender, batch_size=batch_size, workers=workers)
+        for key, value in counts.items():
+            totals[key] += value
+        if counts["claimed"]:
+            click.echo(", ".join(f"{key}={value}" for key, value in counts.items()))
+            continue
+        if not loop:
+            break
+        time.sleep(interval)
+    click.echo("Done: " + ", ".join(f"{key}={value}" for key, value in totals.items()))
+
+@outbox_cli.command("status")
+def status_command():
+    """Show message counts by status."""
+    for status, count in db.session.query(OutboxMessage.status, db.func.count()).group_by(OutboxMessage.status).all():
+        click.echo(f"{status}\t{count}")
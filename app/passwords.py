@@ -0,0 +1,127 @@
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt as _bcrypt
+from flask import current_app
+
+# Password hashing off the request threads.
+# bcrypt is deliberately slow (about 250 ms at cost 12), so hashing inline lets a burst
+# of logins occupy every worker thread. PasswordHasher runs hashpw/checkpw on a small
+# process pool and bounds how many request threads may wait for it: past
+# PASSWORD_HASH_MAX_PENDING, a caller blocks its thread for at most
+# PASSWORD_HASH_QUEUE_TIMEOUT waiting for a slot and then fails with HasherBusy (the
+# routes answer 503), so a burst holds at most MAX_PENDING threads on the pool plus
+# the ones briefly queued. Hashes are plain bcrypt strings, like the ones Flask-Bcrypt
+# stored before this module, and carry their own cost, so a changed BCRYPT_LOG_ROUNDS
+# is applied by rehashing on the next successful login (User.check_password).
+#
+# bcrypt reads at most MAX_PASSWORD_BYTES bytes of the UTF-8 password. bcrypt >= 5
+# raises ValueError for longer input instead of truncating; registration rejects such
+# passwords (RegistrationForm), and verification truncates so hashes made by older
+# bcrypt releases, which truncated silently, keep verifying.
+
+MAX_PASSWORD_BYTES = 72
+
+class HasherBusy(Exception):
+    """Too many password operations are already waiting; the caller should retry later."""
+
+def _hash(password, rounds):
+    """Raises ValueError if the password is longer than MAX_PASSWORD_BYTES in UTF-8."""
+    password_bytes = password.encode("utf-8")
+    if len(password_bytes) > MAX_PASSWORD_BYTES:
+        raise ValueError(f"Password is longer than {MAX_PASSWORD_BYTES} bytes.")
+    return _bcrypt.hashpw(password_bytes, _bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+def _verify(password, password_hash):
+    try:
+        return _bcrypt.checkpw(password.encode("utf-8")[:MAX_PASSWORD_BYTES], password_hash.encode("utf-8"))
+    except ValueError: # malformed stored hash
+        return False
+
+def hash_rounds(password_hash):
+    """Cost factor of a bcrypt hash ("$2b$12$..." -> 12), or None if it is not one."""
+    try:
+        return int(password_hash.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+class PasswordHasher:
+    def __init__(self, rounds=12, workers=2, max_pending=4, queue_timeout=2.0, offload=True):
+        self.rounds = rounds
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.offload = offload
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _run(self, func, *args):
+        if not self.offload:
+            return func(*args)
+        # Blocks this thread for at most queue_timeout waiting for a free slot, so
+        # overload shows up as a 503 within that time rather than as every request
+        # thread blocked on the pool.
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HasherBusy("Password hashing queue is full.")
+        try:
+            return self._executor().submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(_hash, password, self.rounds)
+
+    def verify(self, password, password_hash):
+        if not password_hash:
+            return False
+        return self._run(_verify, password, password_hash)
+
+    def needs_rehash(self, password_hash):
+        return hash_rounds(password_hash) != self.rounds
+
+    def after_fork(self):
+        # The parent's pool processes and queue threads do not exist in a forked child;
+        # drop the reference so the child starts its own pool on first use.
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool = None
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+def init_password_hasher(app):
+    hasher = PasswordHasher(
+        rounds=app.config["BCRYPT_LOG_ROUNDS"],
+        workers=app.config["PASSWORD_HASH_WORKERS"],
+        max_pending=app.config["PASSWORD_HASH_MAX_PENDING"],
+        queue_timeout=app.config["PASSWORD_HASH_QUEUE_TIMEOUT"],
+        offload=app.config["PASSWORD_HASH_OFFLOAD"]
+    )
+    app.extensions["password_hasher"] = hasher
+    _forked_hashers.add(hasher)
+    return hasher
+
+# One fork hook for the process, covering every hasher created so far, so repeated
+# create_app() calls (tests) don't register a hook each
+_forked_hashers = weakref.WeakSet()
+
+def _reset_hashers_after_fork():
+    for hasher in list(_forked_hashers):
+        hasher.after_fork()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_hashers_after_fork)
+
+def get_password_hasher():
+    return current_app.extensions["password_hasher"]
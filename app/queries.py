@@ -0,0 +1,231 @@
+import base64
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import Appointment, Service, User, Resource, NON_BLOCKING_STATUSES
+from app.utils.scheduling import business_intervals_for
+
+# Data-access helpers shared by the appointment routes.
+# Each helper runs a single joined query and returns light tuples instead of
+# ORM objects, so callers never trigger per-row lazy loads.
+
+APPOINTMENTS_PAGE_SIZE = 50
+MAX_APPOINTMENTS_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+
+def _blocking():
+    # Cancelled/expired appointments free their time; a NULL status still blocks
+    return or_(Appointment.status.is_(None), Appointment.status.notin_(NON_BLOCKING_STATUSES))
+
+def day_bounds(target_date):
+    return datetime.combine(target_date, datetime.min.time()), datetime.combine(target_date, datetime.max.time())
+
+def appointment_intervals_between(start_dt, end_dt, for_update=False):
+    """
+    Returns (appointment_time, duration_minutes) tuples for every appointment starting
+    between start_dt and end_dt (inclusive) that still occupies its time (see
+    NON_BLOCKING_STATUSES), in the format expected by
+    app.utils.scheduling.get_available_slots.
+    With for_update=True the appointment rows are locked (SELECT ... FOR UPDATE) on
+    databases that support it; SQLite ignores the clause.
+    The duration comes from the denormalized Appointment.end_time, so no join is needed.
+    """
+    query = db.session.query(
+        Appointment.appointment_time, Appointment.end_time
+    ).filter(
+        Appointment.appointment_time >= start_dt,
+        Appointment.appointment_time <= end_dt,
+        _blocking()
+    )
+    if for_update:
+        query = query.with_for_update()
+    one_minute = timedelta(minutes=1)
+    return [
+        (appointment_time, (end_time - appointment_time) // one_minute)
+        for appointment_time, end_time in query.all()
+    ]
+
+def appointment_intervals_for_day(target_date, for_update=False):
+    return appointment_intervals_between(*day_bounds(target_date), for_update=for_update)
+
+def active_resources():
+    """
+    (resource_id, business_intervals) for every active chair/barber, ordered by id.
+    Empty when the shop has no resources configured (single shop-wide resource).
+    """
+    rows = db.session.query(Resource.id, Resource.business_hours).filter(
+        Resource.active.is_(True)
+    ).order_by(Resource.id).all()
+    return [(resource_id, business_intervals_for(business_hours)) for resource_id, business_hours in rows]
+
+def resource_interval_rows_between(start_dt, end_dt, for_update=False):
+    """
+    Like appointment_intervals_between, but returns (resource_id, appointment_time,
+    duration_minutes) tuples; resource_id is None for appointments without a resource.
+    """
+    query = db.session.query(
+        Appointment.resource_id, Appointment.appointment_time, Appointment.end_time
+    ).filter(
+        Appointment.appointment_time >= start_dt,
+        Appointment.appointment_time <= end_dt,
+        _blocking()
+    )
+    if for_update:
+        query = query.with_for_update()
+    one_minute = timedelta(minutes=1)
+    return [
+        (resource_id, appointment_time, (end_time - appointment_time) // one_minute)
+        for resource_id, appointment_time, end_time in query.all()
+    ]
+
+def _overlapping(start_dt, end_dt):
+    return (
+        Appointment.appointment_time >= day_bounds(start_dt.date())[0],
+        Appointment.appointment_time < end_dt,
+        Appointment.end_time > start_dt,
+        _blocking()
+    )
+
+def overlapping_appointments(start_dt, end_dt, resource_id=None):
+    """
+    SELECT of the blocking appointments that overlap [start_dt, end_dt). A range on the
+    indexed appointment_time, from the start of start_dt's day (appointments never span
+    midnight, the same assumption the day availability queries make) to end_dt, plus the
+    stored end_time; the lower bound keeps the scan, and any row locks, to that one day.
+    With resource_id, only that chair's appointments and the shared ones (no resource,
+    they block every chair) count. Also run on a bare connection by app.waitlist.
+    """
+    query = select(Appointment.id).where(*_overlapping(start_dt, end_dt))
+    if resource_id is not None:
+        query = query.where(or_(Appointment.resource_id == resource_id, Appointment.resource_id.is_(None)))
+    return query.limit(1)
+
+def overlapping_intervals(start_dt, end_dt):
+    """
+    SELECT of (resource_id, appointment_time, end_time) for every blocking appointment
+    that overlaps [start_dt, end_dt), with the predicate of overlapping_appointments; lets
+    app.data_transfer load a whole import chunk's span in one query and apply
+    intervals_conflict to each row.
+    """
+    return select(Appointment.resource_id, Appointment.appointment_time, Appointment.end_time).where(
+        *_overlapping(start_dt, end_dt)
+    )
+
+def intervals_conflict(start_dt, end_dt, resource_id, other_start, other_end, other_resource_id):
+    """
+    The rule of overlapping_appointments for two intervals already in memory: they
+    overlap, and either one has no resource or both have the same one.
+    """
+    if other_start >= end_dt or other_end <= start_dt:
+        return False
+    return resource_id is None or other_resource_id is None or other_resource_id == resource_id
+
+def has_overlapping_appointment(start_dt, end_dt, for_update=False, resource_id=None):
+    """
+    True if any blocking appointment overlaps [start_dt, end_dt) (see
+    overlapping_appointments). With for_update=True the overlapping rows are locked where
+    supported.
+    """
+    query = overlapping_appointments(start_dt, end_dt, resource_id)
+    if for_update:
+        query = query.with_for_update()
+    return db.session.execute(query).first() is not None
+
+def calendar_rows_between(start_dt, end_dt):
+    """
+    Returns one row per appointment in the window, ordered by time, with the service
+    and client names already joined in. Rows expose id, appointment_time, user_id,
+    service_name and client_name; the names are None when the related row is missing.
+    """
+    return db.session.query(
+        Appointment.id,
+        Appointment.appointment_time,
+        Appointment.user_id,
+        Service.name.label("service_name"),
+        User.username.label("client_name")
+    ).outerjoin(Service, Appointment.service_id == Service.id).outerjoin(
+        User, Appointment.user_id == User.id
+    ).filter(
+        Appointment.appointment_time >= start_dt,
+        Appointment.appointment_time <= end_dt
+    ).order_by(Appointment.appointment_time.asc()).all()
+
+# --- Keyset (seek) pagination on (appointment_time, id) ---
+
+def encode_cursor(appointment_time, appointment_id):
+    raw = f"{appointment_time.isoformat()}|{appointment_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Returns (appointment_time, id) for a cursor from encode_cursor; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        time_str, id_str = raw.split("|")
+        return datetime.fromisoformat(time_str), int(id_str)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def appointments_page(user_id=None, cursor=None, limit=APPOINTMENTS_PAGE_SIZE):
+    """
+    Returns (appointments, next_cursor) for the page of appointments that follows
+    cursor, ordered by (appointment_time, id); next_cursor is None on the last page.
+    Service and customer are eager-loaded so templates can use appt.service and
+    appt.customer without extra queries. Pass user_id to restrict to one customer.
+    """
+    query = Appointment.query.options(joinedload(Appointment.service), joinedload(Appointment.customer))
+    if user_id is not None:
+        query = query.filter(Appointment.user_id == user_id)
+    if cursor:
+        after_time, after_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Appointment.appointment_time > after_time,
+            and_(Appointment.appointment_time == after_time, Appointment.id > after_id)
+        ))
+    appointments = query.order_by(Appointment.appointment_time.asc(), Appointment.id.asc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(appointments) > limit:
+        appointments = appointments[:limit]
+        next_cursor = encode_cursor(appointments[-1].appointment_time, appointments[-1].id)
+    return appointments, next_cursor
+
+def serialize_appointment(appt):
+    return {
+        "id": appt.id,
+        "start": appt.appointment_time.isoformat(),
+        "end": appt.end_time.isoformat() if appt.end_time else None,
+        "status": appt.status,
+        "resource_id": appt.resource_id,
+        "service": appt.service.name if appt.service else "Unknown Service",
+        "client": appt.customer.username if appt.customer else "Unknown Client",
+        "user_id": appt.user_id
+    }
+
+EXPORT_COLUMNS = ("id", "start", "end", "status", "service", "client", "user_id")
+
+def iter_appointment_export_rows(batch_size=EXPORT_BATCH_SIZE):
+    """
+    Yields one tuple per appointment (in EXPORT_COLUMNS order), oldest first, fetched
+    in batches of batch_size with yield_per so memory stays constant.
+    """
+    query = db.session.query(
+        Appointment.id,
+        Appointment.appointment_time,
+        Appointment.end_time,
+        Appointment.status,
+        Service.name,
+        User.username,
+        Appointment.user_id
+    ).outerjoin(Service, Appointment.service_id == Service.id).outerjoin(
+        User, Appointment.user_id == User.id
+    ).order_by(Appointment.appointment_time.asc(), Appointment.id.asc()).execution_options(yield_per=batch_size)
+    for appt_id, start, end, status, service_name, client_name, user_id in query:
+        yield (
+            appt_id,
+            start.isoformat(),
+            end.isoformat() if end else None,
+            status,
+            service_name or "Unknown Service",
+            client_name or "Unknown Client",
+            user_id
+        )
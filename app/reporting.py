@@ -0,0 +1,172 @@
+import time
+from datetime import timedelta
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect, func
+from app import db
+from app.models import Appointment, Service, DailyServiceStats
+from app.queries import active_resources
+from app.utils.scheduling import BUSINESS_INTERVALS
+from app.utils.upsert import upsert_increment
+
+# Daily rollups (bookings, revenue and occupied minutes per service per day).
+# Every Appointment insert/update/delete applies a delta to the affected rollup rows
+# in the same transaction, so report endpoints never scan raw appointments. Revenue
+# comes from the price stored on the appointment, so a booking adds and its
+# cancellation subtracts the same amount even if the service price changed in between.
+
+# Appointments with these statuses do not count towards reports (Held: waitlist offer
+# not yet accepted)
+EXCLUDED_STATUSES = ("Cancelled", "Expired", "Held")
+REBUILD_BATCH_SIZE = 5000
+
+def _contribution(appointment_time, end_time, service_id, status, price):
+    """Returns ((day, service_id), occupied_minutes, revenue) for an appointment state, or None if it does not count."""
+    if appointment_time is None or service_id is None or status in EXCLUDED_STATUSES:
+        return None
+    occupied_minutes = (end_time - appointment_time) // timedelta(minutes=1) if end_time else 0
+    return (appointment_time.date(), service_id), occupied_minutes, price or 0
+
+def _apply_delta(connection, key, bookings, occupied_minutes, revenue):
+    day, service_id = key
+    upsert_increment(
+        connection,
+        DailyServiceStats.__table__,
+        {"day": day, "service_id": service_id},
+        {"bookings": bookings, "revenue": revenue, "occupied_minutes": occupied_minutes}
+    )
+
+def _old_value(state, attr_name):
+    history = state.attrs[attr_name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, attr_name)
+
+@event.listens_for(Appointment, "after_insert")
+def _appointment_inserted(mapper, connection, target):
+    contribution = _contribution(target.appointment_time, target.end_time, target.service_id, target.status, target.price)
+    if contribution:
+        _apply_delta(connection, contribution[0], 1, contribution[1], contribution[2])
+
+@event.listens_for(Appointment, "after_update")
+def _appointment_updated(mapper, connection, target):
+    state = inspect(target)
+    old = _contribution(
+        _old_value(state, "appointment_time"), _old_value(state, "end_time"),
+        _old_value(state, "service_id"), _old_value(state, "status"), _old_value(state, "price")
+    )
+    new = _contribution(target.appointment_time, target.end_time, target.service_id, target.status, target.price)
+    if old == new:
+        return
+    if old:
+        _apply_delta(connection, old[0], -1, -old[1], -old[2])
+    if new:
+        _apply_delta(connection, new[0], 1, new[1], new[2])
+
+@event.listens_for(Appointment, "after_delete")
+def _appointment_deleted(mapper, connection, target):
+    contribution = _contribution(target.appointment_time, target.end_time, target.service_id, target.status, target.price)
+    if contribution:
+        _apply_delta(connection, contribution[0], -1, -contribution[1], -contribution[2])
+
+def rebuild_rollups():
+    """Recomputes every rollup row from the appointments table. Returns (appointments read, rollup rows written)."""
+    totals = {}
+    appointments_read = 0
+    query = db.session.query(
+        Appointment.appointment_time, Appointment.end_time, Appointment.service_id, Appointment.status, Appointment.price
+    ).execution_options(yield_per=REBUILD_BATCH_SIZE)
+    for appointment_time, end_time, service_id, status, price in query:
+        appointments_read += 1
+        contribution = _contribution(appointment_time, end_time, service_id, status, price)
+        if not contribution:
+            continue
+        key, occupied_minutes, revenue = contribution
+        row = totals.setdefault(key, [0, 0, 0])
+        row[0] += 1
+        row[1] += occupied_minutes
+        row[2] += revenue
+
+    db.session.query(DailyServiceStats).delete()
+    if totals:
+        db.session.execute(DailyServiceStats.__table__.insert(), [
+            {
+                "day": day,
+                "service_id": service_id,
+                "bookings": bookings,
+                "revenue": revenue,
+                "occupied_minutes": occupied_minutes
+            }
+            for (day, service_id), (bookings, occupied_minutes, revenue) in totals.items()
+        ])
+    db.session.commit()
+    return appointments_read, len(totals)
+
+def open_minutes_between(start_date, end_date, business_intervals=BUSINESS_INTERVALS):
+    """Business-hours minutes between start_date and end_date (inclusive) for one resource's compiled hours."""
+    minutes_per_weekday = [sum(end - start for start, end in periods) for periods in business_intervals]
+    total = 0
+    current_date = start_date
+    while current_date <= end_date:
+        total += minutes_per_weekday[current_date.weekday()]
+        current_date += timedelta(days=1)
+    return total
+
+def report_between(start_date, end_date):
+    """
+    Aggregates the rollups between start_date and end_date (inclusive). Cost is
+    proportional to days x services, not to the number of appointments.
+    """
+    daily_rows = db.session.query(
+        DailyServiceStats.day,
+        func.sum(DailyServiceStats.bookings),
+        func.sum(DailyServiceStats.revenue),
+        func.sum(DailyServiceStats.occupied_minutes)
+    ).filter(
+        DailyServiceStats.day >= start_date,
+        DailyServiceStats.day <= end_date
+    ).group_by(DailyServiceStats.day).order_by(DailyServiceStats.day).all()
+
+    service_rows = db.session.query(
+        Service.id,
+        Service.name,
+        func.sum(DailyServiceStats.bookings),
+        func.sum(DailyServiceStats.revenue),
+        func.sum(DailyServiceStats.occupied_minutes)
+    ).join(Service, DailyServiceStats.service_id == Service.id).filter(
+        DailyServiceStats.day >= start_date,
+        DailyServiceStats.day <= end_date
+    ).group_by(Service.id, Service.name).order_by(Service.name).all()
+
+    total_bookings = sum(row[1] for row in daily_rows)
+    total_revenue = sum(row[2] for row in daily_rows)
+    total_occupied = sum(row[3] for row in daily_rows)
+    # Occupied minutes add up across chairs, so capacity does too: each active chair's
+    # own hours, or the shop's hours when no chairs are configured
+    resource_hours = [business_intervals for _, business_intervals in active_resources()] or [BUSINESS_INTERVALS]
+    open_minutes = sum(open_minutes_between(start_date, end_date, business_intervals) for business_intervals in resource_hours)
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "bookings": total_bookings,
+        "revenue": round(total_revenue, 2),
+        "occupied_minutes": total_occupied,
+        "occupancy": round(total_occupied / open_minutes, 4) if open_minutes else 0,
+        "by_day": [
+            {"day": day.isoformat(), "bookings": bookings, "revenue": round(revenue, 2), "occupied_minutes": occupied}
+            for day, bookings, revenue, occupied in daily_rows
+        ],
+        "by_service": [
+            {"service_id": service_id, "service": name, "bookings": bookings, "revenue": round(revenue, 2), "occupied_minutes": occupied}
+            for service_id, name, bookings, revenue, occupied in service_rows
+        ]
+    }
+
+reports_cli = AppGroup("reports", help="Reporting rollup maintenance.")
+
+@reports_cli.command("rebuild")
+def rebuild_command():
+    """Rebuild the daily reporting rollups from the appointments table."""
+    started = time.perf_counter()
+    appointments_read, rows_written = rebuild_rollups()
+    click.echo(f"Rebuilt {rows_written} rollup rows from {appointments_read} appointments in {time.perf_counter() - started:.1f}s.")
@@ -0,0 +1,63 @@
+import json
+import click
+from flask.cli import AppGroup
+from app import db
+from app.models import Resource
+from app.utils.scheduling import business_intervals_for
+
+# CLI for managing chairs/barbers. With no resources configured the shop keeps the
+# single shop-wide schedule; once at least one is active, availability and booking
+# switch to per-resource occupancy (app/availability.py, app/booking.py).
+
+resources_cli = AppGroup("resources", help="Manage chairs/barbers.")
+
+def _parse_hours(hours_json):
+    if hours_json is None:
+        return None
+    try:
+        hours = json.loads(hours_json)
+        business_intervals_for(hours) # validates day names and HH:MM strings
+    except (ValueError, TypeError, AttributeError) as e:
+        raise click.BadParameter(f"Invalid business hours: {e}")
+    return hours
+
+@resources_cli.command("add")
+@click.argument("name")
+@click.option("--hours", "hours_json", help='Per-weekday overrides, e.g. \'{"saturday": [["09:00", "13:00"]]}\'.')
+def add_resource(name, hours_json):
+    """Add a chair/barber."""
+    resource = Resource(name=name, business_hours=_parse_hours(hours_json), active=True)
+    db.session.add(resource)
+    db.session.commit()
+    click.echo(f"Added resource {resource.id}: {resource.name}")
+
+@resources_cli.command("set-hours")
+@click.argument("name")
+@click.argument("hours_json", required=False)
+def set_resource_hours(name, hours_json):
+    """Set (or clear, when omitted) the business hours overrides of a resource."""
+    resource = Resource.query.filter_by(name=name).first()
+    if resource is None:
+        raise click.ClickException(f"Resource not found: {name}")
+    resource.business_hours = _parse_hours(hours_json)
+    db.session.commit()
+    click.echo(f"Updated business hours of {resource.name}")
+
+@resources_cli.command("deactivate")
+@click.argument("name")
+def deactivate_resource(name):
+    """Stop offering a resource for new bookings."""
+    resource = Resource.query.filter_by(name=name).first()
+    if resource is None:
+        raise click.ClickException(f"Resource not found: {name}")
+    resource.active = False
+    db.session.commit()
+    click.echo(f"Deactivated {resource.name}")
+
+@resources_cli.command("list")
+def list_resources():
+    """List chairs/barbers."""
+    for resource in Resource.query.order_by(Resource.id).all():
+        status = "active" if resource.active else "inactive"
+        hours = json.dumps(resource.business_hours) if resource.business_hours else "shop hours"
+        click.echo(f"{resource.id}\t{resource.name}\t{status}\t{hours}")
@@ -1,14 +1,33 @@
-from flask import Blueprint, request, jsonify, render_template, flash, redirect, url_for
+from flask import Blueprint, request, jsonify, render_template, flash, redirect, url_for, Response, stream_with_context, current_app
 from flask_login import login_required, current_user
 from app import db
-from app.models import Appointment, Service, User
-from app.utils.scheduling import get_available_slots # SLOT_DURATION_MINUTES, BUSINESS_HOURS are not directly used here but in scheduling.py
+from app.models import Appointment, Service, User, WaitlistEntry, NON_BLOCKING_STATUSES
+from app.booking import BookingConflict, book_appointment_atomic, cancel_appointment
+from app.waitlist import WaitlistError, join_waitlist, claim_offer, decline_offer, leave_waitlist
+from app.calendar_feed import month_etag, compact_month_payload
+from app.availability import day_slots, range_slots, next_available
+from app.queries import (
+    calendar_rows_between, appointments_page, serialize_appointment, iter_appointment_export_rows, EXPORT_COLUMNS,
+    APPOINTMENTS_PAGE_SIZE, MAX_APPOINTMENTS_PAGE_SIZE
+)
+from app.utils.availability_cache import slot_cache, cached_available_slots, date_versions
 from app.forms import AppointmentForm # Assuming AppointmentForm is in app.forms
 from datetime import datetime, timedelta
 import calendar # For getting month details
+import csv
+import io
+import json
 
 appointments_bp = Blueprint("appointments", __name__)
 
+# Upper bound on the number of days a single range request may cover
+MAX_SLOT_RANGE_DAYS = 62
+# next_available: default/maximum number of results and days searched ahead
+NEXT_AVAILABLE_DEFAULT_LIMIT = 5
+NEXT_AVAILABLE_MAX_LIMIT = 50
+NEXT_AVAILABLE_HORIZON_DAYS = 90
+NEXT_AVAILABLE_MAX_HORIZON_DAYS = 366
+
 @appointments_bp.route("/get_available_slots", methods=["POST"])
 @login_required
 def available_slots_api():
@@ -28,23 +47,106 @@ def available_slots_api():
     if not service:
         return jsonify({"error": "Service not found"}), 404
 
-    start_of_day = datetime.combine(target_date, datetime.min.time())
-    end_of_day = datetime.combine(target_date, datetime.max.time())
-    
-    existing_appts_for_day_query = Appointment.query.filter(
-        Appointment.appointment_time >= start_of_day,
-        Appointment.appointment_time <= end_of_day
-    ).all()
-
-    formatted_existing_appointments = []
-    for appt in existing_appts_for_day_query:
-        appt_service = Service.query.get(appt.service_id)
-        if appt_service:
-            formatted_existing_appointments.append((appt.appointment_time, appt_service.duration_minutes))
-
-    slots = get_available_slots(date_str, formatted_existing_appointments, service.duration_minutes)
+    slots = cached_available_slots(
+        target_date,
+        service.duration_minutes,
+        lambda: day_slots(target_date, service.duration_minutes)
+    )
     return jsonify({"available_slots": slots})
 
+@appointments_bp.route("/get_available_slots_range", methods=["POST"])
+@login_required
+def available_slots_range_api():
+    data = request.get_json()
+    start_date_str = data.get("start_date")
+    end_date_str = data.get("end_date")
+    service_id = data.get("service_id")
+
+    if not start_date_str or not end_date_str or not service_id:
+        return jsonify({"error": "Missing start_date, end_date or service_id"}), 400
+
+    try:
+        start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+
+    if end_date < start_date:
+        return jsonify({"error": "end_date must not be before start_date"}), 400
+    if (end_date - start_date).days >= MAX_SLOT_RANGE_DAYS:
+        return jsonify({"error": f"Range too long. Maximum is {MAX_SLOT_RANGE_DAYS} days."}), 400
+
+    service = Service.query.get(service_id)
+    if not service:
+        return jsonify({"error": "Service not found"}), 404
+
+    # Serve cached days first; only the span of missing days hits the database
+    slots_by_day = {}
+    missing_dates = []
+    dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    versions = date_versions(d.isoformat() for d in dates)
+    for current_date in dates:
+        cached_slots = slot_cache.get((current_date.isoformat(), service.duration_minutes), versions[current_date.isoformat()])
+        if cached_slots is None:
+            missing_dates.append(current_date)
+        else:
+            slots_by_day[current_date.isoformat()] = cached_slots
+
+    if missing_dates:
+        # One appointments query for the whole span of missing days
+        computed = range_slots(missing_dates[0], missing_dates[-1], service.duration_minutes)
+        for missing_date in missing_dates:
+            date_key = missing_date.isoformat()
+            slots_by_day[date_key] = computed[date_key]
+            slot_cache.set((date_key, service.duration_minutes), computed[date_key], versions[date_key])
+
+    slots_by_day = dict(sorted(slots_by_day.items()))
+    return jsonify({"available_slots": slots_by_day})
+
+@appointments_bp.route("/next_available", methods=["POST"])
+@login_required
+def next_available_api():
+    """
+    Earliest free starts for a service: {"service_id", "from"?: "YYYY-MM-DD" or
+    "YYYY-MM-DDTHH:MM" (default: now), "limit"?, "horizon_days"?}.
+    """
+    data = request.get_json()
+    service_id = data.get("service_id")
+    from_str = data.get("from")
+    if not service_id:
+        return jsonify({"error": "Missing service_id"}), 400
+
+    now = datetime.now().replace(second=0, microsecond=0)
+    try:
+        if not from_str:
+            after_dt = now
+        elif "T" in from_str:
+            after_dt = datetime.strptime(from_str, "%Y-%m-%dT%H:%M")
+        else:
+            # A bare date searches from the start of that day (slots start after 00:00)
+            after_dt = datetime.strptime(from_str, "%Y-%m-%d")
+        limit = int(data.get("limit", NEXT_AVAILABLE_DEFAULT_LIMIT))
+        horizon_days = int(data.get("horizon_days", NEXT_AVAILABLE_HORIZON_DAYS))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid from (YYYY-MM-DD or YYYY-MM-DDTHH:MM), limit or horizon_days."}), 400
+    if not (1 <= limit <= NEXT_AVAILABLE_MAX_LIMIT):
+        return jsonify({"error": f"limit must be between 1 and {NEXT_AVAILABLE_MAX_LIMIT}"}), 400
+    if not (1 <= horizon_days <= NEXT_AVAILABLE_MAX_HORIZON_DAYS):
+        return jsonify({"error": f"horizon_days must be between 1 and {NEXT_AVAILABLE_MAX_HORIZON_DAYS}"}), 400
+    # Never offer times in the past
+    after_dt = max(after_dt, now)
+
+    service = Service.query.get(service_id)
+    if not service:
+        return jsonify({"error": "Service not found"}), 404
+
+    found = next_available(after_dt, service.duration_minutes, limit, horizon_days)
+    return jsonify({
+        "service_id": service.id,
+        "duration_minutes": service.duration_minutes,
+        "next_available": [{"date": found_date.isoformat(), "time": time_str} for found_date, time_str in found]
+    })
+
 @appointments_bp.route("/book", methods=["GET", "POST"])
 @login_required
 def book_appointment():
@@ -69,43 +171,132 @@ def book_appointment():
             flash("Invalid date or time format.", "danger")
             return render_template("book_appointment.html", title="Book Appointment", form=form, services=services)
 
-        start_of_day = datetime.combine(appointment_dt.date(), datetime.min.time())
-        end_of_day = datetime.combine(appointment_dt.date(), datetime.max.time())
-        existing_appts_for_day_query = Appointment.query.filter(
-            Appointment.appointment_time >= start_of_day,
-            Appointment.appointment_time <= end_of_day
-        ).all()
-        formatted_existing_appointments = []
-        for appt in existing_appts_for_day_query:
-            appt_service_model = Service.query.get(appt.service_id) # Renamed to avoid conflict
-            if appt_service_model:
-                formatted_existing_appointments.append((appt.appointment_time, appt_service_model.duration_minutes))
-        
-        available_slots_for_service = get_available_slots(date_str, formatted_existing_appointments, service.duration_minutes)
-
-        if time_str not in available_slots_for_service:
-            flash("The selected time slot is no longer available or invalid for the chosen service.", "danger")
+        # Availability check and insert run in one transaction; overlaps are rejected by the database
+        try:
+            book_appointment_atomic(current_user.id, service, appointment_dt)
+        except BookingConflict as e:
+            flash(str(e), "danger")
             return render_template("book_appointment.html", title="Book Appointment", form=form, services=services)
 
-        new_appointment = Appointment(
-            user_id=current_user.id,
-            service_id=service.id,
-            appointment_time=appointment_dt,
-            status="Scheduled"
-        )
-        db.session.add(new_appointment)
-        db.session.commit()
         flash(f"Appointment for {service.name} on {date_str} at {time_str} booked successfully!", "success")
-        # TODO: Send WhatsApp notification here
+        # WhatsApp confirmation/reminder were queued in the outbox; `flask outbox drain` sends them
         return redirect(url_for("appointments.my_appointments"))
 
     return render_template("book_appointment.html", title="Book Appointment", form=form, services=services)
 
+def _page_args():
+    """Reads ?cursor=&limit= for the paginated listings; raises ValueError on bad input."""
+    cursor = request.args.get("cursor")
+    limit = int(request.args.get("limit", APPOINTMENTS_PAGE_SIZE))
+    if not (1 <= limit <= MAX_APPOINTMENTS_PAGE_SIZE):
+        raise ValueError(f"limit must be between 1 and {MAX_APPOINTMENTS_PAGE_SIZE}")
+    return cursor, limit
+
 @appointments_bp.route("/my_appointments")
 @login_required
 def my_appointments():
-    user_appointments = Appointment.query.filter_by(user_id=current_user.id).order_by(Appointment.appointment_time.asc()).all()
-    return render_template("my_appointments.html", title="My Appointments", appointments=user_appointments)
+    try:
+        cursor, limit = _page_args()
+        user_appointments, next_cursor = appointments_page(user_id=current_user.id, cursor=cursor, limit=limit)
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("appointments.my_appointments"))
+    return render_template("my_appointments.html", title="My Appointments", appointments=user_appointments, next_cursor=next_cursor)
+
+@appointments_bp.route("/api/my_appointments", methods=["GET"])
+@login_required
+def my_appointments_api():
+    try:
+        cursor, limit = _page_args()
+        user_appointments, next_cursor = appointments_page(user_id=current_user.id, cursor=cursor, limit=limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"appointments": [serialize_appointment(a) for a in user_appointments], "next_cursor": next_cursor})
+
+@appointments_bp.route("/<int:appointment_id>/cancel", methods=["POST"])
+@login_required
+def cancel_appointment_api(appointment_id):
+    appointment = db.session.get(Appointment, appointment_id)
+    if appointment is None or appointment.user_id != current_user.id:
+        return jsonify({"error": "Appointment not found"}), 404
+    if appointment.status in NON_BLOCKING_STATUSES:
+        return jsonify({"error": "Appointment is already cancelled"}), 409
+    if appointment.appointment_time <= datetime.now():
+        return jsonify({"error": "Past appointments cannot be cancelled"}), 409
+    # Frees the time and offers it to the first matching waitlist entry
+    cancel_appointment(appointment)
+    return jsonify({"appointment": {"id": appointment.id, "status": appointment.status}})
+
+# --- Waitlist (app/waitlist.py) ---
+
+def _serialize_waitlist_entry(entry):
+    return {
+        "id": entry.id,
+        "service_id": entry.service_id,
+        "window_start": entry.window_start.isoformat(),
+        "window_end": entry.window_end.isoformat(),
+        "status": entry.status,
+        "appointment_id": entry.appointment_id,
+        "hold_expires_at": entry.hold_expires_at.isoformat() if entry.hold_expires_at else None
+    }
+
+def _own_waitlist_entry(entry_id):
+    entry = db.session.get(WaitlistEntry, entry_id)
+    if entry is None or entry.user_id != current_user.id:
+        return None
+    return entry
+
+@appointments_bp.route("/waitlist", methods=["POST"])
+@login_required
+def join_waitlist_api():
+    data = request.get_json()
+    service_id = data.get("service_id")
+    start_date_str = data.get("start_date")
+    end_date_str = data.get("end_date")
+
+    if not service_id or not start_date_str or not end_date_str:
+        return jsonify({"error": "Missing service_id, start_date or end_date"}), 400
+    try:
+        start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+
+    max_window_days = current_app.config["WAITLIST_MAX_WINDOW_DAYS"]
+    if end_date < start_date:
+        return jsonify({"error": "end_date must not be before start_date"}), 400
+    if end_date < datetime.now().date():
+        return jsonify({"error": "The window is in the past"}), 400
+    if (end_date - start_date).days >= max_window_days:
+        return jsonify({"error": f"Window too long. Maximum is {max_window_days} days."}), 400
+
+    service = Service.query.get(service_id)
+    if not service:
+        return jsonify({"error": "Service not found"}), 404
+
+    entry = join_waitlist(current_user.id, service, max(start_date, datetime.now().date()), end_date)
+    return jsonify({"entry": _serialize_waitlist_entry(entry)}), 201
+
+@appointments_bp.route("/api/waitlist", methods=["GET"])
+@login_required
+def my_waitlist_api():
+    entries = WaitlistEntry.query.filter_by(user_id=current_user.id).order_by(WaitlistEntry.id.desc()).all()
+    return jsonify({"entries": [_serialize_waitlist_entry(entry) for entry in entries]})
+
+@appointments_bp.route("/waitlist/<int:entry_id>/<action>", methods=["POST"])
+@login_required
+def waitlist_action_api(entry_id, action):
+    actions = {"claim": claim_offer, "decline": decline_offer, "leave": leave_waitlist}
+    if action not in actions:
+        return jsonify({"error": "Unknown action"}), 404
+    entry = _own_waitlist_entry(entry_id)
+    if entry is None:
+        return jsonify({"error": "Waitlist entry not found"}), 404
+    try:
+        actions[action](entry)
+    except WaitlistError as e:
+        return jsonify({"error": str(e), "entry": _serialize_waitlist_entry(entry)}), 409
+    return jsonify({"entry": _serialize_waitlist_entry(entry)})
 
 @appointments_bp.route("/admin/all_appointments") # Basic admin view, needs role check
 @login_required
@@ -113,8 +304,60 @@ def admin_all_appointments():
     # A real app would have role checking: if not current_user.is_admin:
     #    flash("Access denied.", "danger")
     #    return redirect(url_for("main.index")) 
-    all_appts = Appointment.query.order_by(Appointment.appointment_time.asc()).all()
-    return render_template("admin_all_appointments.html", title="All Appointments (Admin)", appointments=all_appts)
+    try:
+        cursor, limit = _page_args()
+        all_appts, next_cursor = appointments_page(cursor=cursor, limit=limit)
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("appointments.admin_all_appointments"))
+    return render_template("admin_all_appointments.html", title="All Appointments (Admin)", appointments=all_appts, next_cursor=next_cursor)
+
+@appointments_bp.route("/api/admin/all_appointments", methods=["GET"]) # Basic admin view, needs role check
+@login_required
+def admin_all_appointments_api():
+    try:
+        cursor, limit = _page_args()
+        all_appts, next_cursor = appointments_page(cursor=cursor, limit=limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"appointments": [serialize_appointment(a) for a in all_appts], "next_cursor": next_cursor})
+
+@appointments_bp.route("/admin/export_appointments", methods=["GET"]) # Basic admin view, needs role check
+@login_required
+def admin_export_appointments():
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be 'ndjson' or 'csv'"}), 400
+
+    def generate_ndjson():
+        for row in iter_appointment_export_rows():
+            yield json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n"
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in iter_appointment_export_rows():
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        yield buffer.getvalue()
+
+    if export_format == "csv":
+        body, mimetype = generate_csv(), "text/csv"
+    else:
+        body, mimetype = generate_ndjson(), "application/x-ndjson"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=appointments.{export_format}"}
+    )
+
+@appointments_bp.route("/admin/slot_cache_stats") # Basic admin view, needs role check
+@login_required
+def slot_cache_stats_api():
+    return jsonify(slot_cache.stats())
 
 @appointments_bp.route("/calendar")
 @login_required
@@ -126,6 +369,7 @@ def appointment_calendar():
 def month_appointments_api():
     year_str = request.args.get("year")
     month_str = request.args.get("month")
+    response_format = request.args.get("format", "full")
 
     if not year_str or not month_str:
         return jsonify({"error": "Year and month parameters are required"}), 400
@@ -137,6 +381,16 @@ def month_appointments_api():
             raise ValueError("Month out of range")
     except ValueError as e:
         return jsonify({"error": f"Invalid year or month: {e}"}), 400
+    if response_format not in ("full", "compact"):
+        return jsonify({"error": "format must be 'full' or 'compact'"}), 400
+
+    # Conditional GET: answer 304 from the month's change version without loading any rows
+    etag = month_etag(year, month, response_format)
+    if etag in request.if_none_match:
+        not_modified = Response(status=304)
+        not_modified.set_etag(etag)
+        not_modified.headers["Cache-Control"] = "private, no-cache"
+        return not_modified
 
     # Determine date range for the month
     start_of_month = datetime(year, month, 1)
@@ -158,15 +412,18 @@ def month_appointments_api():
     #     query = query.filter(Appointment.user_id == current_user.id)
     
     # Simplified: Fetch all appointments for the month for now
-    appointments_in_month = Appointment.query.filter(
-        Appointment.appointment_time >= start_of_month,
-        Appointment.appointment_time <= end_of_month
-    ).order_by(Appointment.appointment_time.asc()).all()
+    appointments_in_month = calendar_rows_between(start_of_month, end_of_month)
+
+    if response_format == "compact":
+        response = jsonify(compact_month_payload(year, month, appointments_in_month))
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
 
     events = []
     for appt in appointments_in_month:
-        service_name = appt.service.name if appt.service else "Unknown Service"
-        client_name = appt.customer.username if appt.customer else "Unknown Client"
+        service_name = appt.service_name or "Unknown Service"
+        client_name = appt.client_name or "Unknown Client"
         events.append({
             "id": appt.id,
             "title": f"{service_name} - {client_name}", # Adjust title as needed
@@ -180,6 +437,9 @@ def month_appointments_api():
             "user_id": appt.user_id
         })
     
-    return jsonify(events)
+    response = jsonify(events)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
 
 
@@ -0,0 +1,29 @@
+from flask import Blueprint, Response
+from app.metrics import metrics_store, request_metrics
+from app.utils.availability_cache import slot_cache
+
+metrics_bp = Blueprint("metrics", __name__)
+
+# Prometheus scrape endpoint. Unauthenticated like most exporters: expose it only on
+# the internal network (or block /metrics at the reverse proxy).
+
+def _slot_cache_lines(stats):
+    lines = [
+        "# HELP slot_cache_entries Cached availability results.",
+        "# TYPE slot_cache_entries gauge",
+        f"slot_cache_entries {stats['entries']}"
+    ]
+    for key in ("hits", "misses", "evictions", "invalidations"):
+        lines.append(f"# HELP slot_cache_{key}_total Availability cache {key}.")
+        lines.append(f"# TYPE slot_cache_{key}_total counter")
+        lines.append(f"slot_cache_{key}_total {stats[key]}")
+    return lines
+
+@metrics_bp.route("/metrics")
+def metrics():
+    store = metrics_store()
+    if store is None:
+        registry, stats = request_metrics, slot_cache.stats()
+    else:
+        registry, stats = store.collect()
+    return Response(registry.render(_slot_cache_lines(stats)), mimetype="text/plain; version=0.0.4")
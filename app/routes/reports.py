@@ -0,0 +1,46 @@
+from flask import Blueprint, request, jsonify, render_template
+from flask_login import login_required
+from app.reporting import report_between
+from datetime import datetime, date, timedelta
+
+reports_bp = Blueprint("reports", __name__)
+
+# Upper bound on the range a single report request may cover
+MAX_REPORT_RANGE_DAYS = 3660
+
+# All report views read only the DailyServiceStats rollups (see app/reporting.py).
+# A real app would have role checking on these admin views.
+
+@reports_bp.route("/dashboard")
+@login_required
+def admin_dashboard():
+    today = date.today()
+    today_report = report_between(today, today)
+    month_report = report_between(today.replace(day=1), today)
+    return render_template("admin_dashboard.html", title="Admin Dashboard", today=today_report, month=month_report)
+
+@reports_bp.route("/reports")
+@login_required
+def admin_reports():
+    end_date = date.today()
+    start_date = end_date - timedelta(days=29)
+    report = report_between(start_date, end_date)
+    return render_template("admin_reports.html", title="Reports", report=report)
+
+@reports_bp.route("/api/reports", methods=["GET"])
+@login_required
+def reports_api():
+    start_str = request.args.get("start")
+    end_str = request.args.get("end")
+    if not start_str or not end_str:
+        return jsonify({"error": "start and end parameters are required"}), 400
+    try:
+        start_date = datetime.strptime(start_str, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end_str, "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    if end_date < start_date:
+        return jsonify({"error": "end must not be before start"}), 400
+    if (end_date - start_date).days >= MAX_REPORT_RANGE_DAYS:
+        return jsonify({"error": f"Range too long. Maximum is {MAX_REPORT_RANGE_DAYS} days."}), 400
+    return jsonify(report_between(start_date, end_date))
@@ -1,68 +1,107 @@
-from flask import render_template, flash, redirect, url_for, request
+from flask import Blueprint, render_template, flash, redirect, url_for, request
 from flask_login import login_user, logout_user, current_user, login_required
 from werkzeug.urls import url_parse
-from app import app, db, bcrypt
+from app import db
 from app.forms import LoginForm, RegistrationForm # AppointmentForm is in appointments_bp
 from app.models import User, Service, Appointment # Ensure Appointment is imported if used here
+from app.passwords import HasherBusy
+from app.utils.page_cache import page_cache, SERVICES_NAMESPACE
 from datetime import datetime
 
-@app.route('/')
-@app.route('/index')
+main_bp = Blueprint("main", __name__)
+
+# Public pages are served from the page cache for anonymous visitors (app/utils/page_cache.py)
+
+@main_bp.route('/')
+@main_bp.route('/index')
+@page_cache.page('pages')
 def index(): # Login not strictly required for index, but can be added
     return render_template('index.html', title='Página Inicial')
 
-@app.route('/login', methods=['GET', 'POST'])
+@main_bp.route('/about')
+@page_cache.page('pages')
+def about():
+    return render_template('about.html', title='Sobre')
+
+@main_bp.route('/contact')
+@page_cache.page('pages')
+def contact():
+    return render_template('contact.html', title='Contato')
+
+@main_bp.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
-        if user and user.check_password(form.password.data):
+        try:
+            authenticated = user is not None and user.check_password(form.password.data)
+        except HasherBusy:
+            flash('Servidor ocupado. Tente novamente em alguns segundos.', 'warning')
+            return render_template('login.html', title='Login', form=form), 503
+        if authenticated:
+            db.session.commit() # Persists the upgraded hash when the work factor changed
             login_user(user, remember=form.remember_me.data)
             next_page = request.args.get('next')
             if not next_page or url_parse(next_page).netloc != '':
-                next_page = url_for('index')
+                next_page = url_for('main.index')
             flash('Login bem-sucedido!', 'success')
             return redirect(next_page)
         else:
             flash('Login sem sucesso. Verifique o email e a senha.', 'danger')
     return render_template('login.html', title='Login', form=form)
 
-@app.route('/logout')
+@main_bp.route('/logout')
 @login_required
 def logout():
     logout_user()
     flash('Você foi desconectado.', 'info')
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
-@app.route('/register', methods=['GET', 'POST'])
+@main_bp.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     form = RegistrationForm()
     if form.validate_on_submit():
         user = User(username=form.username.data, email=form.email.data)
-        user.set_password(form.password.data) # Uses the method from model
+        try:
+            user.set_password(form.password.data) # Uses the method from model
+        except HasherBusy:
+            flash('Servidor ocupado. Tente novamente em alguns segundos.', 'warning')
+            return render_template('register.html', title='Registrar', form=form), 503
+        except ValueError as e: # longer than bcrypt accepts; RegistrationForm normally rejects it first
+            form.password.errors.append(str(e))
+            return render_template('register.html', title='Registrar', form=form)
         db.session.add(user)
         db.session.commit()
         flash('Parabéns, você agora é um usuário registrado! Por favor, faça o login.', 'success')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     return render_template('register.html', title='Registrar', form=form)
 
-@app.route('/services')
+def _service_list():
+    return [
+        {"id": service.id, "name": service.name, "price": service.price, "duration_minutes": service.duration_minutes}
+        for service in Service.query.order_by(Service.name).all()
+    ]
+
+@main_bp.route('/services')
+@page_cache.page(SERVICES_NAMESPACE)
 def services_page():
-    all_services = Service.query.all()
+    # Logged-in users get a freshly rendered page, but the list itself comes from the
+    # fragment cache, invalidated on every Service write.
+    all_services = page_cache.fragment(SERVICES_NAMESPACE, 'service_list', _service_list)
     return render_template('services.html', title='Nossos Serviços', services=all_services)
 
-@app.route('/user/<username>')
+@main_bp.route('/user/<username>')
 @login_required
 def user_profile(username):
     user_obj = User.query.filter_by(username=username).first_or_404()
     if user_obj != current_user:
         flash("Você só pode visualizar seu próprio perfil.", "warning")
         # Option: redirect to current_user's profile or just show a limited view / error
-        return redirect(url_for('user_profile', username=current_user.username))
+        return redirect(url_for('main.user_profile', username=current_user.username))
 
     now_utc = datetime.utcnow()
     # Assuming Appointment model is imported and user_obj.appointments relationship is set up
@@ -0,0 +1,156 @@
+import threading
+import time as time_module
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event, inspect
+from werkzeug.local import LocalProxy
+from app import db
+from app.models import Appointment, AvailabilityVersion, Resource
+from app.utils.upsert import upsert_increment
+
+# Cache em processo das listas de slots calculadas por get_available_slots.
+# Chave: (data "YYYY-MM-DD", duração do serviço em minutos). Cada entrada guarda a versão
+# da data no momento em que o cálculo começou; a versão vem da tabela availability_version,
+# incrementada na mesma transação de cada escrita em Appointment daquela data (eventos do
+# SQLAlchemy abaixo) ou, pela chave ALL_DATES_KEY, de escritas que afetam todas as datas
+# (recursos, importações em massa). Como o contador está no banco, uma reserva feita em
+# outro worker ou por um comando da CLI invalida o cache de todos os processos: a consulta
+# de versão (uma busca por chave primária) é feita a cada leitura, e uma entrada com versão
+# diferente da atual é descartada. Um cálculo iniciado antes de uma escrita fica gravado
+# com a versão antiga e nunca é servido depois do commit dela. Cada app tem o seu cache
+# (app.extensions["slot_cache"], criado em create_app); slot_cache aponta para o do app atual.
+
+ALL_DATES_KEY = "*"
+
+class SlotCache:
+    def __init__(self, max_entries=1024, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict() # chave -> (versão, expira_em, slots)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, version):
+        """Slots guardados para key, ou None se não há entrada, ela expirou ou foi calculada em outra versão."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry_version, expires_at, slots = entry
+            if entry_version != version:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if expires_at <= time_module.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(slots)
+
+    def set(self, key, slots, version):
+        """Grava slots calculados na versão informada (lida antes do cálculo, ver date_versions)."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = (version, time_module.monotonic() + self.ttl_seconds, tuple(slots))
+            while len(self._entries) > self.max_entries:
+                self._evict_oldest()
+
+    def clear(self):
+        """Esvazia o cache deste processo (testes e benchmarks); para invalidar use bump_*."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+    def _evict_oldest(self):
+        self._entries.popitem(last=False)
+        self.evictions += 1
+
+def init_slot_cache(app):
+    app.extensions["slot_cache"] = SlotCache(app.config["SLOT_CACHE_MAX_ENTRIES"], app.config["SLOT_CACHE_TTL_SECONDS"])
+
+slot_cache = LocalProxy(lambda: current_app.extensions["slot_cache"])
+
+def date_versions(date_strs):
+    """
+    {data: versão} das datas informadas, com uma única consulta. A versão combina o
+    contador da data e o de ALL_DATES_KEY.
+    """
+    date_strs = list(date_strs)
+    rows = dict(db.session.query(AvailabilityVersion.day, AvailabilityVersion.version).filter(
+        AvailabilityVersion.day.in_(set(date_strs) | {ALL_DATES_KEY})
+    ).all())
+    all_dates = rows.get(ALL_DATES_KEY, 0)
+    return {date_str: (all_dates, rows.get(date_str, 0)) for date_str in date_strs}
+
+def cached_available_slots(target_date, service_duration_minutes, compute_slots, version=None):
+    """
+    Retorna os slots de target_date para a duração informada a partir do cache,
+    chamando compute_slots() (consulta + get_available_slots) apenas em caso de falta.
+    version: versão da data já lida por date_versions (evita repetir a consulta).
+    """
+    date_str = target_date.isoformat()
+    if version is None:
+        version = date_versions([date_str])[date_str]
+    key = (date_str, service_duration_minutes)
+    slots = slot_cache.get(key, version)
+    if slots is not None:
+        return slots
+    slots = compute_slots()
+    slot_cache.set(key, slots, version)
+    return slots
+
+# --- Invalidação: contadores no banco, na mesma transação da escrita ---
+
+def _bump(connection, key):
+    upsert_increment(connection, AvailabilityVersion.__table__, {"day": key}, {"version": 1})
+
+def bump_dates(connection, date_strs):
+    """Invalida as datas em todos os processos; para escritas que não passam pelos eventos do ORM."""
+    for date_str in sorted(date_strs):
+        _bump(connection, date_str)
+
+def bump_all_dates(connection):
+    """Invalida todas as datas em todos os processos (recursos, importações em massa)."""
+    _bump(connection, ALL_DATES_KEY)
+
+def _touched_dates(target):
+    dates = set()
+    if target.appointment_time is not None:
+        dates.add(target.appointment_time.date().isoformat())
+    history = inspect(target).attrs.appointment_time.history
+    for old_time in history.deleted or ():
+        if old_time is not None:
+            dates.add(old_time.date().isoformat())
+    return dates
+
+def _appointment_changed(mapper, connection, target):
+    bump_dates(connection, _touched_dates(target))
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(Appointment, _event_name, _appointment_changed)
+
+def _resources_changed(mapper, connection, target):
+    # Recursos alteram a disponibilidade de todas as datas
+    bump_all_dates(connection)
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(Resource, _event_name, _resources_changed)
@@ -0,0 +1,178 @@
+from datetime import datetime, time, timedelta
+from app.utils.scheduling import (
+    OCCUPANCY_UNIT_MINUTES, SLOT_DURATION_MINUTES, LUNCH_BREAK, LUNCH_BREAK_DAYS, get_day_name
+)
+
+# Mapas de ocupação por recurso (cadeira/barbeiro) e por dia: um inteiro Python em que
+# o bit i representa o bloco de OCCUPANCY_UNIT_MINUTES que começa em i * 5 minutos.
+# "Alguma cadeira está livre por N minutos a partir de s?" vira AND/shift/OR de inteiros.
+# Agendamentos fora da grade de 5 minutos são arredondados para fora (contam como ocupando
+# o bloco parcial), assim como em occupied_units.
+
+UNITS_PER_DAY = 24 * 60 // OCCUPANCY_UNIT_MINUTES
+
+def units_for(duration_minutes):
+    return max(1, -(-duration_minutes // OCCUPANCY_UNIT_MINUTES))
+
+def interval_mask(start_unit, end_unit):
+    start_unit = max(start_unit, 0)
+    end_unit = min(end_unit, UNITS_PER_DAY)
+    if end_unit <= start_unit:
+        return 0
+    return ((1 << (end_unit - start_unit)) - 1) << start_unit
+
+def business_mask(periods):
+    """Bits livres pelo horário de funcionamento (períodos em minutos, arredondados para dentro)."""
+    mask = 0
+    for start, end in periods:
+        mask |= interval_mask(-(-start // OCCUPANCY_UNIT_MINUTES), end // OCCUPANCY_UNIT_MINUTES)
+    return mask
+
+def busy_mask(target_date, appointments):
+    """Bits ocupados em target_date por tuplas (datetime_inicio, duracao_minutos)."""
+    midnight = datetime.combine(target_date, time(0, 0))
+    unit = timedelta(minutes=OCCUPANCY_UNIT_MINUTES)
+    mask = 0
+    for start_dt, duration in appointments:
+        end_dt = start_dt + timedelta(minutes=duration)
+        mask |= interval_mask((start_dt - midnight) // unit, -((midnight - end_dt) // unit))
+    return mask
+
+def fit_mask(free, units_needed):
+    """Bit s ligado se os bits s .. s + units_needed - 1 de free estão todos ligados (O(log n) operações)."""
+    result = free
+    span = 1
+    while span < units_needed:
+        step = min(span, units_needed - span)
+        result &= result >> step
+        span += step
+    return result
+
+def start_mask(periods, day_name, duration_minutes):
+    """
+    Inícios permitidos pela grade: mesmas regras de get_available_slots (início a cada
+    SLOT_DURATION_MINUTES a partir do início do período, slot terminando dentro do
+    período e sem cruzar o almoço nos dias de semana).
+    """
+    mask = 0
+    for period_start, period_end in periods:
+        slot_start = period_start
+        while slot_start + duration_minutes <= period_end:
+            slot_end = slot_start + duration_minutes
+            crosses_lunch = day_name in LUNCH_BREAK_DAYS and slot_start < LUNCH_BREAK[1] and slot_end > LUNCH_BREAK[0]
+            if not crosses_lunch and slot_start % OCCUPANCY_UNIT_MINUTES == 0:
+                mask |= 1 << (slot_start // OCCUPANCY_UNIT_MINUTES)
+            slot_start += SLOT_DURATION_MINUTES
+    return mask
+
+def resource_fit_masks(target_date, resources, appointments_by_resource, shared_appointments, duration_minutes):
+    """
+    Para cada recurso, o mapa de inícios em que ele comporta o serviço inteiro.
+    resources: lista de (resource_id, business_intervals compilados).
+    appointments_by_resource: {resource_id: [(datetime_inicio, duracao)]}.
+    shared_appointments: agendamentos sem recurso (anteriores às cadeiras), que bloqueiam todas.
+    Retorna {resource_id: (fit, free)}; vazio para durações não positivas, como em get_available_slots.
+    """
+    if duration_minutes <= 0:
+        return {}
+    day_name = get_day_name(target_date)
+    weekday = target_date.weekday()
+    units_needed = units_for(duration_minutes)
+    shared = busy_mask(target_date, shared_appointments)
+    masks = {}
+    for resource_id, business_intervals in resources:
+        periods = business_intervals[weekday]
+        if not periods:
+            continue
+        free = business_mask(periods) & ~(shared | busy_mask(target_date, appointments_by_resource.get(resource_id, ())))
+        fit = fit_mask(free, units_needed) & start_mask(periods, day_name, duration_minutes)
+        if fit:
+            masks[resource_id] = (fit, free)
+    return masks
+
+def longest_run(mask):
+    """Tamanho (em blocos) da maior sequência de bits ligados; uma iteração por sequência."""
+    longest = 0
+    while mask:
+        low_bit = mask & -mask
+        run = mask & ~(mask + low_bit)
+        longest = max(longest, run.bit_length() - low_bit.bit_length() + 1)
+        mask &= ~run
+    return longest
+
+def longest_free_gap_for_resources(target_date, resources, appointments_by_resource, shared_appointments):
+    """
+    Maior lacuna livre do dia, em minutos, entre todos os recursos (almoço conta como
+    ocupado nos dias de semana). Serviços mais longos que ela não cabem em nenhum recurso.
+    """
+    weekday = target_date.weekday()
+    blocked = busy_mask(target_date, shared_appointments)
+    if get_day_name(target_date) in LUNCH_BREAK_DAYS:
+        blocked |= interval_mask(LUNCH_BREAK[0] // OCCUPANCY_UNIT_MINUTES, -(-LUNCH_BREAK[1] // OCCUPANCY_UNIT_MINUTES))
+    longest = 0
+    for resource_id, business_intervals in resources:
+        periods = business_intervals[weekday]
+        if not periods:
+            continue
+        free = business_mask(periods) & ~(blocked | busy_mask(target_date, appointments_by_resource.get(resource_id, ())))
+        longest = max(longest, longest_run(free))
+    return longest * OCCUPANCY_UNIT_MINUTES
+
+def group_by_resource(rows):
+    """
+    Separa tuplas (resource_id, datetime_inicio, duracao) em
+    ({resource_id: [(inicio, duracao)]}, [agendamentos sem recurso]).
+    """
+    by_resource = {}
+    shared = []
+    for resource_id, start_dt, duration in rows:
+        if resource_id is None:
+            shared.append((start_dt, duration))
+        else:
+            by_resource.setdefault(resource_id, []).append((start_dt, duration))
+    return by_resource, shared
+
+def mask_to_slots(mask):
+    slots = []
+    while mask:
+        low_bit = mask & -mask
+        minutes = (low_bit.bit_length() - 1) * OCCUPANCY_UNIT_MINUTES
+        slots.append("%02d:%02d" % divmod(minutes, 60))
+        mask ^= low_bit
+    return slots
+
+def available_slots_for_resources(target_date, resources, appointments_by_resource, shared_appointments, duration_minutes):
+    """Horários em que pelo menos um recurso está livre durante todo o serviço."""
+    any_fit = 0
+    for fit, _ in resource_fit_masks(target_date, resources, appointments_by_resource, shared_appointments, duration_minutes).values():
+        any_fit |= fit
+    return mask_to_slots(any_fit)
+
+def _free_run_length(free, unit):
+    """Tamanho (em blocos) da sequência de bits livres que contém unit."""
+    above = ~(free >> unit)
+    run_end = unit + (above & -above).bit_length() - 1
+    zeros_below = ~free & ((1 << unit) - 1)
+    run_start = zeros_below.bit_length()
+    return run_end - run_start
+
+def pick_resource(start_dt, duration_minutes, resources, appointments_by_resource, shared_appointments):
+    """
+    Escolhe o recurso que comporta [start_dt, start_dt + duração) com o melhor encaixe:
+    o que tiver a menor lacuna livre em volta do horário, preservando lacunas maiores
+    para serviços longos. Empate: menor resource_id. Retorna None se nenhum comporta.
+    """
+    target_date = start_dt.date()
+    minutes = start_dt.hour * 60 + start_dt.minute
+    if start_dt.second or start_dt.microsecond or minutes % OCCUPANCY_UNIT_MINUTES:
+        return None
+    unit = minutes // OCCUPANCY_UNIT_MINUTES
+    best = None
+    masks = resource_fit_masks(target_date, resources, appointments_by_resource, shared_appointments, duration_minutes)
+    for resource_id, (fit, free) in masks.items():
+        if not (fit >> unit) & 1:
+            continue
+        candidate = (_free_run_length(free, unit), resource_id)
+        if best is None or candidate < best:
+            best = candidate
+    return best[1] if best else None
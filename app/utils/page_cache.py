@@ -0,0 +1,221 @@
+import hashlib
+import pickle
+import threading
+import time as time_module
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, current_app, has_app_context, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app import db
+from app.models import PageCacheVersion, Service
+from app.utils.upsert import upsert_increment
+
+# Cache de páginas renderizadas e de fragmentos (dados prontos para o template).
+# As chaves dos namespaces invalidados por escritas ("services") levam a versão do
+# namespace: invalidar é só incrementar a versão, e as entradas antigas somem por TTL/LRU.
+# A versão fica na tabela page_cache_version e é incrementada na mesma transação da
+# escrita (eventos abaixo, ou bump_namespaces para escritas em massa como
+# `flask data import`), então vale para todos os workers e processos, com qualquer
+# backend. Cada processo guarda a versão lida por PAGE_CACHE_VERSION_TTL segundos, de
+# modo que uma página servida do cache normalmente não consulta o banco. Páginas só são
+# servidas do cache para visitantes anônimos em GET sem mensagens flash pendentes, então
+# um pico de tráfego anônimo não toca nem o banco nem o Jinja; as respostas levam ETag e
+# Cache-Control para que navegadores e proxies revalidem com 304. Configuração e estado
+# são por app (app.extensions["page_cache"]).
+
+class MemoryBackend:
+    """LRU em processo com TTL por entrada (um por worker)."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # chave -> (expira_em, valor)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time_module.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (time_module.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class RedisBackend:
+    """
+    Backend compartilhado entre workers. client é qualquer objeto com a API do redis-py
+    (get, set com ex=, scan_iter, delete); fakeredis.FakeRedis serve como substituto local.
+    """
+
+    def __init__(self, client, prefix="barbearia:cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, timeout):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=max(1, int(timeout)))
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+def create_backend(config):
+    if config["PAGE_CACHE_BACKEND"] == "redis":
+        import redis # dependência opcional, só necessária com PAGE_CACHE_BACKEND=redis
+        return RedisBackend(redis.Redis.from_url(config["PAGE_CACHE_REDIS_URL"]))
+    return MemoryBackend(config["PAGE_CACHE_MAX_ENTRIES"])
+
+SERVICES_NAMESPACE = "services"
+# Namespaces invalidados por escritas (eventos abaixo). Os demais ("pages": início, sobre,
+# contato) só expiram por TTL, e suas chaves não levam versão: servi-los não toca o banco.
+VERSIONED_NAMESPACES = frozenset({SERVICES_NAMESPACE})
+
+class _PageCacheState:
+    """Backend, configuração e versões conhecidas de um app (app.extensions["page_cache"])."""
+
+    def __init__(self, config):
+        self.backend = create_backend(config)
+        self.timeout = config["PAGE_CACHE_TIMEOUT"]
+        self.max_age = config["PAGE_CACHE_MAX_AGE"]
+        self.enabled = config["PAGE_CACHE_ENABLED"]
+        self.version_ttl = config["PAGE_CACHE_VERSION_TTL"]
+        self._versions = {} # namespace -> (versão, válida_até)
+        self._lock = threading.Lock()
+
+    def version(self, namespace):
+        """
+        Versão do namespace lida do banco no máximo uma vez a cada version_ttl segundos
+        por processo: uma escrita feita em outro worker aparece em até version_ttl.
+        """
+        if namespace not in VERSIONED_NAMESPACES:
+            return 0
+        now = time_module.monotonic()
+        with self._lock:
+            known = self._versions.get(namespace)
+        if known is not None and known[1] > now:
+            return known[0]
+        version = db.session.query(PageCacheVersion.version).filter(
+            PageCacheVersion.namespace == namespace
+        ).scalar() or 0
+        with self._lock:
+            self._versions[namespace] = (version, now + self.version_ttl)
+        return version
+
+    def forget_versions(self, namespaces):
+        with self._lock:
+            for namespace in namespaces:
+                self._versions.pop(namespace, None)
+
+class PageCache:
+    """
+    Extensão sem estado próprio: cada create_app() guarda um _PageCacheState em
+    app.extensions, e os métodos usam o do app atual.
+    """
+
+    def init_app(self, app):
+        app.extensions["page_cache"] = _PageCacheState(app.config)
+
+    @staticmethod
+    def _state():
+        return current_app.extensions["page_cache"]
+
+    def forget_versions(self, namespaces):
+        """Faz este processo reler as versões já na próxima requisição (depois de incrementá-las)."""
+        self._state().forget_versions(namespaces)
+
+    def fragment(self, namespace, name, compute, timeout=None):
+        """Valor de compute() guardado sob (namespace, name); recalculado quando a versão do namespace muda."""
+        state = self._state()
+        if not state.enabled:
+            return compute()
+        key = f"fragment:{namespace}:v{state.version(namespace)}:{name}"
+        cached = state.backend.get(key)
+        if cached is not None:
+            return cached[0]
+        value = compute()
+        state.backend.set(key, (value,), timeout or state.timeout)
+        return value
+
+    def page(self, namespace, timeout=None):
+        """
+        Decorador de views: guarda o HTML renderizado para visitantes anônimos e responde
+        com ETag (304 quando If-None-Match confere) e Cache-Control público.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                state = self._state()
+                if not state.enabled or not _is_cacheable_request():
+                    return view(*args, **kwargs)
+                key = f"page:{namespace}:v{state.version(namespace)}:{request.full_path}"
+                cached = state.backend.get(key)
+                if cached is None:
+                    response = make_response(view(*args, **kwargs))
+                    # Não guarda respostas de erro nem as que gravaram a sessão (ex.: token CSRF)
+                    if response.status_code != 200 or response.direct_passthrough or session.modified:
+                        return response
+                    cached = (response.get_data(), response.mimetype)
+                    state.backend.set(key, cached, timeout or state.timeout)
+                body, mimetype = cached
+                response = Response(body, mimetype=mimetype)
+                response.set_etag(hashlib.sha1(body).hexdigest())
+                response.headers["Cache-Control"] = f"public, max-age={state.max_age}"
+                response.vary.add("Cookie")
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
+
+def _is_cacheable_request():
+    if request.method != "GET" or "_flashes" in session:
+        return False
+    return not current_user.is_authenticated
+
+page_cache = PageCache()
+
+# --- Versões no banco, incrementadas na transação da escrita ---
+
+_PENDING_NAMESPACES_KEY = "page_cache_pending_namespaces"
+
+def bump_namespaces(connection, namespaces):
+    """Invalida os namespaces em todos os processos; para escritas que não passam pelos eventos do ORM."""
+    for namespace in sorted(namespaces):
+        upsert_increment(connection, PageCacheVersion.__table__, {"namespace": namespace}, {"version": 1})
+
+def _services_changed(mapper, connection, target):
+    # Uma resposta calculada antes do commit fica gravada com a versão antiga e nunca
+    # é servida depois dele (mesmo raciocínio do cache de slots).
+    bump_namespaces(connection, [SERVICES_NAMESPACE])
+    session_ = object_session(target)
+    if session_ is not None:
+        session_.info.setdefault(_PENDING_NAMESPACES_KEY, set()).add(SERVICES_NAMESPACE)
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(Service, _event_name, _services_changed)
+
+@event.listens_for(Session, "after_commit")
+def _session_committed(session_):
+    # Quem escreveu vê a mudança na hora; os outros processos, em até PAGE_CACHE_VERSION_TTL
+    namespaces = session_.info.pop(_PENDING_NAMESPACES_KEY, None)
+    if namespaces and has_app_context():
+        page_cache.forget_versions(namespaces)
+
+@event.listens_for(Session, "after_rollback")
+def _session_rolled_back(session_):
+    session_.info.pop(_PENDING_NAMESPACES_KEY, None)
@@ -1,3 +1,5 @@
+from bisect import bisect_right
+from functools import lru_cache
 from datetime import datetime, timedelta, time
 
 # Horários de funcionamento e duração do slot
@@ -11,6 +13,8 @@ BUSINESS_HOURS = {
     "sunday": [] # Fechado aos domingos
 }
 SLOT_DURATION_MINUTES = 30
+# Granularidade das linhas de ocupação usadas para detectar conflitos no banco
+OCCUPANCY_UNIT_MINUTES = 5
 
 def get_day_name(date_obj):
     days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
@@ -30,8 +34,11 @@ def is_within_business_hours(dt_object):
             return True
     return False
 
-def get_available_slots(date_str, existing_appointments_for_day, service_duration_minutes):
+def _get_available_slots_reference(date_str, existing_appointments_for_day, service_duration_minutes):
     """
+    Implementação original, slot a slot. Mantida apenas como referência para a
+    verificação de equivalência com get_available_slots (tests/test_scheduling.py).
+
     Gera slots disponíveis para um determinado dia, considerando os horários de funcionamento,
     duração do serviço e agendamentos existentes.
     existing_appointments_for_day: lista de objetos datetime dos horários de início dos agendamentos existentes.
@@ -103,6 +110,189 @@ def get_available_slots(date_str, existing_appointments_for_day, service_duratio
 
     return sorted(list(set(available_slots))) # Remove duplicados e ordena
 
+# Intervalo de almoço verificado em dias de semana (em minutos desde 00:00)
+LUNCH_BREAK = (12 * 60, 13 * 60)
+LUNCH_BREAK_DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday")
+
+def _parse_minutes(time_str):
+    parsed = datetime.strptime(time_str, "%H:%M")
+    return parsed.hour * 60 + parsed.minute
+
+def occupied_units(start_dt, duration_minutes):
+    """
+    Retorna o início de cada bloco de OCCUPANCY_UNIT_MINUTES ocupado pelo intervalo
+    [start_dt, start_dt + duration_minutes). Horários fora da grade são arredondados
+    para fora (o bloco parcial conta como ocupado).
+    """
+    midnight = datetime.combine(start_dt.date(), time(0, 0))
+    unit = timedelta(minutes=OCCUPANCY_UNIT_MINUTES)
+    first = midnight + ((start_dt - midnight) // unit) * unit
+    end_dt = start_dt + timedelta(minutes=duration_minutes)
+    units = []
+    current = first
+    while current < end_dt:
+        units.append(current)
+        current += unit
+    return units
+
+def compile_business_hours(business_hours):
+    """
+    Converte BUSINESS_HOURS ({"monday": [("08:00", "12:00"), ...]}) em intervalos
+    (inicio, fim) em minutos desde 00:00, indexados pelo número do dia da semana.
+    Feito uma única vez, evita chamar strptime a cada slot.
+    """
+    days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+    compiled = []
+    for day_name in days:
+        periods = business_hours.get(day_name) or []
+        compiled.append(tuple((_parse_minutes(start), _parse_minutes(end)) for start, end in periods))
+    return tuple(compiled)
+
+BUSINESS_INTERVALS = compile_business_hours(BUSINESS_HOURS)
+
+@lru_cache(maxsize=128)
+def _compile_overrides(overrides_key):
+    return compile_business_hours(dict(BUSINESS_HOURS, **dict(overrides_key)))
+
+def business_intervals_for(overrides):
+    """
+    Horários compilados de um recurso: BUSINESS_HOURS com os dias presentes em
+    overrides substituídos ({"saturday": [["09:00", "13:00"]]}). Memorizado por conteúdo.
+    """
+    if not overrides:
+        return BUSINESS_INTERVALS
+    overrides_key = tuple(sorted(
+        (day_name, tuple(tuple(period) for period in periods or ())) for day_name, periods in overrides.items()
+    ))
+    return _compile_overrides(overrides_key)
+
+def _busy_intervals(target_date, existing_appointments_for_day, weekday_name):
+    """
+    Converte (datetime_inicio, duracao_minutos) em intervalos ocupados em minutos
+    relativos à meia-noite de target_date, ordenados e mesclados. O almoço dos dias
+    de semana entra como mais um intervalo ocupado.
+    """
+    midnight = datetime.combine(target_date, time(0, 0))
+    one_minute = timedelta(minutes=1)
+    busy = []
+    for start_dt, duration in existing_appointments_for_day:
+        start = (start_dt - midnight) / one_minute
+        busy.append((start, start + duration))
+    if weekday_name in LUNCH_BREAK_DAYS:
+        busy.append(LUNCH_BREAK)
+    busy.sort()
+
+    merged = []
+    for start, end in busy:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+def free_gaps(period_start, period_end, busy, busy_ends):
+    """
+    Subtrai os intervalos ocupados (ordenados e mesclados) do período
+    [period_start, period_end) e retorna as lacunas livres resultantes.
+    busy_ends: lista com o fim de cada intervalo de busy, usada na busca binária.
+    """
+    gaps = []
+    cursor = period_start
+    # Primeiro intervalo ocupado que termina depois do início do período
+    index = bisect_right(busy_ends, period_start)
+    while index < len(busy) and busy[index][0] < period_end:
+        busy_start, busy_end = busy[index]
+        if busy_start > cursor:
+            gaps.append((cursor, busy_start))
+        cursor = max(cursor, busy_end)
+        index += 1
+    if cursor < period_end:
+        gaps.append((cursor, period_end))
+    return gaps
+
+def get_available_slots(date_str, existing_appointments_for_day, service_duration_minutes, business_intervals=None):
+    """
+    Gera slots disponíveis para um determinado dia, considerando os horários de funcionamento,
+    duração do serviço e agendamentos existentes.
+    existing_appointments_for_day: lista de tuplas (datetime_inicio, duracao_minutos) dos agendamentos existentes.
+    service_duration_minutes: duração do serviço em minutos; sem slots se não for positiva.
+    business_intervals: horários já compilados por compile_business_hours (padrão: BUSINESS_INTERVALS).
+
+    Em vez de testar cada slot contra cada agendamento, subtrai os agendamentos (e o almoço)
+    dos períodos de funcionamento e percorre as lacunas livres uma única vez, emitindo os
+    inícios de slot alinhados à grade de SLOT_DURATION_MINUTES que cabem em cada lacuna.
+    O resultado é idêntico ao da implementação original (_get_available_slots_reference)
+    para durações positivas.
+    """
+    if service_duration_minutes <= 0:
+        # Serviço sem duração não ocupa horário nenhum; a implementação original devolvia
+        # horários arbitrários (dependentes do minuto anterior ao slot) nesse caso.
+        return []
+    try:
+        target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    except ValueError:
+        return [] # Data inválida
+
+    if business_intervals is None:
+        business_intervals = BUSINESS_INTERVALS
+    periods = business_intervals[target_date.weekday()]
+    if not periods:
+        return [] # Dia fechado
+
+    busy = _busy_intervals(target_date, existing_appointments_for_day, get_day_name(target_date))
+    busy_ends = [end for _, end in busy]
+
+    available_slots = set()
+    for period_start, period_end in periods:
+        for gap_start, gap_end in free_gaps(period_start, period_end, busy, busy_ends):
+            # Primeiro início de slot da grade do período que não começa antes da lacuna
+            offset = gap_start - period_start
+            slot_start = period_start + int(-(-offset // SLOT_DURATION_MINUTES)) * SLOT_DURATION_MINUTES
+            while slot_start + service_duration_minutes <= gap_end:
+                available_slots.add("%02d:%02d" % divmod(slot_start, 60))
+                slot_start += SLOT_DURATION_MINUTES
+
+    return sorted(available_slots)
+
+def longest_free_gap(target_date, existing_appointments_for_day, business_intervals=None):
+    """
+    Maior lacuna livre do dia em minutos (0 se o dia está fechado ou lotado), com o
+    almoço contando como ocupado. Nenhum serviço mais longo que ela cabe no dia, então
+    a busca do próximo horário livre pode pular o dia sem gerar seus slots.
+    """
+    if business_intervals is None:
+        business_intervals = BUSINESS_INTERVALS
+    periods = business_intervals[target_date.weekday()]
+    busy = _busy_intervals(target_date, existing_appointments_for_day, get_day_name(target_date))
+    busy_ends = [end for _, end in busy]
+    longest = 0
+    for period_start, period_end in periods:
+        for gap_start, gap_end in free_gaps(period_start, period_end, busy, busy_ends):
+            longest = max(longest, gap_end - gap_start)
+    return int(longest)
+
+def get_available_slots_for_range(start_date, end_date, existing_appointments, service_duration_minutes, business_intervals=None):
+    """
+    Calcula os slots disponíveis de cada dia entre start_date e end_date (inclusive).
+    existing_appointments: tuplas (datetime_inicio, duracao_minutos) de todo o intervalo, já
+    carregadas de uma vez; são agrupadas por dia de início em memória.
+    Retorna um dicionário {"YYYY-MM-DD": [slots]}.
+    """
+    appointments_by_day = {}
+    for start_dt, duration in existing_appointments:
+        appointments_by_day.setdefault(start_dt.date(), []).append((start_dt, duration))
+
+    slots_by_day = {}
+    current_date = start_date
+    while current_date <= end_date:
+        date_str = current_date.strftime("%Y-%m-%d")
+        slots_by_day[date_str] = get_available_slots(
+            date_str, appointments_by_day.get(current_date, []), service_duration_minutes, business_intervals
+        )
+        current_date += timedelta(days=1)
+    return slots_by_day
+
 # Exemplo de como usar (para teste)
 if __name__ == "__main__":
     # Simula agendamentos existentes para 2025-10-27 (Segunda)
@@ -0,0 +1,26 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+def upsert_increment(connection, table, keys, increments):
+    """
+    Adds increments ({column: delta}) to the row of table identified by keys
+    ({key_column: value}), creating it with the deltas as initial values when it does
+    not exist. Uses INSERT ... ON CONFLICT DO UPDATE on SQLite/PostgreSQL, so concurrent
+    writers never collide on the primary key; other databases fall back to UPDATE + INSERT.
+    """
+    values = dict(keys, **increments)
+    dialect_insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(connection.dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[name] for name in keys],
+            set_={name: table.c[name] + stmt.excluded[name] for name in increments}
+        )
+        connection.execute(stmt)
+        return
+    result = connection.execute(
+        table.update().where(*[table.c[name] == value for name, value in keys.items()]).values(
+            **{name: table.c[name] + delta for name, delta in increments.items()}
+        )
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(**values))
@@ -0,0 +1,267 @@
+import time
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+from app import db
+from app.models import (
+    Appointment, AppointmentSlot, OutboxMessage, Service, WaitlistDay, WaitlistEntry, NON_BLOCKING_STATUSES
+)
+from app.notifications import KIND_WAITLIST_OFFER, enqueue_appointment_notifications
+from app.queries import overlapping_appointments
+from app.utils.availability_cache import bump_dates
+from app.utils.scheduling import occupied_units
+
+# Waitlist: customers ask for a service anywhere in a date window. When a blocking
+# appointment is cancelled, expires, is deleted or moves, the Appointment events below
+# record the interval it freed; once the flush has released its guard rows, the oldest
+# waiting entry whose service fits is looked up through the WaitlistDay index (day,
+# duration_minutes) and offered the time. The offer is a "Held" appointment, so every
+# availability and booking path already treats the time as taken, plus an outbox
+# message. The customer claims it (Held -> Scheduled) before hold_expires_at; otherwise
+# `flask waitlist expire` (or a later claim) marks the hold Expired, which frees the
+# interval again and offers it to the next entry. Everything runs in the transaction of
+# the change that freed the time, so only the entries on that day are read.
+
+HELD_STATUS = "Held"
+# Candidate entries fetched per freed interval; more are only needed when several are stale
+MATCH_BATCH_SIZE = 20
+
+class WaitlistError(Exception):
+    """The waitlist operation is not allowed in the entry's current state."""
+
+# --- Entries ---
+
+def join_waitlist(user_id, service, window_start, window_end):
+    entry = WaitlistEntry(
+        user_id=user_id,
+        service_id=service.id,
+        window_start=window_start,
+        window_end=window_end,
+        duration_minutes=service.duration_minutes,
+        status="waiting"
+    )
+    current_date = window_start
+    while current_date <= window_end:
+        entry.days.append(WaitlistDay(day=current_date, duration_minutes=service.duration_minutes))
+        current_date += timedelta(days=1)
+    db.session.add(entry)
+    db.session.commit()
+    return entry
+
+def _release(appointment, status):
+    """Marks a held or booked appointment as no longer occupying its time."""
+    # Guard rows first: loading the collection autoflushes, and a status change flushed
+    # before the rows are gone would be offered to the waitlist while still guarded
+    appointment.occupied_slots = [] # deletes the guard rows so the time can be booked again
+    appointment.status = status
+
+def _held_appointment(entry):
+    """
+    The entry's held appointment, or None when it is gone: deleted (appointment_id is
+    then NULL) or no longer Held, e.g. cancelled by the shop. The offer is then void.
+    """
+    if entry.appointment_id is None:
+        return None
+    appointment = db.session.get(Appointment, entry.appointment_id)
+    if appointment is None or appointment.status != HELD_STATUS:
+        return None
+    return appointment
+
+def _release_hold(entry):
+    appointment = _held_appointment(entry)
+    if appointment is not None:
+        _release(appointment, "Expired")
+
+def _expire_if_due(entry, now):
+    if entry.status == "offered" and (entry.hold_expires_at <= now or _held_appointment(entry) is None):
+        entry.status = "expired"
+        _release_hold(entry)
+        return True
+    return False
+
+def claim_offer(entry, now=None):
+    """Turns the held appointment into a booking. Raises WaitlistError when the hold has lapsed or is gone."""
+    now = now or datetime.now()
+    if _expire_if_due(entry, now):
+        db.session.commit()
+        raise WaitlistError("The offer has expired.")
+    if entry.status != "offered":
+        raise WaitlistError("There is no pending offer for this entry.")
+    appointment = _held_appointment(entry)
+    appointment.status = "Scheduled"
+    entry.status = "booked"
+    entry.hold_expires_at = None
+    enqueue_appointment_notifications(appointment, now)
+    db.session.commit()
+    return appointment
+
+def decline_offer(entry):
+    """Gives the held time back; it is offered to the next matching entry."""
+    if entry.status != "offered":
+        raise WaitlistError("There is no pending offer for this entry.")
+    entry.status = "declined"
+    _release_hold(entry)
+    db.session.commit()
+
+def leave_waitlist(entry):
+    if entry.status == "offered":
+        _release_hold(entry)
+    elif entry.status != "waiting":
+        raise WaitlistError("The entry is no longer active.")
+    entry.status = "cancelled"
+    entry.days = []
+    db.session.commit()
+
+def expire_holds(now=None, batch_size=100):
+    """Expires lapsed offers, one commit each so every freed hold is matched on its own. Returns the count."""
+    now = now or datetime.now()
+    expired = 0
+    while True:
+        entries = WaitlistEntry.query.filter(
+            WaitlistEntry.status == "offered",
+            WaitlistEntry.hold_expires_at <= now
+        ).order_by(WaitlistEntry.hold_expires_at).limit(batch_size).all()
+        if not entries:
+            return expired
+        for entry in entries:
+            _expire_if_due(entry, now)
+            db.session.commit()
+            expired += 1
+
+# --- Matching, driven by Appointment events ---
+
+_FREED_KEY = "waitlist_freed_intervals"
+
+def _old_value(state, attr_name):
+    history = state.attrs[attr_name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, attr_name)
+
+def _record_freed(target, appointment_time, end_time, resource_id):
+    session = object_session(target)
+    if session is None or appointment_time is None or end_time is None:
+        return
+    session.info.setdefault(_FREED_KEY, []).append((appointment_time, end_time, resource_id))
+
+@event.listens_for(Appointment, "after_update")
+def _appointment_updated(mapper, connection, target):
+    state = inspect(target)
+    old_status = _old_value(state, "status")
+    if old_status in NON_BLOCKING_STATUSES:
+        return
+    old_time = _old_value(state, "appointment_time")
+    old_end = _old_value(state, "end_time")
+    old_resource_id = _old_value(state, "resource_id")
+    moved = (old_time, old_end, old_resource_id) != (target.appointment_time, target.end_time, target.resource_id)
+    if target.status in NON_BLOCKING_STATUSES or moved:
+        _record_freed(target, old_time, old_end, old_resource_id)
+
+@event.listens_for(Appointment, "after_delete")
+def _appointment_deleted(mapper, connection, target):
+    if target.status not in NON_BLOCKING_STATUSES:
+        _record_freed(target, target.appointment_time, target.end_time, target.resource_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_freed_intervals(session):
+    # A failed flush never reaches after_flush; don't carry its intervals into the next one
+    session.info.pop(_FREED_KEY, None)
+
+@event.listens_for(Session, "after_flush")
+def _match_freed_intervals(session, flush_context):
+    # after_flush, not after_update: the freed appointment's guard rows are deleted late
+    # in the flush, and the hold reuses the same (resource_key, slot_time) units.
+    freed = session.info.pop(_FREED_KEY, None)
+    if not freed:
+        return
+    connection = session.connection()
+    now = datetime.now()
+    hold_minutes = current_app.config["WAITLIST_HOLD_MINUTES"]
+    for appointment_time, end_time, resource_id in freed:
+        if appointment_time > now:
+            _offer_interval(connection, appointment_time, end_time, resource_id, now, hold_minutes)
+
+def _offer_interval(connection, start_dt, end_dt, resource_id, now, hold_minutes):
+    freed_minutes = (end_dt - start_dt) // timedelta(minutes=1)
+    candidates = connection.execute(
+        select(WaitlistEntry.id, WaitlistEntry.user_id, WaitlistEntry.service_id, WaitlistEntry.duration_minutes).join(
+            WaitlistDay, WaitlistDay.entry_id == WaitlistEntry.id
+        ).where(
+            WaitlistDay.day == start_dt.date(),
+            WaitlistDay.duration_minutes <= freed_minutes,
+            WaitlistEntry.status == "waiting"
+        ).order_by(WaitlistDay.entry_id).limit(MATCH_BATCH_SIZE)
+    ).all()
+    for entry_id, user_id, service_id, duration_minutes in candidates:
+        if _offer(connection, entry_id, user_id, service_id, duration_minutes, start_dt, resource_id, now, hold_minutes):
+            return True
+    return False
+
+def _offer(connection, entry_id, user_id, service_id, duration_minutes, start_dt, resource_id, now, hold_minutes):
+    """Reserves [start_dt, start_dt + duration) for the entry. False if the time is taken after all."""
+    end_dt = start_dt + timedelta(minutes=duration_minutes)
+    # Same overlap check as booking: guard rows alone miss appointments stored without
+    # them and shared appointments (no resource), which block every chair
+    if connection.execute(overlapping_appointments(start_dt, end_dt, resource_id).with_for_update()).first() is not None:
+        return False
+    nested = connection.begin_nested()
+    try:
+        appointment_id = connection.execute(Appointment.__table__.insert().values(
+            user_id=user_id,
+            service_id=service_id,
+            resource_id=resource_id,
+            appointment_time=start_dt,
+            end_time=end_dt,
+            status=HELD_STATUS,
+            price=select(Service.price).where(Service.id == service_id).scalar_subquery()
+        )).inserted_primary_key[0]
+        connection.execute(AppointmentSlot.__table__.insert(), [
+            {"appointment_id": appointment_id, "resource_key": resource_id or 0, "slot_time": unit_start}
+            for unit_start in occupied_units(start_dt, duration_minutes)
+        ])
+        # Core insert: the mapper events that invalidate cached availability do not fire
+        bump_dates(connection, [start_dt.date().isoformat()])
+        nested.commit()
+    except IntegrityError:
+        # A concurrent booking took part of the interval since the check
+        nested.rollback()
+        return False
+
+    connection.execute(WaitlistEntry.__table__.update().where(WaitlistEntry.id == entry_id).values(
+        status="offered",
+        appointment_id=appointment_id,
+        hold_expires_at=now + timedelta(minutes=hold_minutes)
+    ))
+    connection.execute(WaitlistDay.__table__.delete().where(WaitlistDay.entry_id == entry_id))
+    connection.execute(OutboxMessage.__table__.insert().values(
+        kind=KIND_WAITLIST_OFFER,
+        user_id=user_id,
+        appointment_id=appointment_id,
+        idempotency_key=f"waitlist-{entry_id}-offer-{appointment_id}",
+        status="pending",
+        attempts=0,
+        next_attempt_at=now,
+        created_at=now
+    ))
+    return True
+
+# --- CLI ---
+
+waitlist_cli = AppGroup("waitlist", help="Waitlist maintenance.")
+
+@waitlist_cli.command("expire")
+@click.option("--loop", is_flag=True, help="Keep running instead of stopping after one pass.")
+@click.option("--interval", default=30.0, show_default=True, help="Seconds to sleep between passes with --loop.")
+def expire_command(loop, interval):
+    """Expire lapsed waitlist offers and pass their time to the next entry."""
+    while True:
+        expired = expire_holds()
+        if expired:
+            click.echo(f"Expired {expired} offers.")
+        if not loop:
+            break
+        time.sleep(interval)
@@ -0,0 +1,154 @@
+"""
+Query plans and timings for the hot Appointment queries, with and without the
+indexes added in migration 8d4e6b1f2a37.
+
+    python -m benchmarks.appointment_indexes --appointments 1000000
+
+Uses a throwaway SQLite file by default; pass --database-url to run against
+PostgreSQL (plans come from EXPLAIN ANALYZE there). Every table of that database is
+dropped, so a URL that does not look like a scratch database also needs --yes-drop.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from benchmarks.harness import prepare_scratch_database
+
+QUERIES = {
+    "day_intervals": (
+        "SELECT appointment_time, end_time FROM appointment "
+        "WHERE appointment_time >= :start AND appointment_time <= :end"
+    ),
+    "day_intervals_joined_legacy": (
+        "SELECT appointment.appointment_time, service.duration_minutes FROM appointment "
+        "JOIN service ON appointment.service_id = service.id "
+        "WHERE appointment.appointment_time >= :start AND appointment.appointment_time <= :end"
+    ),
+    "overlap_check": (
+        "SELECT id FROM appointment "
+        "WHERE appointment_time >= :day_start AND appointment_time < :slot_end AND end_time > :slot_start LIMIT 1"
+    ),
+    "user_history": (
+        "SELECT id, appointment_time FROM appointment "
+        "WHERE user_id = :user_id ORDER BY appointment_time"
+    ),
+    "status_month": (
+        "SELECT id FROM appointment "
+        "WHERE status = :status AND appointment_time >= :month_start AND appointment_time < :month_end"
+    ),
+}
+
+INDEX_NAMES = (
+    "ix_appointment_appointment_time",
+    "ix_appointment_user_id_appointment_time",
+    "ix_appointment_status_appointment_time",
+)
+
+def populate(db, Appointment, Service, User, appointment_count, user_count, batch_size=20000):
+    rng = random.Random(42)
+    with db.engine.begin() as conn:
+        conn.execute(Service.__table__.insert(), [
+            {"id": i, "name": f"Service {i}", "price": 30.0 + i * 10, "duration_minutes": duration}
+            for i, duration in enumerate((30, 45, 60, 90), start=1)
+        ])
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com"}
+            for i in range(1, user_count + 1)
+        ])
+    durations = {1: 30, 2: 45, 3: 60, 4: 90}
+    start = datetime(2015, 1, 1, 8, 0)
+    # Roughly 10 years of history spread over the slot grid
+    grid_slots = 10 * 365 * 22
+    inserted = 0
+    while inserted < appointment_count:
+        rows = []
+        for _ in range(min(batch_size, appointment_count - inserted)):
+            service_id = rng.randint(1, 4)
+            appointment_time = start + timedelta(minutes=30 * rng.randrange(grid_slots))
+            rows.append({
+                "user_id": rng.randint(1, user_count),
+                "service_id": service_id,
+                "appointment_time": appointment_time,
+                "end_time": appointment_time + timedelta(minutes=durations[service_id]),
+                "status": rng.choice(("Scheduled", "Scheduled", "Completed", "Cancelled")),
+            })
+        with db.engine.begin() as conn:
+            conn.execute(Appointment.__table__.insert(), rows)
+        inserted += len(rows)
+
+def explain(conn, sql, params):
+    if conn.dialect.name == "postgresql":
+        return [row[0] for row in conn.execute(text("EXPLAIN ANALYZE " + sql), params)]
+    return [" ".join(str(col) for col in row[1:]) for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql), params)]
+
+def time_query(conn, sql, params_list):
+    timings = []
+    for params in params_list:
+        started = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], timings[-1]
+
+def sample_params(rng, user_count, samples):
+    params = {name: [] for name in QUERIES}
+    for _ in range(samples):
+        day = datetime(2015, 1, 1) + timedelta(days=rng.randrange(3650))
+        slot_start = day + timedelta(hours=rng.randrange(8, 18))
+        month_start = day.replace(day=1)
+        month_end = (month_start + timedelta(days=32)).replace(day=1)
+        day_params = {"start": day, "end": day + timedelta(days=1, microseconds=-1)}
+        params["day_intervals"].append(day_params)
+        params["day_intervals_joined_legacy"].append(day_params)
+        params["overlap_check"].append({"day_start": day, "slot_start": slot_start, "slot_end": slot_start + timedelta(minutes=60)})
+        params["user_history"].append({"user_id": rng.randint(1, user_count)})
+        params["status_month"].append({"status": "Scheduled", "month_start": month_start, "month_end": month_end})
+    return params
+
+def report(conn, params, label):
+    print(f"\n=== {label} ===")
+    for name, sql in QUERIES.items():
+        p50, worst = time_query(conn, sql, params[name])
+        print(f"{name:<30} p50 {p50:8.2f} ms   max {worst:8.2f} ms")
+        for line in explain(conn, sql, params[name][0]):
+            print(f"    {line}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--appointments", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--database-url", default="sqlite:////tmp/barbearia_index_benchmark.db")
+    parser.add_argument("--yes-drop", action="store_true", help="drop --database-url even if it does not look like a scratch database")
+    args = parser.parse_args()
+
+    prepare_scratch_database(args.database_url, args.yes_drop)
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from app import app, db
+    from app.models import Appointment, Service, User
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        populate(db, Appointment, Service, User, args.appointments, args.users)
+        print(f"Inserted {args.appointments} appointments in {time.perf_counter() - started:.1f}s")
+
+        params = sample_params(random.Random(7), args.users, args.samples)
+        indexes = [index for index in Appointment.__table__.indexes if index.name in INDEX_NAMES]
+        with db.engine.connect() as conn:
+            report(conn, params, "with indexes")
+        for index in indexes:
+            index.drop(db.engine)
+        with db.engine.connect() as conn:
+            report(conn, params, "without indexes")
+        for index in indexes:
+            index.create(db.engine)
+
+if __name__ == "__main__":
+    main()
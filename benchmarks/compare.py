@@ -0,0 +1,47 @@
+"""
+Compares two result files written by `python -m benchmarks.run --output ...`.
+
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "queries_per_call", "peak_memory_kib")
+
+def _change(before, after):
+    if before in (None, 0) or after is None:
+        return "-"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+def compare(before, after):
+    before_rows = {row["name"]: row for row in before["scenarios"]}
+    lines = []
+    for row in after["scenarios"]:
+        old = before_rows.get(row["name"])
+        if old is None:
+            lines.append(f"{row['name']}: new scenario")
+            continue
+        lines.append(row["name"])
+        for metric in METRICS:
+            lines.append(f"    {metric:<18} {str(old.get(metric)):>10} -> {str(row.get(metric)):>10}  {_change(old.get(metric), row.get(metric)):>8}")
+    for name in before_rows.keys() - {row["name"] for row in after["scenarios"]}:
+        lines.append(f"{name}: missing from the second run")
+    if "contention" in before and "contention" in after:
+        lines.append("contention")
+        for key in ("successes", "conflicts", "errors", "double_bookings", "p50_ms", "max_ms"):
+            lines.append(f"    {key:<18} {str(before['contention'].get(key)):>10} -> {str(after['contention'].get(key)):>10}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args(argv)
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    print(compare(before, after))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Measurement helpers shared by the benchmark scenarios."""
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+# Database names that mark a server database as disposable
+SCRATCH_DATABASE_MARKERS = ("bench", "scratch", "test")
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def is_scratch_database(database_url):
+    """
+    True for databases a benchmark may drop: in-memory SQLite, SQLite files under the
+    temp directory, and server databases whose name contains a SCRATCH_DATABASE_MARKERS word.
+    """
+    url = make_url(database_url)
+    database = url.database or ""
+    if url.get_backend_name() == "sqlite":
+        if database in ("", ":memory:"):
+            return True
+        temp_dir = os.path.realpath(tempfile.gettempdir())
+        return os.path.commonpath([os.path.realpath(database), temp_dir]) == temp_dir
+    return any(marker in database.lower() for marker in SCRATCH_DATABASE_MARKERS)
+
+def prepare_scratch_database(database_url, yes_drop=False):
+    """
+    Refuses (SystemExit) to run against a database that does not look disposable unless
+    yes_drop is set, then deletes an existing SQLite file so the run starts empty.
+    The benchmark itself drops and recreates every table.
+    """
+    if not yes_drop and not is_scratch_database(database_url):
+        raise SystemExit(
+            f"Refusing to drop {make_url(database_url).render_as_string(hide_password=True)}: it does not look "
+            "like a scratch database (in-memory or temp-dir SQLite, or a name containing "
+            f"{'/'.join(SCRATCH_DATABASE_MARKERS)}). Pass --yes-drop to drop it anyway."
+        )
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:") and os.path.exists(url.database):
+        os.remove(url.database)
+
+class QueryCounter:
+    """Counts SQL statements executed on any engine while active (thread-local)."""
+
+    def __init__(self):
+        self._local = threading.local()
+        event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if getattr(self._local, "active", False):
+            self._local.count += 1
+
+    @contextmanager
+    def counting(self):
+        self._local.active = True
+        self._local.count = 0
+        try:
+            yield self
+        finally:
+            self._local.active = False
+
+    @property
+    def count(self):
+        return getattr(self._local, "count", 0)
+
+def measure(name, iterations, func, query_counter=None, memory_iterations=20):
+    """
+    Runs func(i) iterations times and returns latency percentiles (ms) and the average
+    number of SQL statements per call. Peak memory (KiB) comes from a separate, shorter
+    pass under tracemalloc so its overhead does not distort the latencies.
+    """
+    latencies = []
+    total_queries = 0
+    for i in range(iterations):
+        started = time.perf_counter()
+        if query_counter is not None:
+            with query_counter.counting():
+                func(i)
+            total_queries += query_counter.count
+        else:
+            func(i)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    try:
+        for i in range(min(iterations, memory_iterations)):
+            func(iterations + i)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "name": name,
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+        "queries_per_call": round(total_queries / iterations, 2) if query_counter is not None and iterations else None,
+        "peak_memory_kib": round(peak / 1024, 1)
+    }
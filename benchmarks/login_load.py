@@ -0,0 +1,111 @@
+"""
+Login throughput with password hashing inline vs. offloaded to the process pool.
+
+    python -m benchmarks.login_load --threads 8 --logins 200 --rounds 12
+
+Each mode gets a fresh SQLite database and app. Login requests are submitted to a
+thread pool the size of a gunicorn worker's --threads, and GET /services probes are
+queued behind them every --probe-interval seconds; the probe latency shows whether
+cheap requests still find a free thread during the login burst.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import percentile
+
+PASSWORD = "senha-de-teste"
+
+def build_app(path, rounds, offload, max_pending, workers):
+    from app import create_app, db
+    from app.models import User
+    from app.passwords import _hash
+
+    if os.path.exists(path):
+        os.remove(path)
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+        "WTF_CSRF_ENABLED": False,
+        "BCRYPT_LOG_ROUNDS": rounds,
+        "PASSWORD_HASH_OFFLOAD": offload,
+        "PASSWORD_HASH_MAX_PENDING": max_pending,
+        "PASSWORD_HASH_WORKERS": workers
+    })
+    return app, db, User, _hash(PASSWORD, rounds)
+
+def run_mode(name, args, offload):
+    path = f"/tmp/barbearia_login_load_{name}.db"
+    app, db, User, password_hash = build_app(path, args.rounds, offload, args.max_pending, args.hash_workers)
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as conn:
+            conn.execute(User.__table__.insert(), [
+                {"id": i, "username": f"cliente{i}", "email": f"cliente{i}@example.com", "password_hash": password_hash}
+                for i in range(1, args.users + 1)
+            ])
+
+    def login(i):
+        client = app.test_client()
+        started = time.perf_counter()
+        response = client.post("/login", data={"email": f"cliente{i % args.users + 1}@example.com", "password": PASSWORD})
+        return response.status_code, (time.perf_counter() - started) * 1000
+
+    def probe(submitted):
+        response = app.test_client().get("/services")
+        return response.status_code, (time.perf_counter() - submitted) * 1000
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        started = time.perf_counter()
+        login_futures = [pool.submit(login, i) for i in range(args.logins)]
+        probe_futures = []
+        while not all(future.done() for future in login_futures):
+            probe_futures.append(pool.submit(probe, time.perf_counter()))
+            time.sleep(args.probe_interval)
+        logins = [future.result() for future in login_futures]
+        elapsed = time.perf_counter() - started
+        probes = [future.result() for future in probe_futures]
+
+    app.extensions["password_hasher"].shutdown()
+    login_ms = sorted(ms for status, ms in logins if status == 302)
+    probe_ms = sorted(ms for _, ms in probes)
+    return {
+        "mode": name,
+        "logins": len(logins),
+        "succeeded": len(login_ms),
+        "rejected_503": sum(1 for status, _ in logins if status == 503),
+        "logins_per_second": round(len(login_ms) / elapsed, 1),
+        "login_p50_ms": round(percentile(login_ms, 0.50), 1),
+        "login_p95_ms": round(percentile(login_ms, 0.95), 1),
+        "probes": len(probe_ms),
+        "probe_p50_ms": round(percentile(probe_ms, 0.50), 1),
+        "probe_p95_ms": round(percentile(probe_ms, 0.95), 1)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8, help="request threads, as in gunicorn --threads")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt work factor")
+    parser.add_argument("--hash-workers", type=int, default=2)
+    parser.add_argument("--max-pending", type=int, default=4)
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    results = {"args": vars(args), "modes": [run_mode("inline", args, False), run_mode("offloaded", args, True)]}
+    for row in results["modes"]:
+        print(
+            f"{row['mode']:<10} {row['logins_per_second']:7.1f} logins/s  "
+            f"login p50/p95 {row['login_p50_ms']:.0f}/{row['login_p95_ms']:.0f} ms  "
+            f"probe p50/p95 {row['probe_p50_ms']:.0f}/{row['probe_p95_ms']:.0f} ms  "
+            f"503s {row['rejected_503']}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Benchmarks for the scheduling and booking hot paths.
+
+    python -m benchmarks.run --users 500 --months 6 --density 0.7 --output before.json
+    python -m benchmarks.compare before.json after.json
+
+A synthetic shop is generated in a throwaway SQLite file (or --database-url, which is
+dropped and recreated, e.g. a local PostgreSQL; a URL that does not look like a scratch
+database also needs --yes-drop). Each scenario reports p50/p95/p99 latency, SQL
+statements per call and peak traced memory.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.harness import QueryCounter, measure, prepare_scratch_database
+from benchmarks.synthetic import generate_shop, month_starts
+
+def _login(client, user_id):
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+        sess["_fresh"] = True
+
+def _shop_days(summary):
+    first_month = datetime.strptime(summary["first_month"], "%Y-%m-%d").date()
+    days = []
+    for month_start in month_starts(first_month, summary["months"]):
+        current = month_start
+        while current.month == month_start.month:
+            days.append(current)
+            current += timedelta(days=1)
+    return days
+
+def scenario_direct_slots(db, days, iterations, rng):
+    from app.queries import appointment_intervals_for_day
+    from app.utils.scheduling import get_available_slots
+    inputs = [(day.strftime("%Y-%m-%d"), appointment_intervals_for_day(day)) for day in days]
+    durations = (15, 30, 45, 60, 90, 120)
+    picks = [(rng.choice(inputs), rng.choice(durations)) for _ in range(iterations + 20)]
+    return measure("get_available_slots (direct)", iterations,
+                   lambda i: get_available_slots(picks[i][0][0], picks[i][0][1], picks[i][1]))
+
+def scenario_slots_endpoint(client, days, iterations, rng, counter, service_count, cold):
+    from app.utils.availability_cache import slot_cache
+    picks = [(rng.choice(days).isoformat(), rng.randint(1, service_count)) for _ in range(iterations + 20)]
+
+    def call(i):
+        if cold:
+            slot_cache.clear()
+        response = client.post("/appointments/get_available_slots", json={"date": picks[i][0], "service_id": picks[i][1]})
+        assert response.status_code == 200, response.status_code
+
+    name = "POST /appointments/get_available_slots ({})".format("cold cache" if cold else "warm cache")
+    return measure(name, iterations, call, counter)
+
+def scenario_range_endpoint(client, days, iterations, rng, counter):
+    from app.utils.availability_cache import slot_cache
+    starts = [rng.choice(days[:-7] or days) for _ in range(iterations + 20)]
+
+    def call(i):
+        slot_cache.clear()
+        response = client.post("/appointments/get_available_slots_range", json={
+            "start_date": starts[i].isoformat(),
+            "end_date": (starts[i] + timedelta(days=6)).isoformat(),
+            "service_id": 1
+        })
+        assert response.status_code == 200, response.status_code
+
+    return measure("POST /appointments/get_available_slots_range (7 days, cold)", iterations, call, counter)
+
+def scenario_next_available(client, days, iterations, rng, counter, service_count, cold):
+    from app.utils.availability_cache import slot_cache
+    picks = [(rng.choice(days).isoformat(), rng.randint(1, service_count)) for _ in range(iterations + 20)]
+
+    def call(i):
+        if cold:
+            slot_cache.clear()
+        response = client.post("/appointments/next_available", json={"from": picks[i][0], "service_id": picks[i][1], "limit": 5})
+        assert response.status_code == 200, response.status_code
+
+    name = "POST /appointments/next_available (5 results, {})".format("cold cache" if cold else "warm cache")
+    return measure(name, iterations, call, counter)
+
+def scenario_book(client, days, iterations, counter):
+    from app.utils.scheduling import get_available_slots
+    # Book into empty days after the generated horizon, one free 30-minute slot each time
+    free = []
+    current = days[-1] + timedelta(days=1)
+    while len(free) < iterations + 20:
+        date_str = current.strftime("%Y-%m-%d")
+        free.extend((date_str, time_str) for time_str in get_available_slots(date_str, [], 60)[::2])
+        current += timedelta(days=1)
+
+    def call(i):
+        response = client.post("/appointments/book", data={"service_id": 1, "date": free[i][0], "time": free[i][1]})
+        assert response.status_code in (200, 302), response.status_code
+
+    return measure("POST /appointments/book", iterations, call, counter)
+
+def scenario_month(client, days, iterations, rng, counter, response_format, revalidate):
+    months = sorted({(day.year, day.month) for day in days})
+    picks = [rng.choice(months) for _ in range(iterations + 20)]
+    etags = {}
+    if revalidate:
+        for year, month in months:
+            response = client.get(f"/appointments/api/month_appointments?year={year}&month={month}&format={response_format}")
+            etags[(year, month)] = response.headers.get("ETag")
+
+    def call(i):
+        year, month = picks[i]
+        headers = {"If-None-Match": etags[(year, month)]} if revalidate else {}
+        response = client.get(f"/appointments/api/month_appointments?year={year}&month={month}&format={response_format}", headers=headers)
+        assert response.status_code == (304 if revalidate else 200), response.status_code
+
+    name = f"GET /appointments/api/month_appointments ({response_format}{', If-None-Match' if revalidate else ''})"
+    return measure(name, iterations, call, counter)
+
+def scenario_contention(app, days, rounds, threads):
+    """Many threads book the same slot at once; exactly one must win each round."""
+    from app.booking import BookingConflict, book_appointment_atomic
+    from app.models import Service
+    from app.utils.scheduling import get_available_slots
+
+    targets = []
+    current = days[-1] + timedelta(days=60)
+    while len(targets) < rounds:
+        date_str = current.strftime("%Y-%m-%d")
+        targets.extend(datetime.strptime(f"{date_str} {t}", "%Y-%m-%d %H:%M") for t in get_available_slots(date_str, [], 60))
+        current += timedelta(days=1)
+
+    outcome = {"rounds": rounds, "threads": threads, "successes": 0, "conflicts": 0, "errors": 0, "double_bookings": 0}
+    latencies = []
+    lock = threading.Lock()
+    for round_index in range(rounds):
+        barrier = threading.Barrier(threads)
+        wins = []
+
+        def worker(user_id):
+            with app.app_context():
+                from app import db
+                service = db.session.get(Service, 1)
+                # Give the connection back while waiting: with more threads than the pool
+                # holds, the last ones would never reach the barrier
+                db.session.close()
+                barrier.wait()
+                started = time.perf_counter()
+                try:
+                    book_appointment_atomic(user_id, service, targets[round_index])
+                    result = "successes"
+                except BookingConflict:
+                    result = "conflicts"
+                except Exception:
+                    db.session.rollback()
+                    result = "errors"
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    outcome[result] += 1
+                    latencies.append(elapsed)
+                    if result == "successes":
+                        wins.append(user_id)
+
+        workers = [threading.Thread(target=worker, args=(user_id,)) for user_id in range(1, threads + 1)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        if len(wins) > 1:
+            outcome["double_bookings"] += 1
+    latencies.sort()
+    outcome["p50_ms"] = round(latencies[len(latencies) // 2], 3)
+    outcome["max_ms"] = round(latencies[-1], 3)
+    return outcome
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--services", type=int, default=4)
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--density", type=float, default=0.6, help="fraction of each day's starting slots to book")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--contention-rounds", type=int, default=20)
+    parser.add_argument("--contention-threads", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--database-url", default="sqlite:////tmp/barbearia_benchmark.db")
+    parser.add_argument("--yes-drop", action="store_true", help="drop --database-url even if it does not look like a scratch database")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    prepare_scratch_database(args.database_url, args.yes_drop)
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from app import app, db
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+
+    rng = random.Random(args.seed)
+    counter = QueryCounter()
+    results = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "database": args.database_url.split(":")[0],
+            "args": vars(args)
+        },
+        "scenarios": []
+    }
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        summary = generate_shop(db, users=args.users, services=args.services, months=args.months,
+                                density=args.density, seed=args.seed)
+        summary["generation_seconds"] = round(time.perf_counter() - started, 2)
+        results["shop"] = summary
+        print(f"Generated {summary['appointments']} appointments in {summary['generation_seconds']}s")
+
+        days = _shop_days(summary)
+        scenarios = results["scenarios"]
+        scenarios.append(scenario_direct_slots(db, days, args.iterations, rng))
+
+        client = app.test_client()
+        _login(client, 1)
+        scenarios.append(scenario_slots_endpoint(client, days, args.iterations, rng, counter, args.services, cold=True))
+        scenarios.append(scenario_slots_endpoint(client, days, args.iterations, rng, counter, args.services, cold=False))
+        scenarios.append(scenario_range_endpoint(client, days, args.iterations, rng, counter))
+        scenarios.append(scenario_next_available(client, days, args.iterations, rng, counter, args.services, cold=True))
+        scenarios.append(scenario_next_available(client, days, args.iterations, rng, counter, args.services, cold=False))
+        for response_format in ("full", "compact"):
+            scenarios.append(scenario_month(client, days, args.iterations, rng, counter, response_format, revalidate=False))
+        scenarios.append(scenario_month(client, days, args.iterations, rng, counter, "compact", revalidate=True))
+        scenarios.append(scenario_book(client, days, args.iterations, counter))
+        db.session.remove()
+
+    results["contention"] = scenario_contention(app, days, args.contention_rounds, args.contention_threads)
+
+    print()
+    print(f"{'scenario':<62} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8} {'peak KiB':>10}")
+    for row in results["scenarios"]:
+        queries = "-" if row["queries_per_call"] is None else row["queries_per_call"]
+        print(f"{row['name']:<62} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9} {queries:>8} {row['peak_memory_kib']:>10}")
+    contention = results["contention"]
+    print(f"\nContention: {contention['rounds']} rounds x {contention['threads']} threads -> "
+          f"{contention['successes']} booked, {contention['conflicts']} conflicts, "
+          f"{contention['errors']} errors, {contention['double_bookings']} double bookings")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Cold-start cost of the application package, each snippet timed in a fresh interpreter.
+
+    python -m benchmarks.startup --runs 15
+
+"import package" is what a test module or CLI helper pays to reach the extensions and
+create_app; "create_app()" adds a configured app with its blueprints and engine; "from
+app import app" builds the lazily created default app. "eager module-level app" is the
+old layout for comparison: the package built the app at import time and pulled in every
+view, model and extension, so merely importing anything under app paid that cost.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# The old app/__init__ equivalent: app created and every module imported as a side effect
+EAGER_MODULE_APP = "; ".join([
+    "import app",
+    "app.app",
+    "import app.models, app.url_helpers, app.routes.appointments, app.routes.reports, app.routes.metrics",
+    "import app.booking, app.availability, app.notifications, app.data_transfer, app.resources",
+])
+
+SNIPPETS = {
+    "eager module-level app (old layout)": EAGER_MODULE_APP,
+    "import package": "import app",
+    "create_app()": "from app import create_app; create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})",
+    "from app import app (lazy default)": "from app import app",
+}
+
+def time_snippet(code, runs, env):
+    """Wall-clock milliseconds of `python -c code`, one sample per run."""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, env=env)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, DATABASE_URL=os.environ.get("DATABASE_URL", "sqlite://"))
+    baseline = statistics.median(time_snippet("pass", args.runs, env))
+    results = {"interpreter_ms": round(baseline, 1), "snippets": []}
+    print(f"{'interpreter start':<36} {baseline:8.1f} ms")
+    for name, code in SNIPPETS.items():
+        samples = time_snippet(code, args.runs, env)
+        median = statistics.median(samples)
+        results["snippets"].append({
+            "name": name,
+            "median_ms": round(median, 1),
+            "min_ms": round(min(samples), 1),
+            "over_interpreter_ms": round(median - baseline, 1)
+        })
+        print(f"{name:<36} {median:8.1f} ms  (+{median - baseline:.1f} ms over interpreter)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
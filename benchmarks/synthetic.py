@@ -0,0 +1,94 @@
+"""
+Synthetic shop generator for the benchmarks: users, services and a configurable
+density of appointments spread over whole months, written with Core bulk inserts.
+"""
+import random
+from datetime import date, datetime, timedelta
+
+from app.utils.scheduling import get_available_slots, occupied_units
+
+SERVICE_CATALOG = (
+    ("Corte", 40.0, 30),
+    ("Barba", 30.0, 30),
+    ("Corte + Barba", 65.0, 60),
+    ("Pigmentação", 50.0, 45),
+    ("Platinado", 150.0, 120),
+    ("Sobrancelha", 15.0, 15),
+)
+
+def month_starts(first_month, months):
+    current = first_month.replace(day=1)
+    for _ in range(months):
+        yield current
+        current = (current + timedelta(days=32)).replace(day=1)
+
+def generate_shop(db, users=200, services=4, months=3, density=0.6, first_month=None, seed=1234, batch_size=5000):
+    """
+    Fills an empty database. density is the fraction of each day's free starting slots
+    that get booked (appointments never overlap, as in production). Returns a summary dict.
+    """
+    from app.models import Appointment, AppointmentSlot, Service, User
+
+    rng = random.Random(seed)
+    first_month = first_month or date.today().replace(day=1)
+    catalog = [SERVICE_CATALOG[i % len(SERVICE_CATALOG)] for i in range(services)]
+
+    with db.engine.begin() as conn:
+        conn.execute(Service.__table__.insert(), [
+            {"id": i, "name": name if i <= len(SERVICE_CATALOG) else f"{name} {i}", "price": price, "duration_minutes": duration}
+            for i, (name, price, duration) in enumerate(catalog, start=1)
+        ])
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "username": f"cliente{i}", "email": f"cliente{i}@example.com"}
+            for i in range(1, users + 1)
+        ])
+
+    appointment_rows, slot_rows = [], []
+    next_id = 1
+    appointment_count = 0
+    for month_start in month_starts(first_month, months):
+        current = month_start
+        while current.month == month_start.month:
+            booked = []
+            date_str = current.strftime("%Y-%m-%d")
+            # Fill the day greedily in random order until the density target is reached
+            candidates = get_available_slots(date_str, [], 15)
+            rng.shuffle(candidates)
+            target = int(len(candidates) * density)
+            for time_str in candidates[:target]:
+                service_id = rng.randint(1, services)
+                duration = catalog[service_id - 1][2]
+                if time_str not in get_available_slots(date_str, booked, duration):
+                    continue
+                start = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
+                booked.append((start, duration))
+                appointment_rows.append({
+                    "id": next_id,
+                    "user_id": rng.randint(1, users),
+                    "service_id": service_id,
+                    "appointment_time": start,
+                    "end_time": start + timedelta(minutes=duration),
+                    "status": "Scheduled",
+                    "price": catalog[service_id - 1][1]
+                })
+                slot_rows.extend({"appointment_id": next_id, "slot_time": unit} for unit in occupied_units(start, duration))
+                next_id += 1
+            if len(appointment_rows) >= batch_size:
+                appointment_count += _flush(db, Appointment, AppointmentSlot, appointment_rows, slot_rows)
+            current += timedelta(days=1)
+    appointment_count += _flush(db, Appointment, AppointmentSlot, appointment_rows, slot_rows)
+
+    from app.reporting import rebuild_rollups
+    rebuild_rollups()
+    return {"users": users, "services": services, "months": months, "density": density,
+            "first_month": first_month.isoformat(), "appointments": appointment_count}
+
+def _flush(db, Appointment, AppointmentSlot, appointment_rows, slot_rows):
+    count = len(appointment_rows)
+    if count:
+        with db.engine.begin() as conn:
+            conn.execute(Appointment.__table__.insert(), appointment_rows)
+            conn.execute(AppointmentSlot.__table__.insert(), slot_rows)
+    appointment_rows.clear()
+    slot_rows.clear()
+    return count
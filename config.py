@@ -0,0 +1,79 @@
+import os
+
+# Configuration classes for app.create_app(). Select one with create_app(config) or the
+# APP_CONFIG environment variable (e.g. APP_CONFIG=config.ProductionConfig).
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'a_very_secret_key_that_should_be_changed')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///site.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool, per worker process (see _engine_options in app/__init__)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+    # SQLite only: WAL lets readers run while a booking writes; busy_timeout makes
+    # writers wait for the lock instead of failing with "database is locked".
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', '1') == '1'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+    # Password hashing (app/passwords.py). Raising BCRYPT_LOG_ROUNDS upgrades stored
+    # hashes as users log in.
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_OFFLOAD = os.environ.get('PASSWORD_HASH_OFFLOAD', '1') == '1'
+    # Per worker process. Keep MAX_PENDING below the worker's thread count (gunicorn
+    # --threads) so cheap requests always find a free thread during a login burst.
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 4))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 2.0))
+
+    # Request metrics at /metrics (app/metrics.py); slower requests are logged with their SQL
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 500))
+    # Shared by the workers of one server so /metrics reports all of them; unset = per process
+    METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR')
+    METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 1.0))
+
+    # Rendered pages and fragments for anonymous visitors (app/utils/page_cache.py)
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', '1') == '1'
+    PAGE_CACHE_BACKEND = os.environ.get('PAGE_CACHE_BACKEND', 'memory') # 'memory' or 'redis'
+    PAGE_CACHE_REDIS_URL = os.environ.get('PAGE_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', 512))
+    PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 300))
+    PAGE_CACHE_MAX_AGE = int(os.environ.get('PAGE_CACHE_MAX_AGE', 60)) # browser/proxy freshness
+    # How long a worker trusts the namespace versions it read; writes made in other
+    # processes reach its cached pages within this many seconds
+    PAGE_CACHE_VERSION_TTL = float(os.environ.get('PAGE_CACHE_VERSION_TTL', 2.0))
+
+    # Waitlist (app/waitlist.py): how long a freed time is held for the matched customer
+    # (expired by `flask waitlist expire --loop`) and the longest date window per entry
+    WAITLIST_HOLD_MINUTES = int(os.environ.get('WAITLIST_HOLD_MINUTES', 30))
+    WAITLIST_MAX_WINDOW_DAYS = int(os.environ.get('WAITLIST_MAX_WINDOW_DAYS', 31))
+
+    SLOT_CACHE_MAX_ENTRIES = int(os.environ.get('SLOT_CACHE_MAX_ENTRIES', 1024))
+    SLOT_CACHE_TTL_SECONDS = int(os.environ.get('SLOT_CACHE_TTL_SECONDS', 300))
+
+    # Notifications (outbox worker: `flask outbox drain`)
+    NOTIFICATION_SENDER = os.environ.get('NOTIFICATION_SENDER', 'log') # 'log' or 'twilio'
+    TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
+    TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN')
+    TWILIO_WHATSAPP_FROM = os.environ.get('TWILIO_WHATSAPP_FROM')
+    TWILIO_API_BASE_URL = os.environ.get('TWILIO_API_BASE_URL', 'https://api.twilio.com')
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 8))
+    OUTBOX_BACKOFF_BASE_SECONDS = float(os.environ.get('OUTBOX_BACKOFF_BASE_SECONDS', 30))
+    OUTBOX_BACKOFF_MAX_SECONDS = float(os.environ.get('OUTBOX_BACKOFF_MAX_SECONDS', 3600))
+    OUTBOX_LEASE_SECONDS = int(os.environ.get('OUTBOX_LEASE_SECONDS', 300))
+
+class ProductionConfig(Config):
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+
+class TestingConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite://')
+    BCRYPT_LOG_ROUNDS = 4
+    PASSWORD_HASH_OFFLOAD = False
+    PAGE_CACHE_ENABLED = False
@@ -0,0 +1,47 @@
+"""resources (chairs/barbers)
+
+Revision ID: 1b9d2f6e8a45
+Revises: e7a40f3b9c62
+Create Date: 2026-10-16 12:15:37.902114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b9d2f6e8a45'
+down_revision = 'e7a40f3b9c62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('resource',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.Column('business_hours', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    with op.batch_alter_table('appointment') as batch_op:
+        batch_op.add_column(sa.Column('resource_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_appointment_resource_id_resource', 'resource', ['resource_id'], ['id'])
+        batch_op.create_index('ix_appointment_resource_id_appointment_time', ['resource_id', 'appointment_time'], unique=False)
+    with op.batch_alter_table('appointment_slot') as batch_op:
+        batch_op.add_column(sa.Column('resource_key', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.drop_constraint('uq_appointment_slot_time', type_='unique')
+        batch_op.create_unique_constraint('uq_appointment_slot_resource_time', ['resource_key', 'slot_time'])
+
+
+def downgrade():
+    with op.batch_alter_table('appointment_slot') as batch_op:
+        batch_op.drop_constraint('uq_appointment_slot_resource_time', type_='unique')
+        batch_op.create_unique_constraint('uq_appointment_slot_time', ['slot_time'])
+        batch_op.drop_column('resource_key')
+    with op.batch_alter_table('appointment') as batch_op:
+        batch_op.drop_index('ix_appointment_resource_id_appointment_time')
+        batch_op.drop_constraint('fk_appointment_resource_id_resource', type_='foreignkey')
+        batch_op.drop_column('resource_id')
+    op.drop_table('resource')
@@ -0,0 +1,28 @@
+"""availability version
+
+Revision ID: 4e2b9a7c1d53
+Revises: d81e5a0c3f64
+Create Date: 2026-10-16 23:21:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e2b9a7c1d53'
+down_revision = 'd81e5a0c3f64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('availability_version',
+    sa.Column('day', sa.String(length=10), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+
+
+def downgrade():
+    op.drop_table('availability_version')
@@ -0,0 +1,49 @@
+"""notification outbox
+
+Revision ID: 5c3f8e1a7d29
+Revises: 1b9d2f6e8a45
+Create Date: 2026-10-16 13:48:20.664031
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c3f8e1a7d29'
+down_revision = '1b9d2f6e8a45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column('phone', sa.String(length=32), nullable=True))
+    op.create_table('outbox_message',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=40), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=True),
+    sa.Column('idempotency_key', sa.String(length=100), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('claim_token', sa.String(length=32), nullable=True),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointment.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('idempotency_key')
+    )
+    op.create_index('ix_outbox_message_status_next_attempt_at', 'outbox_message', ['status', 'next_attempt_at'], unique=False)
+    op.create_index('ix_outbox_message_claim_token', 'outbox_message', ['claim_token'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_outbox_message_claim_token', table_name='outbox_message')
+    op.drop_index('ix_outbox_message_status_next_attempt_at', table_name='outbox_message')
+    op.drop_table('outbox_message')
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('phone')
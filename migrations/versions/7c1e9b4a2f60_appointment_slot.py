@@ -0,0 +1,94 @@
+"""appointment slot guard rows
+
+Revision ID: 7c1e9b4a2f60
+Revises: 8d4e6b1f2a37
+Create Date: 2026-10-16 09:58:26.530917
+
+Also writes the guard rows of the blocking appointments that have not started yet, so
+the unique constraint protects them from the first booking after the deploy. Past
+appointments are left without guard rows; nothing can be booked over them.
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e9b4a2f60'
+down_revision = '8d4e6b1f2a37'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 5000
+# Same grid as app.utils.scheduling.OCCUPANCY_UNIT_MINUTES at the time of this revision
+UNIT_MINUTES = 5
+NON_BLOCKING_STATUSES = ('Cancelled', 'Expired')
+
+
+def _occupied_units(start_dt, end_dt):
+    midnight = datetime.combine(start_dt.date(), datetime.min.time())
+    unit = timedelta(minutes=UNIT_MINUTES)
+    current = midnight + ((start_dt - midnight) // unit) * unit
+    while current < end_dt:
+        yield current
+        current += unit
+
+
+def upgrade():
+    connection = op.get_bind()
+    # Databases upgraded while this table was part of the initial revision already have it
+    if not sa.inspect(connection).has_table('appointment_slot'):
+        op.create_table('appointment_slot',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('appointment_id', sa.Integer(), nullable=False),
+        sa.Column('slot_time', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['appointment_id'], ['appointment.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('slot_time', name='uq_appointment_slot_time')
+        )
+
+    appointment = sa.table('appointment',
+        sa.column('id', sa.Integer), sa.column('appointment_time', sa.DateTime),
+        sa.column('end_time', sa.DateTime), sa.column('status', sa.String))
+    appointment_slot = sa.table('appointment_slot',
+        sa.column('appointment_id', sa.Integer), sa.column('slot_time', sa.DateTime))
+    now = datetime.now()
+    existing = connection.execute(
+        sa.select(appointment_slot.c.appointment_id, appointment_slot.c.slot_time)
+        .where(appointment_slot.c.slot_time >= datetime.combine(now.date(), datetime.min.time()))
+    ).all()
+    taken = {slot_time for _, slot_time in existing}
+    covered = {appointment_id for appointment_id, _ in existing}
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(appointment.c.id, appointment.c.appointment_time, appointment.c.end_time)
+            .where(
+                appointment.c.id > last_id,
+                appointment.c.end_time > now,
+                sa.or_(appointment.c.status.is_(None), appointment.c.status.notin_(NON_BLOCKING_STATUSES))
+            )
+            .order_by(appointment.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        slot_rows = []
+        for row in rows:
+            if row.id in covered:
+                continue
+            for unit in _occupied_units(row.appointment_time, row.end_time):
+                # Appointments double-booked before the constraint existed keep only the
+                # units nobody holds yet; the range check still sees the overlap
+                if unit not in taken:
+                    taken.add(unit)
+                    slot_rows.append({'appointment_id': row.id, 'slot_time': unit})
+        if slot_rows:
+            connection.execute(appointment_slot.insert(), slot_rows)
+        last_id = rows[-1].id
+
+
+def downgrade():
+    op.drop_table('appointment_slot')
@@ -0,0 +1,62 @@
+"""appointment indexes and end_time
+
+Revision ID: 8d4e6b1f2a37
+Revises: 3f1a9c2d7b10
+Create Date: 2026-10-16 09:40:02.771530
+
+"""
+from datetime import timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4e6b1f2a37'
+down_revision = '3f1a9c2d7b10'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade():
+    op.add_column('appointment', sa.Column('end_time', sa.DateTime(), nullable=True))
+    op.create_index('ix_appointment_appointment_time', 'appointment', ['appointment_time'], unique=False)
+    op.create_index('ix_appointment_user_id_appointment_time', 'appointment', ['user_id', 'appointment_time'], unique=False)
+    op.create_index('ix_appointment_status_appointment_time', 'appointment', ['status', 'appointment_time'], unique=False)
+
+    # Backfill end_time = appointment_time + service duration, in id-ordered batches.
+    # Done in Python because interval arithmetic differs between SQLite and PostgreSQL.
+    connection = op.get_bind()
+    appointment = sa.table('appointment',
+        sa.column('id', sa.Integer), sa.column('service_id', sa.Integer),
+        sa.column('appointment_time', sa.DateTime), sa.column('end_time', sa.DateTime))
+    service = sa.table('service', sa.column('id', sa.Integer), sa.column('duration_minutes', sa.Integer))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(appointment.c.id, appointment.c.appointment_time, service.c.duration_minutes)
+            .select_from(appointment.outerjoin(service, appointment.c.service_id == service.c.id))
+            .where(appointment.c.id > last_id)
+            .order_by(appointment.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            appointment.update().where(appointment.c.id == sa.bindparam('appointment_id')),
+            [
+                {'appointment_id': row.id, 'end_time': row.appointment_time + timedelta(minutes=row.duration_minutes or 0)}
+                for row in rows
+            ]
+        )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    op.drop_index('ix_appointment_status_appointment_time', table_name='appointment')
+    op.drop_index('ix_appointment_user_id_appointment_time', table_name='appointment')
+    op.drop_index('ix_appointment_appointment_time', table_name='appointment')
+    with op.batch_alter_table('appointment') as batch_op:
+        batch_op.drop_column('end_time')
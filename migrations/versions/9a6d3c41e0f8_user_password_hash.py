@@ -0,0 +1,25 @@
+"""user password hash
+
+Revision ID: 9a6d3c41e0f8
+Revises: 5c3f8e1a7d29
+Create Date: 2026-10-16 15:02:11.408317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a6d3c41e0f8'
+down_revision = '5c3f8e1a7d29'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column('password_hash', sa.String(length=60), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('password_hash')
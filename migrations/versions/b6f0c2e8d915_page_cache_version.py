@@ -0,0 +1,28 @@
+"""page cache version
+
+Revision ID: b6f0c2e8d915
+Revises: 4e2b9a7c1d53
+Create Date: 2026-10-16 23:58:12.406331
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6f0c2e8d915'
+down_revision = '4e2b9a7c1d53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('page_cache_version',
+    sa.Column('namespace', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('namespace')
+    )
+
+
+def downgrade():
+    op.drop_table('page_cache_version')
@@ -0,0 +1,34 @@
+"""daily service stats rollup
+
+Revision ID: c52b7e09d4a1
+Revises: 7c1e9b4a2f60
+Create Date: 2026-10-16 10:21:55.104862
+
+Run `flask reports rebuild` after upgrading to fill the rollups from existing appointments.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52b7e09d4a1'
+down_revision = '7c1e9b4a2f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_service_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('service_id', sa.Integer(), nullable=False),
+    sa.Column('bookings', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('occupied_minutes', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['service_id'], ['service.id'], ),
+    sa.PrimaryKeyConstraint('day', 'service_id')
+    )
+
+
+def downgrade():
+    op.drop_table('daily_service_stats')
@@ -0,0 +1,53 @@
+"""waitlist
+
+Revision ID: d81e5a0c3f64
+Revises: 9a6d3c41e0f8
+Create Date: 2026-10-16 17:26:40.915284
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81e5a0c3f64'
+down_revision = '9a6d3c41e0f8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('waitlist_entry',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('service_id', sa.Integer(), nullable=False),
+    sa.Column('window_start', sa.Date(), nullable=False),
+    sa.Column('window_end', sa.Date(), nullable=False),
+    sa.Column('duration_minutes', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=True),
+    sa.Column('hold_expires_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointment.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['service_id'], ['service.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_waitlist_entry_status_hold_expires_at', 'waitlist_entry', ['status', 'hold_expires_at'], unique=False)
+    op.create_index('ix_waitlist_entry_user_id', 'waitlist_entry', ['user_id'], unique=False)
+    op.create_table('waitlist_day',
+    sa.Column('entry_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('duration_minutes', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['entry_id'], ['waitlist_entry.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('entry_id', 'day')
+    )
+    op.create_index('ix_waitlist_day_day_duration_minutes_entry_id', 'waitlist_day', ['day', 'duration_minutes', 'entry_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_waitlist_day_day_duration_minutes_entry_id', table_name='waitlist_day')
+    op.drop_table('waitlist_day')
+    op.drop_index('ix_waitlist_entry_user_id', table_name='waitlist_entry')
+    op.drop_index('ix_waitlist_entry_status_hold_expires_at', table_name='waitlist_entry')
+    op.drop_table('waitlist_entry')
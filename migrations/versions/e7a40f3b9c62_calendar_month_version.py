@@ -0,0 +1,28 @@
+"""calendar month version
+
+Revision ID: e7a40f3b9c62
+Revises: c52b7e09d4a1
+Create Date: 2026-10-16 11:02:13.550918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a40f3b9c62'
+down_revision = 'c52b7e09d4a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('calendar_month_version',
+    sa.Column('month', sa.String(length=7), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('month')
+    )
+
+
+def downgrade():
+    op.drop_table('calendar_month_version')
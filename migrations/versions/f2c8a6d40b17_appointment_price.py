@@ -0,0 +1,33 @@
+"""appointment price
+
+Revision ID: f2c8a6d40b17
+Revises: b6f0c2e8d915
+Create Date: 2026-10-17 00:31:07.582914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8a6d40b17'
+down_revision = 'b6f0c2e8d915'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('appointment', sa.Column('price', sa.Float(), nullable=True))
+
+    # Existing appointments get the current price of their service, the amount the
+    # rollups were built with.
+    appointment = sa.table('appointment', sa.column('service_id', sa.Integer), sa.column('price', sa.Float))
+    service = sa.table('service', sa.column('id', sa.Integer), sa.column('price', sa.Float))
+    op.execute(appointment.update().values(
+        price=sa.select(service.c.price).where(service.c.id == appointment.c.service_id).scalar_subquery()
+    ))
+
+
+def downgrade():
+    with op.batch_alter_table('appointment') as batch_op:
+        batch_op.drop_column('price')
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+import pytest
+from config import TestingConfig
+from app import create_app, db
+from app.models import Appointment, AppointmentSlot, Service, User
+from app.utils.scheduling import occupied_units
+
+def next_monday(days_ahead=30):
+    """First Monday at least days_ahead days from today: open all day, lunch break included."""
+    day = (datetime.now() + timedelta(days=days_ahead)).date()
+    return day + timedelta(days=-day.weekday() % 7)
+
+# Booking and availability never look at the past, so tests use a day that stays ahead
+MONDAY = next_monday()
+
+@pytest.fixture
+def app(request):
+    # @pytest.mark.app_config(NAME=value, ...) overrides TestingConfig for one test
+    marker = request.node.get_closest_marker("app_config")
+    config = type("Config", (TestingConfig,), marker.kwargs) if marker else TestingConfig
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def user(app):
+    user = User(username="cliente", email="cliente@example.com", phone="+5511999990000")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def service(app):
+    service = Service(name="Corte", price=50.0, duration_minutes=30)
+    db.session.add(service)
+    db.session.commit()
+    return service
+
+def login(client, user):
+    """Logs the test client in as user without going through the password form."""
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user.id)
+        session["_fresh"] = True
+
+def store_appointment(user, service, start, resource_id=None, guard_rows=True):
+    """
+    Writes a Scheduled appointment directly, skipping the booking checks; guard_rows=False
+    mimics one stored before AppointmentSlot existed.
+    """
+    appointment = Appointment(
+        user_id=user.id, service_id=service.id, resource_id=resource_id, appointment_time=start,
+        end_time=start + timedelta(minutes=service.duration_minutes), status="Scheduled"
+    )
+    if guard_rows:
+        appointment.occupied_slots = [
+            AppointmentSlot(resource_key=resource_id or 0, slot_time=unit) for unit in occupied_units(start, service.duration_minutes)
+        ]
+    db.session.add(appointment)
+    db.session.commit()
+    return appointment
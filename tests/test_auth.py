@@ -0,0 +1,33 @@
+from app import db
+from app.models import User
+
+def _user_with_password(password="segredo123"):
+    user = User(username="ana", email="ana@example.com")
+    user.set_password(password)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def test_login_restores_user_from_session(client):
+    _user_with_password()
+    response = client.post("/login", data={"email": "ana@example.com", "password": "segredo123"})
+    assert response.status_code == 302
+    # login_required resolves the session through the user loader
+    response = client.get("/appointments/api/my_appointments")
+    assert response.status_code == 200
+
+def test_wrong_password_does_not_log_in(client):
+    _user_with_password()
+    client.post("/login", data={"email": "ana@example.com", "password": "errada123"})
+    assert client.get("/appointments/api/my_appointments").status_code == 302 # to the login page
+
+def test_malformed_session_user_id_is_anonymous(client):
+    with client.session_transaction() as session:
+        session["_user_id"] = "not-a-number"
+    assert client.get("/appointments/api/my_appointments").status_code == 302
+
+def test_logout(client):
+    _user_with_password()
+    client.post("/login", data={"email": "ana@example.com", "password": "segredo123"})
+    assert client.get("/logout").status_code == 302
+    assert client.get("/appointments/api/my_appointments").status_code == 302
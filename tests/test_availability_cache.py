@@ -0,0 +1,41 @@
+from datetime import date, datetime
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Appointment, Resource
+from app.utils.availability_cache import bump_all_dates, slot_cache
+from tests.conftest import login
+
+DAY = date(2031, 3, 10) # a Monday
+
+def _slots(client, service):
+    response = client.post("/appointments/get_available_slots", json={"date": DAY.isoformat(), "service_id": service.id})
+    assert response.status_code == 200
+    return response.get_json()["available_slots"]
+
+def test_cached_slots_are_reused(client, user, service):
+    login(client, user)
+    first = _slots(client, service)
+    hits = slot_cache.stats()["hits"]
+    assert _slots(client, service) == first
+    assert slot_cache.stats()["hits"] == hits + 1
+
+def test_write_from_another_process_invalidates(app, client, user, service):
+    login(client, user)
+    assert "09:00" in _slots(client, service)
+    # Another worker (or the CLI) books through its own session and connection; nothing
+    # in this process is told about it except the version row in the database
+    with Session(db.engine) as other:
+        other.add(Appointment(user_id=user.id, service_id=service.id, appointment_time=datetime(2031, 3, 10, 9, 0)))
+        other.commit()
+    assert "09:00" not in _slots(client, service)
+
+def test_bulk_write_invalidates_every_date(app, client, user, service):
+    login(client, user)
+    before = _slots(client, service)
+    with db.engine.begin() as connection:
+        connection.execute(Resource.__table__.insert().values(
+            name="Cadeira 1", active=True, business_hours={"monday": [["08:00", "10:00"]]}
+        ))
+        bump_all_dates(connection)
+    after = _slots(client, service)
+    assert after != before and after[-1] == "09:30"
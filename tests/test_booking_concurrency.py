@@ -0,0 +1,114 @@
+import os
+import threading
+from datetime import datetime, timedelta
+import pytest
+from benchmarks.harness import is_scratch_database
+from config import TestingConfig
+from app import create_app, db
+from app.booking import BookingConflict, book_appointment_atomic
+from app.models import Appointment, Resource, Service, User, NON_BLOCKING_STATUSES
+
+# Threads book overlapping times at the same moment through book_appointment_atomic;
+# whatever the interleaving, the stored blocking appointments must never overlap on
+# the same chair. Runs on a SQLite file (WAL, busy_timeout, FOR UPDATE ignored, so the
+# AppointmentSlot unique constraint does the work) and, when TEST_POSTGRES_URL points at
+# a scratch PostgreSQL database, on PostgreSQL (row locks plus the same constraint).
+
+THREADS = 8
+ROUNDS = 6
+FIRST_DAY = datetime(2031, 3, 10) # a Monday
+
+def _database_urls():
+    yield pytest.param("sqlite", id="sqlite-file")
+    postgres_url = os.environ.get("TEST_POSTGRES_URL")
+    # Every table is dropped, so only databases named like scratch ones are used
+    yield pytest.param(postgres_url, id="postgresql", marks=pytest.mark.skipif(
+        not postgres_url or not is_scratch_database(postgres_url),
+        reason="set TEST_POSTGRES_URL to a scratch PostgreSQL database (name containing bench/scratch/test)"
+    ))
+
+@pytest.fixture(params=list(_database_urls()))
+def shared_app(request, tmp_path):
+    url = request.param
+    if url == "sqlite":
+        url = f"sqlite:///{tmp_path / 'concurrency.db'}"
+    app = create_app(type("ConcurrencyConfig", (TestingConfig,), {"SQLALCHEMY_DATABASE_URI": url}))
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add_all([User(username=f"u{i}", email=f"u{i}@example.com") for i in range(THREADS)])
+        db.session.add_all([
+            Service(id=1, name="Corte", price=50.0, duration_minutes=60),
+            Service(id=2, name="Barba", price=30.0, duration_minutes=30)
+        ])
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+def _race(app, requests):
+    """Runs book_appointment_atomic for every (user_id, service_id, start) at once; returns the outcomes."""
+    barrier = threading.Barrier(len(requests))
+    outcomes = []
+    lock = threading.Lock()
+
+    def worker(user_id, service_id, start):
+        with app.app_context():
+            service = db.session.get(Service, service_id)
+            barrier.wait()
+            try:
+                book_appointment_atomic(user_id, service, start)
+                result = "booked"
+            except BookingConflict:
+                result = "conflict"
+            except Exception as e: # reported, and fails the test below
+                db.session.rollback()
+                result = repr(e)
+            finally:
+                db.session.remove()
+            with lock:
+                outcomes.append(result)
+
+    threads = [threading.Thread(target=worker, args=request_args) for request_args in requests]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+def _assert_no_overlaps(app):
+    with app.app_context():
+        rows = db.session.query(Appointment.resource_id, Appointment.appointment_time, Appointment.end_time).filter(
+            Appointment.status.notin_(NON_BLOCKING_STATUSES)
+        ).order_by(Appointment.appointment_time).all()
+    for i, (resource_a, start_a, end_a) in enumerate(rows):
+        for resource_b, start_b, end_b in rows[i + 1:]:
+            same_chair = resource_a is None or resource_b is None or resource_a == resource_b
+            assert not (same_chair and start_b < end_a and start_a < end_b), (rows[i], (resource_b, start_b, end_b))
+    return rows
+
+def _overlapping_requests(day):
+    # Same start, and starts 30 minutes apart that overlap a 60-minute service
+    starts = [day.replace(hour=9), day.replace(hour=9, minute=30), day.replace(hour=10)]
+    return [(user_id + 1, 1 + user_id % 2, starts[user_id % len(starts)]) for user_id in range(THREADS)]
+
+def test_no_double_booking_single_chair(shared_app):
+    for round_index in range(ROUNDS):
+        outcomes = _race(shared_app, _overlapping_requests(FIRST_DAY + timedelta(days=round_index)))
+        assert set(outcomes) <= {"booked", "conflict"}, outcomes
+        assert "booked" in outcomes
+    rows = _assert_no_overlaps(shared_app)
+    assert len(rows) >= ROUNDS
+
+def test_no_double_booking_across_chairs(shared_app):
+    with shared_app.app_context():
+        db.session.add_all([Resource(name="Cadeira 1"), Resource(name="Cadeira 2")])
+        db.session.commit()
+    for round_index in range(ROUNDS):
+        outcomes = _race(shared_app, _overlapping_requests(FIRST_DAY + timedelta(days=round_index)))
+        assert set(outcomes) <= {"booked", "conflict"}, outcomes
+    rows = _assert_no_overlaps(shared_app)
+    assert all(resource_id is not None for resource_id, _, _ in rows)
+    assert len(rows) >= 2 * ROUNDS
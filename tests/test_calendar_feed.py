@@ -0,0 +1,109 @@
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import db
+from app.models import Appointment, Service, User
+from tests.conftest import login
+
+DAY = date(2031, 3, 10)
+URL = f"/appointments/api/month_appointments?year={DAY.year}&month={DAY.month}"
+
+@pytest.fixture
+def statements():
+    """SQL statements executed while the test runs."""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(" ".join(statement.split()))
+
+    event.listen(Engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(Engine, "before_cursor_execute", record)
+
+@pytest.fixture
+def month(user, service):
+    other = User(username="outra", email="outra@example.com")
+    db.session.add(other)
+    db.session.flush()
+    for i, customer in enumerate([user, other, user]):
+        db.session.add(Appointment(
+            user_id=customer.id, service_id=service.id,
+            appointment_time=datetime.combine(DAY, datetime.min.time()) + timedelta(days=i, hours=9, minutes=30 * i)
+        ))
+    db.session.commit()
+
+def _etag(client, url=URL):
+    response = client.get(url)
+    assert response.status_code == 200
+    return response.headers["ETag"]
+
+@pytest.mark.parametrize("url", [URL, URL + "&format=compact"])
+def test_current_etag_answers_304_without_loading_rows(client, user, month, statements, url):
+    login(client, user)
+    etag = _etag(client, url)
+    assert any("FROM appointment" in statement for statement in statements)
+    db.session.remove()
+    statements.clear()
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.data == b""
+    assert response.headers["ETag"] == etag
+    assert len(statements) <= 2 # the user load and the month version lookup
+    assert not any("FROM appointment" in statement for statement in statements)
+
+def test_appointment_write_in_the_month_changes_the_etag(client, user, service, month):
+    login(client, user)
+    before = _etag(client)
+    db.session.add(Appointment(
+        user_id=user.id, service_id=service.id,
+        appointment_time=datetime.combine(DAY + timedelta(days=7), datetime.min.time()).replace(hour=10)
+    ))
+    db.session.commit()
+    after = _etag(client)
+    assert after != before
+    assert client.get(URL, headers={"If-None-Match": before}).status_code == 200
+
+def test_appointment_write_in_another_month_keeps_the_etag(client, user, service, month):
+    login(client, user)
+    before = _etag(client)
+    db.session.add(Appointment(
+        user_id=user.id, service_id=service.id,
+        appointment_time=datetime.combine(DAY + timedelta(days=60), datetime.min.time()).replace(hour=10)
+    ))
+    db.session.commit()
+    assert _etag(client) == before
+
+def test_service_rename_changes_the_etag(client, user, service, month):
+    login(client, user)
+    before = _etag(client)
+    db.session.get(Service, service.id).name = "Corte e barba"
+    db.session.commit()
+    assert _etag(client) != before
+    assert {event["service"] for event in client.get(URL).get_json()} == {"Corte e barba"}
+
+def test_compact_payload_expands_to_the_full_events(client, user, month):
+    login(client, user)
+    full = client.get(URL).get_json()
+    compact = client.get(URL + "&format=compact").get_json()
+    assert (compact["year"], compact["month"]) == (DAY.year, DAY.month)
+
+    columns = compact["columns"]
+    events = []
+    for i, appointment_id in enumerate(columns["id"]):
+        service_name = compact["services"][columns["service"][i]]
+        client_name = compact["clients"][columns["client"][i]]
+        hour, minute = divmod(columns["minute"][i], 60)
+        events.append({
+            "id": appointment_id,
+            "title": f"{service_name} - {client_name}",
+            "start": datetime(DAY.year, DAY.month, columns["day"][i], hour, minute).isoformat(),
+            "day": columns["day"][i],
+            "time": f"{hour:02d}:{minute:02d}",
+            "service": service_name,
+            "client": client_name,
+            "user_id": columns["user_id"][i]
+        })
+    assert len(full) == 3
+    assert events == full
+    # Repeated names are sent once
+    assert compact["services"] == ["Corte"] and len(compact["clients"]) == 2
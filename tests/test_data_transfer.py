@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.data_transfer import import_records
+from app.models import Appointment, Resource
+from app.url_helpers import _service_list
+from app.utils.page_cache import page_cache, SERVICES_NAMESPACE
+from tests.conftest import store_appointment
+
+START = datetime.combine((datetime.now() + timedelta(days=30)).date(), datetime.min.time()).replace(hour=10)
+
+def _record(user, service, start=START, resource_id=None, **extra):
+    record = {"user_id": str(user.id), "service_id": str(service.id), "appointment_time": start.isoformat()}
+    if resource_id is not None:
+        record["resource_id"] = str(resource_id)
+    record.update(extra)
+    return record
+
+def _import(records):
+    rejects = []
+
+    class Rejects:
+        def write(self, line):
+            rejects.append(line)
+
+    progress = import_records("appointments", enumerate(records, 1), rejects=Rejects())
+    return progress, rejects
+
+@pytest.fixture
+def chairs(app):
+    db.session.add_all([Resource(name="Cadeira 1"), Resource(name="Cadeira 2")])
+    db.session.commit()
+    return 1, 2
+
+def _imported():
+    return Appointment.query.count()
+
+def test_import_rejects_overlap_with_row_without_guard_rows(user, service):
+    store_appointment(user, service, START, guard_rows=False)
+    progress, rejects = _import([_record(user, service, START + timedelta(minutes=15))])
+    assert len(rejects) == 1 and _imported() == 1
+
+@pytest.mark.parametrize("stored, imported", [(None, 1), (1, None)])
+def test_import_rejects_overlap_between_shared_and_chair_rows(user, service, chairs, stored, imported):
+    store_appointment(user, service, START, resource_id=stored)
+    progress, rejects = _import([_record(user, service, resource_id=imported)])
+    assert len(rejects) == 1 and _imported() == 1
+
+def test_import_accepts_other_chair_and_rejects_overlaps_within_the_input(user, service, chairs):
+    store_appointment(user, service, START, resource_id=1)
+    progress, rejects = _import([
+        _record(user, service, resource_id=2),
+        _record(user, service, START + timedelta(minutes=10), resource_id=2),
+        _record(user, service), # shared: overlaps both chairs
+        _record(user, service, START + timedelta(minutes=30), resource_id=1)
+    ])
+    assert [line.split(",")[0] for line in rejects] == ['{"line": 2', '{"line": 3']
+    assert _imported() == 3
+
+@pytest.mark.app_config(PAGE_CACHE_ENABLED=True)
+def test_service_import_invalidates_cached_service_list(app, service):
+    def service_names():
+        with app.test_request_context("/services"):
+            return [row["name"] for row in page_cache.fragment(SERVICES_NAMESPACE, "service_list", _service_list)]
+
+    assert service_names() == ["Corte"]
+    import_records("services", [(1, {"name": "Barba", "price": "30", "duration_minutes": "20"})])
+    assert service_names() == ["Barba", "Corte"]
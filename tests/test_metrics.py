@@ -0,0 +1,56 @@
+import logging
+import pytest
+from benchmarks.harness import QueryCounter
+import app.metrics as metrics
+import app.routes.metrics as metrics_routes
+from app import db
+
+query_counter = QueryCounter()
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    """A fresh process registry, so counts from other tests don't leak in."""
+    registry = metrics.RequestMetrics()
+    monkeypatch.setattr(metrics, "request_metrics", registry)
+    monkeypatch.setattr(metrics_routes, "request_metrics", registry)
+    return registry
+
+def _scrape(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    return response.get_data(as_text=True).splitlines()
+
+def test_metrics_report_latency_and_sql_per_endpoint(client, service):
+    db.session.remove()
+    with query_counter.counting():
+        assert client.get("/services").status_code == 200
+    lines = _scrape(client)
+    assert 'http_request_duration_seconds_count{endpoint="/services",method="GET",status="200"} 1' in lines
+    assert 'http_request_sql_statements_count{endpoint="/services"} 1' in lines
+    assert f'http_request_sql_statements_sum{{endpoint="/services"}} {query_counter.count:.6f}' in lines
+    assert query_counter.count > 0
+
+@pytest.mark.app_config(SLOW_REQUEST_MS=0)
+def test_slow_request_log_lists_the_statements(client, service, caplog):
+    with caplog.at_level(logging.WARNING, logger="app.metrics"):
+        client.get("/services")
+    record = next(record for record in caplog.records if "Slow request GET /services" in record.getMessage())
+    assert "SELECT" in record.getMessage() and "FROM service" in record.getMessage()
+    assert 'http_slow_requests_total{endpoint="/services"} 1' in _scrape(client)
+
+def test_multiprocess_store_sums_every_worker(app, client, service, tmp_path):
+    slot_cache_stats = app.extensions["slot_cache"].stats
+    app.extensions["metrics_store"] = metrics.MultiprocessStore(
+        str(tmp_path), 0, metrics.request_metrics, extra_stats=slot_cache_stats
+    )
+    # Another worker served one request and wrote its snapshot
+    other = metrics.RequestMetrics()
+    other.record("/services", "GET", "200", 0.01, 1, 0.001, {}, False)
+    metrics.MultiprocessStore(
+        str(tmp_path), 0, other, extra_stats=lambda: dict(slot_cache_stats(), hits=3), worker_id="other"
+    ).flush()
+
+    client.get("/services")
+    lines = _scrape(client)
+    assert 'http_request_duration_seconds_count{endpoint="/services",method="GET",status="200"} 2' in lines
+    assert "slot_cache_hits_total 3" in lines
@@ -0,0 +1,37 @@
+import os
+from datetime import datetime, timedelta
+from flask_migrate import stamp, upgrade
+from sqlalchemy import text
+from config import TestingConfig
+from app import create_app, db
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+
+def test_stamped_create_all_database_upgrades_with_guard_rows(tmp_path):
+    class Config(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'legacy.db'}"
+
+    app = create_app(Config)
+    start = (datetime.now() + timedelta(days=3)).replace(hour=10, minute=0, second=0, microsecond=0)
+    with app.app_context():
+        # The tables db.create_all() made from the original models, then stamped
+        with db.engine.begin() as connection:
+            for statement in (
+                "CREATE TABLE service (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, price FLOAT NOT NULL, duration_minutes INTEGER NOT NULL)",
+                "CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(64) NOT NULL UNIQUE, email VARCHAR(120) NOT NULL UNIQUE)",
+                "CREATE TABLE appointment (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES user (id), "
+                "service_id INTEGER NOT NULL REFERENCES service (id), appointment_time DATETIME NOT NULL, status VARCHAR(20))",
+                "INSERT INTO service VALUES (1, 'Corte', 50.0, 30)",
+                "INSERT INTO user VALUES (1, 'cliente', 'cliente@example.com')"
+            ):
+                connection.exec_driver_sql(statement)
+            connection.execute(text("INSERT INTO appointment VALUES (1, 1, 1, :future, 'Scheduled'), (2, 1, 1, :past, 'Scheduled'), (3, 1, 1, :later, 'Cancelled')"), {
+                "future": start, "past": start - timedelta(days=10), "later": start + timedelta(hours=2)
+            })
+        stamp(directory=MIGRATIONS, revision="3f1a9c2d7b10")
+        upgrade(directory=MIGRATIONS)
+        with db.engine.connect() as connection:
+            rows = connection.execute(text("SELECT appointment_id, resource_key FROM appointment_slot")).all()
+        db.engine.dispose()
+    # Only the upcoming blocking appointment is guarded, one row per 5-minute unit
+    assert rows == [(1, 0)] * 6
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import Appointment
+from app.utils.availability_cache import slot_cache
+from tests.conftest import MONDAY, login
+
+SATURDAY = MONDAY - timedelta(days=2)
+
+def _next_available(client, service, **payload):
+    response = client.post("/appointments/next_available", json=dict({"service_id": service.id}, **payload))
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return [(item["date"], item["time"]) for item in response.get_json()["next_available"]]
+
+def test_cold_cache(client, user, service):
+    login(client, user)
+    slot_cache.clear()
+    day = MONDAY.isoformat()
+    assert _next_available(client, service, **{"from": (MONDAY - timedelta(days=1)).isoformat(), "limit": 3}) == [
+        (day, "08:00"), (day, "08:30"), (day, "09:00")
+    ]
+
+def test_warm_cache_skips_full_days(client, user, service):
+    login(client, user)
+    # Saturday fully booked (08:00-16:00), Sunday closed
+    saturday = datetime.combine(SATURDAY, datetime.min.time())
+    db.session.add(Appointment(
+        user_id=user.id, service_id=service.id, appointment_time=saturday.replace(hour=8), end_time=saturday.replace(hour=16)
+    ))
+    db.session.commit()
+    expected = [(MONDAY.isoformat(), "08:00")]
+    assert _next_available(client, service, **{"from": SATURDAY.isoformat(), "limit": 1}) == expected
+    assert _next_available(client, service, **{"from": SATURDAY.isoformat(), "limit": 1}) == expected
+    assert slot_cache.stats()["hits"] > 0
+
+def test_respects_start_time(client, user, service):
+    login(client, user)
+    assert _next_available(client, service, **{"from": f"{MONDAY.isoformat()}T18:00", "limit": 2}) == [
+        (MONDAY.isoformat(), "18:30"), ((MONDAY + timedelta(days=1)).isoformat(), "08:00")
+    ]
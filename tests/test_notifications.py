@@ -0,0 +1,133 @@
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import app.notifications as notifications
+from app import db
+from app.booking import book_appointment_atomic
+from app.models import OutboxMessage
+from tests.conftest import MONDAY
+
+class RecordingSender:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, phone, body, idempotency_key):
+        self.sent.append(idempotency_key)
+
+class FakeTwilio(ThreadingHTTPServer):
+    """Answers every Messages.json POST with the next queued status code."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeTwilioHandler)
+        self.statuses = []
+        self.requests = []
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+class FakeTwilioHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append((self.path, dict(self.headers), body.decode()))
+        status = self.server.statuses.pop(0)
+        payload = b'{"sid": "SM123"}' if status == 201 else b'{"message": "error"}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def twilio(app):
+    server = FakeTwilio()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    app.config.update(
+        NOTIFICATION_SENDER="twilio",
+        TWILIO_ACCOUNT_SID="AC123",
+        TWILIO_AUTH_TOKEN="token",
+        TWILIO_WHATSAPP_FROM="+5511000000000",
+        TWILIO_API_BASE_URL=server.base_url
+    )
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def _due_message(user, service):
+    book_appointment_atomic(user.id, service, datetime.combine(MONDAY, datetime.min.time()).replace(hour=10))
+    return OutboxMessage.query.filter_by(kind=notifications.KIND_BOOKING_CONFIRMATION).one()
+
+def test_drain_records_outcome_while_holding_the_lease(user, service):
+    message = _due_message(user, service)
+    counts = notifications.drain_once(RecordingSender())
+    assert counts["sent"] == 1 and counts["lost"] == 0
+    db.session.refresh(message)
+    assert message.status == "sent" and message.claim_token is None and message.attempts == 1
+
+def test_drain_drops_outcome_after_losing_the_lease(user, service, monkeypatch):
+    message = _due_message(user, service)
+    prepare = notifications._prepare
+
+    def prepare_then_lose_lease(message_ids):
+        prepared = prepare(message_ids)
+        # The lease expired mid-send and another worker reclaimed the message
+        db.session.execute(OutboxMessage.__table__.update().values(claim_token="other-worker"))
+        return prepared
+
+    monkeypatch.setattr(notifications, "_prepare", prepare_then_lose_lease)
+    counts = notifications.drain_once(RecordingSender())
+    assert counts["sent"] == 0 and counts["lost"] == 1
+    db.session.refresh(message)
+    assert message.status == "sending" and message.claim_token == "other-worker" and message.attempts == 0
+
+def test_twilio_sender_sends_with_idempotency_token(user, service, twilio):
+    message = _due_message(user, service)
+    twilio.statuses = [201]
+    counts = notifications.drain_once(notifications.get_sender())
+    assert counts["sent"] == 1
+    db.session.refresh(message)
+    assert message.status == "sent" and message.attempts == 1
+    path, headers, body = twilio.requests[0]
+    assert path == "/2010-04-01/Accounts/AC123/Messages.json"
+    assert headers["I-Twilio-Idempotency-Token"] == message.idempotency_key
+    assert "To=whatsapp%3A%2B5511999990000" in body
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_twilio_temporary_failure_is_retried_later(user, service, twilio, status):
+    message = _due_message(user, service)
+    first_attempt_at = message.next_attempt_at
+    twilio.statuses = [status]
+    counts = notifications.drain_once(notifications.get_sender())
+    assert counts["retried"] == 1
+    db.session.refresh(message)
+    assert message.status == "pending" and message.attempts == 1 and message.claim_token is None
+    assert message.next_attempt_at > first_attempt_at
+    assert message.last_error == f"HTTP {status}"
+
+def test_twilio_rejection_fails_permanently(user, service, twilio):
+    message = _due_message(user, service)
+    twilio.statuses = [400]
+    counts = notifications.drain_once(notifications.get_sender())
+    assert counts["failed"] == 1
+    db.session.refresh(message)
+    assert message.status == "failed" and message.attempts == 1
+    assert message.last_error.startswith("HTTP 400")
+
+def test_reminder_is_skipped_after_reschedule(user, service):
+    appointment = book_appointment_atomic(user.id, service, datetime.combine(MONDAY, datetime.min.time()).replace(hour=10))
+    reminder = OutboxMessage.query.filter_by(kind=notifications.KIND_APPOINTMENT_REMINDER).one()
+    appointment.appointment_time += timedelta(hours=2)
+    appointment.end_time += timedelta(hours=2)
+    db.session.commit()
+
+    sender = RecordingSender()
+    counts = notifications.drain_once(sender, now=reminder.next_attempt_at + timedelta(minutes=1))
+    assert counts["sent"] == 1 and counts["skipped"] == 1
+    assert reminder.idempotency_key not in sender.sent
+    db.session.refresh(reminder)
+    assert reminder.status == "skipped" and reminder.last_error == "appointment was rescheduled"
@@ -0,0 +1,77 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from app.utils.occupancy import (
+    available_slots_for_resources, group_by_resource, longest_free_gap_for_resources, pick_resource
+)
+from app.utils.scheduling import business_intervals_for, get_available_slots, longest_free_gap
+
+# The per-resource bitmaps must agree with the interval engine run once per chair, where
+# a chair's appointments are its own plus the shared ones (resource_id None, booked
+# before chairs existed), which block every chair. Appointments sit on the 5-minute
+# grid; off-grid times are rounded outward by the bitmaps, so only that case may differ.
+
+OVERRIDES = [
+    None,
+    {"saturday": [["09:00", "13:00"]]},
+    {"monday": [["10:00", "12:00"], ["14:00", "18:30"]], "sunday": [["09:00", "12:00"]]},
+    {"tuesday": [], "wednesday": [["07:30", "20:00"]]},
+]
+DURATIONS = [5, 15, 30, 45, 60, 90, 120, 240]
+
+def _random_day(rng):
+    day = datetime(2030, 1, 1) + timedelta(days=rng.randrange(730))
+    resources = [
+        (resource_id, business_intervals_for(rng.choice(OVERRIDES)))
+        for resource_id in range(1, rng.randint(1, 4) + 1)
+    ]
+    rows = []
+    for _ in range(rng.randrange(16)):
+        resource_id = rng.choice([None, None] + [resource_id for resource_id, _ in resources])
+        start = day + timedelta(minutes=5 * rng.randrange(-24, 24 * 12))
+        rows.append((resource_id, start, rng.choice([15, 30, 45, 60, 90, 120])))
+    return day, resources, rows
+
+def _interval_slots(day, resources, by_resource, shared, duration):
+    slots = {}
+    for resource_id, business_intervals in resources:
+        existing = by_resource.get(resource_id, []) + shared
+        slots[resource_id] = get_available_slots(day.strftime("%Y-%m-%d"), existing, duration, business_intervals)
+    return slots
+
+@pytest.mark.parametrize("seed", [11, 2024, 90210])
+def test_bitmaps_match_interval_engine(seed):
+    rng = random.Random(seed)
+    for _ in range(600):
+        day, resources, rows = _random_day(rng)
+        by_resource, shared = group_by_resource(rows)
+        duration = rng.choice(DURATIONS)
+        per_resource = _interval_slots(day, resources, by_resource, shared, duration)
+        expected = sorted(set().union(*per_resource.values()))
+        context = (day, resources, rows, duration)
+        assert available_slots_for_resources(day.date(), resources, by_resource, shared, duration) == expected, context
+
+        expected_gap = max(
+            longest_free_gap(day.date(), by_resource.get(resource_id, []) + shared, business_intervals)
+            for resource_id, business_intervals in resources
+        )
+        assert longest_free_gap_for_resources(day.date(), resources, by_resource, shared) == expected_gap, context
+
+        for time_str in ("08:00", "09:30", "12:30", "13:00", "15:00", "18:30", "18:35"):
+            start = datetime.strptime(f"{day:%Y-%m-%d} {time_str}", "%Y-%m-%d %H:%M")
+            picked = pick_resource(start, duration, resources, by_resource, shared)
+            if time_str in expected:
+                assert picked is not None and time_str in per_resource[picked], context
+            else:
+                assert picked is None, context
+
+def test_shared_appointment_blocks_every_chair():
+    day = datetime(2031, 3, 10) # a Monday
+    resources = [(1, business_intervals_for(None)), (2, business_intervals_for(None))]
+    rows = [(None, day.replace(hour=9), 60), (1, day.replace(hour=10), 30)]
+    by_resource, shared = group_by_resource(rows)
+    slots = available_slots_for_resources(day.date(), resources, by_resource, shared, 30)
+    assert "09:00" not in slots and "09:30" not in slots
+    assert "10:00" in slots # chair 2 is free
+    assert pick_resource(day.replace(hour=9, minute=30), 30, resources, by_resource, shared) is None
+    assert pick_resource(day.replace(hour=10), 30, resources, by_resource, shared) == 2
@@ -0,0 +1,65 @@
+import pytest
+from benchmarks.harness import QueryCounter
+from app import db
+import app.url_helpers as url_helpers
+from tests.conftest import login
+
+pytestmark = pytest.mark.app_config(PAGE_CACHE_ENABLED=True)
+
+query_counter = QueryCounter()
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Names of the templates actually rendered by the main views."""
+    rendered = []
+    render_template = url_helpers.render_template
+
+    def recording_render_template(name, **context):
+        rendered.append(name)
+        return render_template(name, **context)
+
+    monkeypatch.setattr(url_helpers, "render_template", recording_render_template)
+    return rendered
+
+def test_anonymous_hit_touches_neither_db_nor_templates(client, renders):
+    first = client.get("/about")
+    with query_counter.counting():
+        second = client.get("/about")
+    assert first.status_code == second.status_code == 200
+    assert second.data == first.data
+    assert renders == ["about.html"]
+    assert query_counter.count == 0
+    assert second.headers["Cache-Control"].startswith("public")
+
+def test_logged_in_requests_bypass_the_cache(client, user, renders):
+    login(client, user)
+    client.get("/about")
+    response = client.get("/about")
+    assert renders == ["about.html", "about.html"]
+    assert "public" not in response.headers.get("Cache-Control", "")
+
+def test_pending_flashes_bypass_the_cache(client, renders):
+    client.get("/about")
+    with client.session_transaction() as session:
+        session["_flashes"] = [("info", "Agendamento cancelado.")]
+    client.get("/about")
+    assert renders == ["about.html", "about.html"]
+
+def test_etag_revalidation_returns_304(client):
+    etag = client.get("/about").headers["ETag"]
+    with query_counter.counting():
+        response = client.get("/about", headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.data == b""
+    assert query_counter.count == 0
+
+def test_service_write_invalidates_services_page(client, service, renders):
+    client.get("/services")
+    with query_counter.counting():
+        client.get("/services")
+    assert renders == ["services.html"]
+    assert query_counter.count == 0 # version read at most once per PAGE_CACHE_VERSION_TTL
+
+    service.name = "Corte degradê"
+    db.session.commit()
+    client.get("/services")
+    assert renders == ["services.html", "services.html"]
@@ -0,0 +1,41 @@
+import bcrypt
+import pytest
+from app import db
+from app.models import User
+from app.passwords import MAX_PASSWORD_BYTES, PasswordHasher, get_password_hasher
+
+def _register(client, password):
+    return client.post("/register", data={"username": "bia", "email": "bia@example.com", "password": password})
+
+def test_register_and_login(client):
+    assert _register(client, "çãé" * 10).status_code == 302 # 60 bytes
+    response = client.post("/login", data={"email": "bia@example.com", "password": "çãé" * 10})
+    assert response.status_code == 302
+
+def test_register_rejects_password_over_72_bytes(client):
+    # 40 characters but 80 bytes: passes a character count, bcrypt would raise
+    response = _register(client, "é" * 40)
+    assert response.status_code == 200
+    assert User.query.count() == 0
+
+def test_hash_rejects_long_password(app):
+    with pytest.raises(ValueError):
+        PasswordHasher(rounds=4, offload=False).hash("a" * (MAX_PASSWORD_BYTES + 1))
+
+def test_legacy_hash_of_long_password_still_verifies(app):
+    # Hashes made by bcrypt < 5 silently used the first 72 bytes
+    password = "x" * 100
+    legacy_hash = bcrypt.hashpw(password.encode()[:MAX_PASSWORD_BYTES], bcrypt.gensalt(rounds=5)).decode()
+    user = User(username="velho", email="velho@example.com", password_hash=legacy_hash)
+    db.session.add(user)
+    db.session.commit()
+    # The cost differs from BCRYPT_LOG_ROUNDS, but the password cannot be rehashed: keep the hash
+    assert user.check_password(password)
+    assert user.password_hash == legacy_hash
+    assert not user.check_password("y" * 100)
+
+def test_rehash_on_cost_change(app):
+    user = User(username="cris", email="cris@example.com")
+    user.password_hash = bcrypt.hashpw(b"segredo123", bcrypt.gensalt(rounds=5)).decode()
+    assert user.check_password("segredo123")
+    assert user.password_hash.startswith(f"$2b${get_password_hasher().rounds:02d}$")
@@ -0,0 +1,109 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models import Appointment
+from app.queries import (
+    EXPORT_COLUMNS, MAX_APPOINTMENTS_PAGE_SIZE, appointments_page, encode_cursor, has_overlapping_appointment,
+    iter_appointment_export_rows
+)
+from tests.conftest import login
+
+def _book(user, service, start, end, status="Scheduled"):
+    db.session.add(Appointment(user_id=user.id, service_id=service.id, appointment_time=start, end_time=end, status=status))
+    db.session.commit()
+
+def test_has_overlapping_appointment(app, user, service):
+    _book(user, service, datetime(2031, 3, 10, 10, 0), datetime(2031, 3, 10, 11, 0))
+    _book(user, service, datetime(2031, 3, 10, 14, 0), datetime(2031, 3, 10, 15, 0), status="Cancelled")
+    assert has_overlapping_appointment(datetime(2031, 3, 10, 10, 30), datetime(2031, 3, 10, 11, 0))
+    assert has_overlapping_appointment(datetime(2031, 3, 10, 9, 30), datetime(2031, 3, 10, 10, 30), for_update=True)
+    assert not has_overlapping_appointment(datetime(2031, 3, 10, 11, 0), datetime(2031, 3, 10, 11, 30))
+    assert not has_overlapping_appointment(datetime(2031, 3, 10, 9, 30), datetime(2031, 3, 10, 10, 0))
+    assert not has_overlapping_appointment(datetime(2031, 3, 10, 14, 0), datetime(2031, 3, 10, 14, 30))
+
+def test_overlap_query_is_bounded_to_the_day(app, user, service):
+    # Only the booking's own day is read (and locked); earlier history is outside the range
+    _book(user, service, datetime(2031, 3, 9, 18, 0), datetime(2031, 3, 10, 9, 0))
+    assert not has_overlapping_appointment(datetime(2031, 3, 10, 8, 0), datetime(2031, 3, 10, 8, 30))
+    _book(user, service, datetime(2031, 3, 10, 0, 0), datetime(2031, 3, 10, 9, 0))
+    assert has_overlapping_appointment(datetime(2031, 3, 10, 8, 0), datetime(2031, 3, 10, 8, 30))
+
+# --- Keyset pagination and export ---
+
+def _add_listing(user, service):
+    """Seven appointments inserted out of time order; four share 10:00."""
+    times = [datetime(2031, 3, 10, 10, 0)] * 2 + [datetime(2031, 3, 10, 9, 0)] + [datetime(2031, 3, 10, 10, 0)] * 2 + [
+        datetime(2031, 3, 11, 8, 0), datetime(2031, 3, 10, 11, 0)
+    ]
+    db.session.add_all([
+        Appointment(user_id=user.id, service_id=service.id, appointment_time=start, end_time=start + timedelta(minutes=30), status="Scheduled")
+        for start in times
+    ])
+    db.session.commit()
+    return [appt.id for appt in Appointment.query.order_by(Appointment.appointment_time, Appointment.id)]
+
+def test_pages_walk_duplicate_times_in_id_order(client, user, service):
+    expected = _add_listing(user, service)
+    login(client, user)
+    seen, cursor, pages = [], None, 0
+    while True:
+        url = "/appointments/api/admin/all_appointments?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        assert response.status_code == 200
+        payload = response.get_json()
+        seen.extend(appt["id"] for appt in payload["appointments"])
+        pages += 1
+        cursor = payload["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
+    assert pages == 4
+
+def test_last_full_page_has_no_next_cursor(app, user, service):
+    expected = _add_listing(user, service)
+    appointments, next_cursor = appointments_page(limit=len(expected))
+    assert [appt.id for appt in appointments] == expected and next_cursor is None
+
+@pytest.mark.parametrize("query", ["cursor=not-a-cursor", "cursor=" + encode_cursor(datetime(2031, 3, 10), 1)[:-3], "limit=0", "limit=501", "limit=abc"])
+def test_bad_page_arguments_are_rejected(client, user, query):
+    login(client, user)
+    response = client.get(f"/appointments/api/admin/all_appointments?{query}")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+@pytest.mark.parametrize("limit", [1, MAX_APPOINTMENTS_PAGE_SIZE])
+def test_page_size_bounds_are_accepted(client, user, service, limit):
+    _add_listing(user, service)
+    login(client, user)
+    response = client.get(f"/appointments/api/admin/all_appointments?limit={limit}")
+    assert response.status_code == 200
+    assert len(response.get_json()["appointments"]) == min(limit, 7)
+
+def test_export_streams_every_row_in_order(app, user, service):
+    expected = _add_listing(user, service)
+    rows = list(iter_appointment_export_rows(batch_size=2))
+    assert [row[0] for row in rows] == expected
+    assert rows[0] == (expected[0], "2031-03-10T09:00:00", "2031-03-10T09:30:00", "Scheduled", "Corte", "cliente", user.id)
+
+def test_export_formats(client, user, service):
+    expected = _add_listing(user, service)
+    login(client, user)
+
+    response = client.get("/appointments/admin/export_appointments?format=csv")
+    assert response.status_code == 200 and response.mimetype == "text/csv"
+    assert response.headers["Content-Disposition"] == "attachment; filename=appointments.csv"
+    records = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert tuple(records[0]) == EXPORT_COLUMNS
+    assert [int(record["id"]) for record in records] == expected
+    assert records[0]["start"] == "2031-03-10T09:00:00" and records[0]["client"] == "cliente"
+
+    response = client.get("/appointments/admin/export_appointments")
+    assert response.status_code == 200 and response.mimetype == "application/x-ndjson"
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [record["id"] for record in records] == expected
+    assert records[0] == dict(zip(EXPORT_COLUMNS, next(iter_appointment_export_rows())))
+
+    assert client.get("/appointments/admin/export_appointments?format=xml").status_code == 400
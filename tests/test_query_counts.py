@@ -0,0 +1,67 @@
+from datetime import date, datetime, timedelta
+import pytest
+from benchmarks.harness import QueryCounter
+from app import db
+from app.models import Appointment, User
+from app.utils.availability_cache import slot_cache
+from tests.conftest import login
+
+# Statements per request must not grow with the number of appointments (no N+1).
+# Each count includes the user load done by login_required.
+
+DAY = date(2031, 3, 10) # a Monday
+
+@pytest.fixture(scope="module")
+def query_counter():
+    return QueryCounter()
+
+def _add_appointments(service, count):
+    customers = [User(username=f"c{i}", email=f"c{i}@example.com") for i in range(count)]
+    db.session.add_all(customers)
+    db.session.flush()
+    for i, customer in enumerate(customers):
+        start = datetime.combine(DAY, datetime.min.time()) + timedelta(hours=8, minutes=30 * (i % 8))
+        db.session.add(Appointment(
+            user_id=customer.id, service_id=service.id, appointment_time=start + timedelta(days=i // 8)
+        ))
+    db.session.commit()
+
+def _count(client, query_counter, method, url, **kwargs):
+    # Start from an empty identity map and a cold slot cache, like a fresh worker
+    db.session.remove()
+    slot_cache.clear()
+    with query_counter.counting():
+        response = getattr(client, method)(url, **kwargs)
+    assert response.status_code < 400, response.get_data(as_text=True)
+    return query_counter.count
+
+REQUESTS = [
+    ("post", "/appointments/get_available_slots", lambda s: {"json": {"date": DAY.isoformat(), "service_id": s.id}}, 5),
+    ("post", "/appointments/get_available_slots_range", lambda s: {"json": {
+        "start_date": DAY.isoformat(), "end_date": (DAY + timedelta(days=6)).isoformat(), "service_id": s.id
+    }}, 5),
+    ("get", f"/appointments/api/month_appointments?year={DAY.year}&month={DAY.month}", lambda s: {}, 3),
+    ("get", f"/appointments/api/month_appointments?year={DAY.year}&month={DAY.month}&format=compact", lambda s: {}, 3),
+    ("get", "/appointments/api/admin/all_appointments", lambda s: {}, 2),
+]
+
+@pytest.mark.parametrize("appointment_count", [1, 24])
+@pytest.mark.parametrize("method,url,kwargs,expected", REQUESTS)
+def test_statements_per_request(client, user, service, query_counter, appointment_count, method, url, kwargs, expected):
+    _add_appointments(service, appointment_count)
+    login(client, user)
+    assert _count(client, query_counter, method, url, **kwargs(service)) == expected
+
+@pytest.mark.parametrize("appointment_count", [1, 24])
+def test_booking_statements(client, user, service, query_counter, appointment_count):
+    _add_appointments(service, appointment_count)
+    login(client, user)
+    form = {"service_id": service.id, "date": DAY.isoformat(), "time": "17:00"}
+    db.session.remove()
+    with query_counter.counting():
+        response = client.post("/appointments/book", data=form)
+    assert response.status_code == 302
+    # Reads (user, service, resources, overlap), the appointment with its 6 guard rows,
+    # the rollup, calendar and availability version upserts, 2 outbox messages and the service for the flash
+    # (the rollup takes the price stored on the appointment, no service lookup)
+    assert query_counter.count == 17
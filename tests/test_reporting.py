@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+from app import db
+from app.booking import book_appointment_atomic, cancel_appointment
+from app.models import Appointment, DailyServiceStats, Resource
+from app.reporting import rebuild_rollups, report_between
+from tests.conftest import MONDAY
+
+START = datetime.combine(MONDAY, datetime.min.time()).replace(hour=10)
+
+def _revenue():
+    return sum(row.revenue for row in DailyServiceStats.query.all())
+
+def test_cancellation_after_price_change_subtracts_booked_price(user, service):
+    appointment = book_appointment_atomic(user.id, service, START)
+    assert appointment.price == 50.0 and _revenue() == 50.0
+    service.price = 80.0
+    db.session.commit()
+    cancel_appointment(appointment)
+    assert _revenue() == 0
+
+def test_rebuild_uses_stored_prices(user, service):
+    book_appointment_atomic(user.id, service, START)
+    service.price = 80.0
+    db.session.commit()
+    book_appointment_atomic(user.id, service, START + timedelta(hours=1))
+    assert _revenue() == 130.0
+    rebuild_rollups()
+    assert _revenue() == 130.0
+
+def test_orm_insert_without_price_takes_service_price(user, service):
+    appointment = Appointment(user_id=user.id, service_id=service.id, appointment_time=START, status="Scheduled")
+    db.session.add(appointment)
+    db.session.commit()
+    assert appointment.price == 50.0 and _revenue() == 50.0
+
+def test_occupancy_counts_every_chair(user, service):
+    saturday = MONDAY + timedelta(days=5)
+    db.session.add_all([Resource(name="Cadeira 1"), Resource(name="Cadeira 2", business_hours={"saturday": [["08:00", "12:00"]]})])
+    db.session.commit()
+    opening = datetime.combine(saturday, datetime.min.time()).replace(hour=8)
+    for slot in range(16 + 8): # chair 1 open 8h, chair 2 open 4h
+        book_appointment_atomic(user.id, service, opening + timedelta(minutes=30 * (slot % 16)))
+    report = report_between(saturday, saturday)
+    assert report["occupied_minutes"] == 12 * 60
+    assert report["occupancy"] == 1.0
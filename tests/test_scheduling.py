@@ -0,0 +1,38 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from app.utils.occupancy import available_slots_for_resources
+from app.utils.scheduling import BUSINESS_INTERVALS, _get_available_slots_reference, get_available_slots
+
+@pytest.mark.parametrize("seed", [2025, 7, 31337])
+def test_matches_reference_implementation(seed):
+    # Random days with appointments at any minute (including ones starting the day
+    # before) and assorted durations
+    rng = random.Random(seed)
+    for _ in range(2000):
+        day = datetime(2025, 1, 1) + timedelta(days=rng.randrange(730))
+        existing = [
+            (day + timedelta(minutes=rng.randrange(-180, 24 * 60), seconds=rng.choice([0, 0, 0, 30])),
+             rng.choice([15, 30, 45, 60, 90, 120, 240]))
+            for _ in range(rng.randrange(12))
+        ]
+        duration = rng.choice([1, 10, 15, 20, 30, 45, 60, 75, 90, 120, 180, 300, 600])
+        date_str = day.strftime("%Y-%m-%d")
+        expected = _get_available_slots_reference(date_str, existing, duration)
+        assert get_available_slots(date_str, existing, duration) == expected, (date_str, existing, duration)
+
+def test_examples():
+    existing = [(datetime(2025, 10, 27, 10, 0), 60), (datetime(2025, 10, 27, 14, 30), 30)]
+    slots = get_available_slots("2025-10-27", existing, 30)
+    assert "09:30" in slots and "10:00" not in slots and "10:30" not in slots and "11:00" in slots
+    assert "11:30" in slots and "12:00" not in slots and "12:30" not in slots and "13:00" in slots
+    assert "14:30" not in slots and slots[-1] == "18:30"
+    assert get_available_slots("2025-10-26", [], 30) == [] # Sunday
+    assert get_available_slots("not-a-date", [], 30) == []
+
+@pytest.mark.parametrize("duration", [0, -30])
+def test_non_positive_duration_has_no_slots(duration):
+    # The reference returned grid times that depended on the minute before each slot
+    assert get_available_slots("2025-10-27", [], duration) == []
+    assert get_available_slots("2025-10-25", [(datetime(2025, 10, 25, 9, 0), 60)], duration) == []
+    assert available_slots_for_resources(datetime(2025, 10, 27).date(), [(1, BUSINESS_INTERVALS)], {}, [], duration) == []
@@ -0,0 +1,106 @@
+from datetime import datetime
+import pytest
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.booking import book_appointment_atomic, cancel_appointment
+from app.models import Appointment, AppointmentSlot, Resource
+from app.waitlist import HELD_STATUS, _FREED_KEY, WaitlistError, claim_offer, decline_offer, join_waitlist, leave_waitlist
+from tests.conftest import MONDAY, login, store_appointment
+
+def _at(hour, minute=0):
+    return datetime.combine(MONDAY, datetime.min.time()).replace(hour=hour, minute=minute)
+
+def _held():
+    return Appointment.query.filter_by(status=HELD_STATUS).all()
+
+def test_cancellation_is_offered_and_claimed(user, service):
+    booked = book_appointment_atomic(user.id, service, _at(10))
+    entry = join_waitlist(user.id, service, MONDAY, MONDAY)
+    cancel_appointment(booked)
+    assert entry.status == "offered"
+    [held] = _held()
+    assert held.appointment_time == _at(10) and entry.appointment_id == held.id
+    assert claim_offer(entry).status == "Scheduled"
+    assert entry.status == "booked"
+
+def test_no_offer_over_appointment_without_guard_rows(user, service):
+    booked = store_appointment(user, service, _at(10))
+    store_appointment(user, service, _at(10), guard_rows=False) # legacy row in the same slot
+    entry = join_waitlist(user.id, service, MONDAY, MONDAY)
+    cancel_appointment(booked)
+    assert entry.status == "waiting"
+    assert _held() == []
+
+def test_shared_appointment_blocks_per_chair_hold(user, service):
+    db.session.add_all([Resource(name="Cadeira 1"), Resource(name="Cadeira 2")])
+    db.session.commit()
+    booked = store_appointment(user, service, _at(10), resource_id=1)
+    store_appointment(user, service, _at(10)) # no resource: blocks every chair (guard rows under key 0)
+    entry = join_waitlist(user.id, service, MONDAY, MONDAY)
+    cancel_appointment(booked)
+    assert entry.status == "waiting"
+    assert _held() == []
+
+def _offered_entry(user, service):
+    booked = book_appointment_atomic(user.id, service, _at(10))
+    entry = join_waitlist(user.id, service, MONDAY, MONDAY)
+    cancel_appointment(booked)
+    assert entry.status == "offered"
+    return entry
+
+@pytest.mark.parametrize("remove", ["delete", "cancel"])
+def test_claim_after_hold_removed_expires_offer(user, service, remove):
+    entry = _offered_entry(user, service)
+    held = db.session.get(Appointment, entry.appointment_id)
+    if remove == "delete":
+        db.session.delete(held)
+    else:
+        held.status = "Cancelled"
+        held.occupied_slots = []
+    db.session.commit()
+    with pytest.raises(WaitlistError):
+        claim_offer(entry)
+    assert entry.status == "expired"
+
+def test_decline_and_leave_after_hold_deleted(user, service):
+    entry = _offered_entry(user, service)
+    db.session.delete(db.session.get(Appointment, entry.appointment_id))
+    db.session.commit()
+    decline_offer(entry)
+    assert entry.status == "declined"
+
+    entry = _offered_entry(user, service)
+    db.session.delete(db.session.get(Appointment, entry.appointment_id))
+    db.session.commit()
+    leave_waitlist(entry)
+    assert entry.status == "cancelled"
+
+def test_claim_route_after_hold_deleted(client, user, service):
+    entry = _offered_entry(user, service)
+    db.session.delete(db.session.get(Appointment, entry.appointment_id))
+    db.session.commit()
+    login(client, user)
+    response = client.post(f"/appointments/waitlist/{entry.id}/claim")
+    assert response.status_code == 409
+    assert response.get_json()["entry"]["status"] == "expired"
+
+def test_failed_flush_does_not_leak_freed_intervals(user, service):
+    booked = store_appointment(user, service, _at(10))
+    other = store_appointment(user, service, _at(15))
+    join_waitlist(user.id, service, MONDAY, MONDAY)
+    booked.status = "Cancelled"
+    booked.occupied_slots = []
+    # Duplicate guard row: the flush fails after the cancellation was recorded
+    db.session.add(AppointmentSlot(appointment_id=other.id, resource_key=0, slot_time=_at(15)))
+    with pytest.raises(IntegrityError):
+        db.session.flush()
+    db.session.rollback()
+    assert _FREED_KEY not in db.session.info
+
+def test_status_change_on_expired_instance_is_offered(user, service):
+    # The commit expired the instance, so the old status must still be loaded on set
+    legacy = store_appointment(user, service, _at(10), guard_rows=False)
+    entry = join_waitlist(user.id, service, MONDAY, MONDAY)
+    legacy.status = "Cancelled"
+    db.session.commit()
+    assert entry.status == "offered"